@@ -33,6 +33,12 @@ try:
     from .handlers.chain_progress_handler import *
     from .handlers.global_websocket_handler import *
     from .utils.global_websocket_manager import global_websocket_manager
+    from .utils.model_index import model_index
+    from .utils.model_hashes import model_hasher
+    from .utils.fs_watcher import setup_fs_watcher
+    from .utils.http_client import close_http_session
+    from .utils.upload_sessions import upload_sessions
+    from .utils.chain_registry import chain_registry
 except ImportError as e:
     print(f"\n[ComfyMobileUI] ❌ ERROR: Missing dependency - {e}")
     print("[ComfyMobileUI] 💡 Please install required packages using: python -m pip install -r requirements.txt\n")
@@ -68,6 +74,15 @@ def setup_routes():
         # Initialize Global WebSocket Manager (Hook into ComfyUI)
         global_websocket_manager.hook_comfyui_server()
         
+        # Build/catch up the persistent model index in the background
+        model_index.warm_up()
+        
+        # Hash model files in the background (SHA256/AutoV2, cached per inode)
+        model_hasher.start()
+        
+        # Watch models/ and input/output/temp to keep the indexes current and notify clients
+        setup_fs_watcher()
+        
         # Try to get the server instance and add routes
         import server
         
@@ -77,12 +92,26 @@ def setup_routes():
             if prompt_server and hasattr(prompt_server, 'app'):
                 app = prompt_server.app
                 
+                # Rehydrate downloads interrupted by the last shutdown; they resume once the server starts
+                restore_download_tasks()
+                app.on_startup.append(resume_restored_downloads)
+                
+                # Chunked upload sessions survive restarts; clients continue from the reported offsets
+                upload_sessions.load()
+                
+                # Finished chain runs stay queryable across restarts
+                chain_registry.load_history()
+                
+                # Shared outbound connection pool, closed with the app
+                app.on_cleanup.append(close_http_session)
+                
                 # Global WebSocket route
                 app.router.add_get('/comfymobile/ws', global_websocket_handler)
                 
                 # System routes
                 app.router.add_get('/comfymobile/api/status', api_status)
                 app.router.add_post('/comfymobile/api/reboot', reboot_server)
+                app.router.add_get('/comfymobile/api/system/io-stats', get_io_stats)
                 
                 # Workflow routes
                 app.router.add_get('/comfymobile/api/workflows/list', list_workflows)
@@ -94,6 +123,8 @@ def setup_routes():
                 app.router.add_get('/comfymobile/api/files/list', list_all_files)
                 app.router.add_get('/comfymobile/api/files/list/{folder_type}', list_files_by_type)
                 app.router.add_get('/comfymobile/api/files/view', view_thumbnail)
+                app.router.add_post('/comfymobile/api/files/thumbnails/batch', batch_thumbnails)
+                app.router.add_get('/comfymobile/api/files/thumbnails/stats', get_thumbnail_cache_stats)
                 app.router.add_delete('/comfymobile/api/files/delete', delete_files)
                 app.router.add_post('/comfymobile/api/files/move', move_files)
                 app.router.add_post('/comfymobile/api/files/copy', copy_files)
@@ -101,14 +132,30 @@ def setup_routes():
                 # Model management routes
                 app.router.add_get('/comfymobile/api/models/folders', list_model_folders)
                 app.router.add_get('/comfymobile/api/models/all', list_all_models)
+                app.router.add_get('/comfymobile/api/models/hashes/status', get_model_hash_status)
+                app.router.add_get('/comfymobile/api/models/hashes/lookup', get_model_hash)
+                app.router.add_get('/comfymobile/api/models/hashes/find/{hash}', find_models_by_hash)
+                app.router.add_get('/comfymobile/api/models/duplicates', find_duplicate_models)
+                app.router.add_post('/comfymobile/api/models/duplicates/dedupe', dedupe_models)
+                app.router.add_get('/comfymobile/api/models/duplicates/jobs', list_dedupe_jobs)
+                app.router.add_get('/comfymobile/api/models/duplicates/jobs/{job_id}', get_dedupe_job)
                 app.router.add_get('/comfymobile/api/models/{folder_name}', list_models_in_folder)
                 app.router.add_get('/comfymobile/api/models/search', search_models)
                 app.router.add_post('/comfymobile/api/models/check-exists', check_file_exists)
                 app.router.add_post('/comfymobile/api/models/upload', upload_model_file)
                 app.router.add_get('/comfymobile/api/models/uploads/partial', list_partial_uploads)
                 app.router.add_delete('/comfymobile/api/models/uploads/partial', delete_partial_upload)
+                app.router.add_post('/comfymobile/api/models/uploads/sessions', create_upload_session)
+                app.router.add_get('/comfymobile/api/models/uploads/sessions', list_upload_sessions)
+                app.router.add_get('/comfymobile/api/models/uploads/sessions/{session_id}', get_upload_session)
+                app.router.add_put('/comfymobile/api/models/uploads/sessions/{session_id}', upload_session_chunk)
+                app.router.add_post('/comfymobile/api/models/uploads/sessions/{session_id}/finalize', finalize_upload_session)
+                app.router.add_delete('/comfymobile/api/models/uploads/sessions/{session_id}', delete_upload_session)
                 app.router.add_post('/comfymobile/api/models/move', move_model_file)
                 app.router.add_post('/comfymobile/api/models/copy', copy_model_file)
+                app.router.add_get('/comfymobile/api/models/copy/jobs', list_copy_jobs)
+                app.router.add_get('/comfymobile/api/models/copy/jobs/{job_id}', get_copy_job)
+                app.router.add_delete('/comfymobile/api/models/copy/jobs/{job_id}', cancel_copy_job)
                 app.router.add_post('/comfymobile/api/models/delete', delete_model_file)
                 app.router.add_post('/comfymobile/api/models/rename', rename_model_file)
                 
@@ -119,6 +166,9 @@ def setup_routes():
                 app.router.add_get('/comfymobile/api/models/downloads', list_downloads)
                 app.router.add_post('/comfymobile/api/models/downloads/{task_id}/resume', resume_download)
                 app.router.add_post('/comfymobile/api/models/downloads/retry-all', retry_all_failed_downloads)
+                app.router.add_post('/comfymobile/api/models/downloads/{task_id}/priority', set_download_priority)
+                app.router.add_get('/comfymobile/api/models/downloads/scheduler', get_download_scheduler_settings)
+                app.router.add_post('/comfymobile/api/models/downloads/scheduler', update_download_scheduler_settings)
                 
                 # LoRA routes
                 app.router.add_get('/comfymobile/api/models/loras', list_loras)
@@ -158,6 +208,7 @@ def setup_routes():
                 # Manager proxy routes
                 app.router.add_get('/comfymobile/api/manager/queue/start', manager_queue_start)
                 app.router.add_post('/comfymobile/api/manager/queue/install', manager_queue_install)
+                app.router.add_route('*', '/comfymobile/api/manager/{path:.*}', manager_proxy)
 
                 # Video download routes
                 app.router.add_post('/comfymobile/api/videos/download', download_youtube_video)
@@ -173,6 +224,10 @@ def setup_routes():
                 app.router.add_delete('/comfymobile/api/chains/delete', delete_workflow_chain)
                 app.router.add_post('/comfymobile/api/chains/execute', execute_chain_api)
                 app.router.add_post('/comfymobile/api/chains/interrupt', interrupt_chain_api)
+                app.router.add_get('/comfymobile/api/chains/executions', list_chain_executions_api)
+                app.router.add_get('/comfymobile/api/chains/executions/history', get_chain_history_api)
+                app.router.add_get('/comfymobile/api/chains/executions/{execution_id}', get_chain_execution_api)
+                app.router.add_get('/comfymobile/api/chains/executions/{execution_id}/result', get_chain_execution_result_api)
                 app.router.add_get('/comfymobile/api/chains/progress', chain_progress_websocket)
                 app.router.add_post('/comfymobile/api/chains/thumbnails', save_chain_thumbnail_api)
                 app.router.add_get('/comfymobile/api/chains/thumbnails/{chain_id}/{node_filename}', get_chain_thumbnail_api)
@@ -180,7 +235,7 @@ def setup_routes():
                 print("✅ ComfyMobileUI API routes registered successfully")
                 print("📋 Modular handlers loaded:")
                 print("   🌐  Global WebSocket - consolidated event stream")
-                print("   🗂️  System Handler - status, reboot")
+                print("   🗂️  System Handler - status, reboot, I/O stats")
                 print("   📄  Workflow Handler - workflow CRUD operations")
                 print("   📁  File Handler - file management operations")
                 print("   🤖  Model Handler - AI model management")
@@ -229,6 +284,7 @@ def setup_routes():
             # Manager proxy routes
             routes.get('/comfymobile/api/manager/queue/start')(manager_queue_start)
             routes.post('/comfymobile/api/manager/queue/install')(manager_queue_install)
+            routes.route('*', '/comfymobile/api/manager/{path:.*}')(manager_proxy)
             
             print("✅ ComfyMobileUI API routes registered via direct routes (legacy mode)")
             return True
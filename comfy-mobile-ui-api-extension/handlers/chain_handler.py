@@ -25,6 +25,8 @@ try:
         get_chain_thumbnail,
         delete_chain_thumbnails
     )
+    from ..utils.io_executor import run_io
+    from ..utils.chain_registry import chain_registry
 except ImportError:
     from utils.chain_storage import (
         save_chain,
@@ -36,6 +38,8 @@ except ImportError:
         get_chain_thumbnail,
         delete_chain_thumbnails
     )
+    from utils.io_executor import run_io
+    from utils.chain_registry import chain_registry
 
 async def list_workflow_chains(request):
     """
@@ -43,7 +47,7 @@ async def list_workflow_chains(request):
     GET /comfymobile/api/chains/list
     """
     try:
-        result = list_chains()
+        result = await run_io(list_chains)
 
         if result['success']:
             return web.json_response({
@@ -77,7 +81,7 @@ async def get_chain_content(request):
                 "error": "Missing chain_id parameter"
             }, status=400)
 
-        result = load_chain(chain_id)
+        result = await run_io(load_chain, chain_id)
 
         if result['success']:
             return web.json_response({
@@ -133,7 +137,7 @@ async def save_workflow_chain(request):
                 "error": "Chain name cannot be empty"
             }, status=400)
 
-        result = save_chain(data)
+        result = await run_io(save_chain, data)
 
         if result['success']:
             return web.json_response({
@@ -179,11 +183,11 @@ async def delete_workflow_chain(request):
                 "error": "Missing required field: chain_id"
             }, status=400)
 
-        result = delete_chain(chain_id)
+        result = await run_io(delete_chain, chain_id)
 
         if result['success']:
             # Also delete thumbnails
-            delete_chain_thumbnails(chain_id)
+            await run_io(delete_chain_thumbnails, chain_id)
 
             return web.json_response({
                 "success": True,
@@ -221,7 +225,7 @@ async def get_chain_summary_api(request):
                 "error": "Missing chain_id parameter"
             }, status=400)
 
-        result = get_chain_summary(chain_id)
+        result = await run_io(get_chain_summary, chain_id)
 
         if result['success']:
             return web.json_response({
@@ -243,15 +247,25 @@ async def get_chain_summary_api(request):
 
 async def execute_chain_api(request):
     """
-    Execute a workflow chain
+    Start a workflow chain as a background job
     POST /comfymobile/api/chains/execute
 
     Expected JSON body:
     {
-        "chain_id": "chain-uuid"
+        "chain_id": "chain-uuid",
+        "wait": false  // optional: true keeps the request open until the chain finishes
     }
 
-    Returns:
+    Returns (202):
+    {
+        "success": true,
+        "executionId": "exec-xxxxx",
+        "status": "queued",
+        "statusUrl": "/comfymobile/api/chains/executions/exec-xxxxx",
+        "resultUrl": "/comfymobile/api/chains/executions/exec-xxxxx/result"
+    }
+
+    With "wait": true the response is the chain result:
     {
         "success": true,
         "executionId": "exec-xxxxx",
@@ -271,7 +285,7 @@ async def execute_chain_api(request):
             }, status=400)
 
         # Load chain data
-        result = load_chain(chain_id)
+        result = await run_io(load_chain, chain_id)
 
         if not result['success']:
             status_code = 404 if "not found" in result.get('error', '').lower() else 500
@@ -288,14 +302,27 @@ async def execute_chain_api(request):
         except ImportError:
             from utils.chain_executor import ChainExecutor
 
-        # Execute chain
         executor = ChainExecutor(chain_data, server_url="http://127.0.0.1:8188")
-        execution_result = await executor.execute()
 
-        if execution_result.get('success'):
-            return web.json_response(execution_result)
-        else:
-            return web.json_response(execution_result, status=500)
+        if data.get('wait'):
+            # Execute chain within the request (waits for a free slot when other chains are running)
+            execution_result = await chain_registry.run(executor)
+
+            if execution_result.get('success'):
+                return web.json_response(execution_result)
+            else:
+                return web.json_response(execution_result, status=500)
+
+        execution_id = chain_registry.submit(executor)
+        status_url = f"/comfymobile/api/chains/executions/{execution_id}"
+
+        return web.json_response({
+            "success": True,
+            "executionId": execution_id,
+            "status": "queued",
+            "statusUrl": status_url,
+            "resultUrl": f"{status_url}/result"
+        }, status=202)
 
     except json.JSONDecodeError:
         return web.json_response({
@@ -310,31 +337,64 @@ async def execute_chain_api(request):
 
 async def interrupt_chain_api(request):
     """
-    Interrupt currently executing chain
+    Interrupt a queued or running chain execution
     POST /comfymobile/api/chains/interrupt
 
-    Sends interrupt signal to ComfyUI and clears chain execution state
+    Optional JSON body:
+    {
+        "executionId": "exec-xxxxx"
+    }
+
+    Only the prompts of that execution are removed from ComfyUI's queue or
+    interrupted. Without an executionId the request applies to the only active
+    execution and is rejected when several are active.
 
     Returns:
     {
         "success": true,
+        "executionId": "exec-xxxxx",
         "message": "Chain execution interrupted"
     }
     """
     try:
-        # Import required modules
-        try:
-            from ..utils.chain_executor import ChainExecutor
-        except ImportError:
-            from utils.chain_executor import ChainExecutor
-
-        # Call interrupt method
-        result = await ChainExecutor.interrupt_execution()
-
+        execution_id = None
+        if request.can_read_body:
+            try:
+                data = await request.json()
+                execution_id = data.get('executionId') if isinstance(data, dict) else None
+            except json.JSONDecodeError:
+                return web.json_response({
+                    "success": False,
+                    "error": "Invalid JSON data"
+                }, status=400)
+
+        if not execution_id:
+            active_ids = chain_registry.active_ids()
+            if not active_ids:
+                return web.json_response({
+                    "success": False,
+                    "error": "No chain execution is running"
+                }, status=404)
+            if len(active_ids) > 1:
+                return web.json_response({
+                    "success": False,
+                    "error": "Several chain executions are active; specify executionId",
+                    "executions": chain_registry.list_executions()
+                }, status=400)
+            execution_id = active_ids[0]
+
+        result = await chain_registry.cancel(execution_id)
+
+        if result is None:
+            return web.json_response({
+                "success": False,
+                "error": f"Chain execution not found: {execution_id}"
+            }, status=404)
         if result.get('success'):
             return web.json_response({
                 "success": True,
-                "message": "Chain execution interrupted"
+                "executionId": execution_id,
+                "message": result.get('message', "Chain execution interrupted")
             })
         else:
             return web.json_response({
@@ -348,6 +408,156 @@ async def interrupt_chain_api(request):
             "error": f"Failed to interrupt chain: {str(e)}"
         }, status=500)
 
+async def list_chain_executions_api(request):
+    """
+    List queued and running chain executions
+    GET /comfymobile/api/chains/executions
+
+    Returns:
+    {
+        "success": true,
+        "executions": [{"executionId", "chainId", "chainName", "status", "queuedAt", "startedAt", "queuePosition"}],
+        "progress": [...]
+    }
+    """
+    try:
+        try:
+            from ..utils.chain_progress_manager import chain_progress_manager
+        except ImportError:
+            from utils.chain_progress_manager import chain_progress_manager
+
+        return web.json_response({
+            "success": True,
+            "executions": chain_registry.list_executions(),
+            "progress": chain_progress_manager.get_all_states()
+        })
+
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to list chain executions: {str(e)}"
+        }, status=500)
+
+async def get_chain_execution_api(request):
+    """
+    Get the status of a chain execution
+    GET /comfymobile/api/chains/executions/{execution_id}
+
+    Returns the queue position of a queued run, step counts and progress of a
+    running one, or the history summary (with per-step timings) of a finished one:
+    {
+        "success": true,
+        "execution": {"executionId", "status", ...},
+        "progress": {...}  // running executions only
+    }
+    """
+    try:
+        execution_id = request.match_info['execution_id']
+
+        status = chain_registry.get_status(execution_id)
+        if status is None:
+            return web.json_response({
+                "success": False,
+                "error": f"Chain execution not found: {execution_id}"
+            }, status=404)
+
+        response = {
+            "success": True,
+            "execution": status
+        }
+        if status['status'] == 'running':
+            try:
+                from ..utils.chain_progress_manager import chain_progress_manager
+            except ImportError:
+                from utils.chain_progress_manager import chain_progress_manager
+            response["progress"] = chain_progress_manager.get_current_state(execution_id)
+
+        return web.json_response(response)
+
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to get chain execution: {str(e)}"
+        }, status=500)
+
+async def get_chain_execution_result_api(request):
+    """
+    Get the result of a finished chain execution
+    GET /comfymobile/api/chains/executions/{execution_id}/result
+
+    Returns 202 with the current status while the chain is still queued or running.
+
+    Returns:
+    {
+        "success": true,
+        "result": {"executionId", "status", "success", "error", "queueMs", "durationMs", "nodeResults": [...]}
+    }
+    """
+    try:
+        execution_id = request.match_info['execution_id']
+
+        record = chain_registry.get_finished(execution_id)
+        if record is not None:
+            return web.json_response({
+                "success": True,
+                "result": record
+            })
+
+        status = chain_registry.get_status(execution_id)
+        if status is not None:
+            return web.json_response({
+                "success": True,
+                "pending": True,
+                "execution": status
+            }, status=202)
+
+        return web.json_response({
+            "success": False,
+            "error": f"Chain execution not found: {execution_id}"
+        }, status=404)
+
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to get chain execution result: {str(e)}"
+        }, status=500)
+
+async def get_chain_history_api(request):
+    """
+    List finished chain executions, newest first
+    GET /comfymobile/api/chains/executions/history?limit=20&chain_id=chain-uuid
+
+    Returns:
+    {
+        "success": true,
+        "history": [{"executionId", "status", "durationMs", "steps": [...]}]
+    }
+    """
+    try:
+        try:
+            limit = int(request.query.get('limit', 0)) or None
+        except ValueError:
+            return web.json_response({
+                "success": False,
+                "error": "limit must be an integer"
+            }, status=400)
+
+        history = chain_registry.get_history()
+        chain_id = request.query.get('chain_id')
+        if chain_id:
+            history = [record for record in history if record.get('chainId') == chain_id]
+
+        return web.json_response({
+            "success": True,
+            "history": history[:limit]
+        })
+
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to get chain history: {str(e)}"
+        }, status=500)
+
 async def save_chain_thumbnail_api(request):
     """
     Save a thumbnail for a workflow node in the chain
@@ -385,7 +595,7 @@ async def save_chain_thumbnail_api(request):
                 "error": "Missing required field: thumbnail"
             }, status=400)
 
-        result = save_chain_thumbnail(chain_id, node_id, thumbnail)
+        result = await run_io(save_chain_thumbnail, chain_id, node_id, thumbnail)
 
         if result['success']:
             return web.json_response({
@@ -427,7 +637,7 @@ async def get_chain_thumbnail_api(request):
         # Extract node_id from filename
         node_id = node_filename.replace('.png', '')
 
-        result = get_chain_thumbnail(chain_id, node_id)
+        result = await run_io(get_chain_thumbnail, chain_id, node_id)
 
         if result['success']:
             filepath = result['filepath']
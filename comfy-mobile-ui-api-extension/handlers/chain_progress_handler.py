@@ -17,7 +17,9 @@ except ImportError:
 async def chain_progress_websocket(request):
     """
     WebSocket endpoint for chain execution progress
-    WS /comfymobile/api/chains/progress
+    WS /comfymobile/api/chains/progress[?executionId=exec-xxxxx]
+
+    Without executionId the client receives progress of every running chain.
     """
     ws = web.WebSocketResponse()
     await ws.prepare(request)
@@ -25,7 +27,7 @@ async def chain_progress_websocket(request):
     print("[ChainProgressWS] Client connected")
 
     # Add client and send initial state
-    await chain_progress_manager.add_client(ws)
+    await chain_progress_manager.add_client(ws, request.query.get('executionId') or None)
 
     try:
         # Keep connection alive and handle incoming messages
@@ -12,14 +12,59 @@ import folder_paths
 from ..utils.file_utils import (
     extract_filename_from_url, ensure_proper_extension, get_final_filename_from_server
 )
+from ..utils.model_index import model_index
+from ..utils.download_scheduler import download_scheduler
+from ..utils.download_journal import download_journal
+from ..utils.http_client import get_http_session
+from ..utils.io_executor import run_io
+from ..utils.segmented_download import (
+    SegmentedDownload, DownloadCancelled, DEFAULT_SEGMENTS, SEGMENTED_MIN_SIZE,
+    get_partial_download_size, load_segment_state, remove_segment_state, probe_remote_file
+)
 
 # Global variables for download task management
 download_task_counter = 0
 download_tasks = {}
 
+# Statuses of downloads that were interrupted by a restart and should resume
+ACTIVE_DOWNLOAD_STATUSES = ['queued', 'starting', 'downloading', 'retrying']
+
+# Seconds between journal records of a running download's progress
+JOURNAL_PROGRESS_INTERVAL = 30.0
+
+def create_download_task(url, filename, target_folder, target_path, segments=DEFAULT_SEGMENTS, priority=0):
+    """Build a new queued download task with a unique ID"""
+    global download_task_counter
+    
+    download_task_counter += 1
+    return {
+        "id": f"download_{download_task_counter}_{int(time.time())}",
+        "url": url,
+        "filename": filename,
+        "target_folder": target_folder,
+        "target_path": target_path,
+        "status": "queued",
+        "priority": priority,
+        "progress": 0,
+        "total_size": 0,
+        "downloaded_size": 0,
+        "speed": 0,
+        "eta": 0,
+        "created_at": time.time(),
+        "started_at": None,
+        "completed_at": None,
+        "error": None,
+        "cancelled": False,
+        "supports_resume": None,  # Probed on the first attempt
+        "segments": segments,
+        "segmented": False,
+        "retry_count": 0,
+        "max_retries": 3
+    }
+
 async def download_model_file(request):
     """Start downloading a model file from URL to specified folder"""
-    global download_task_counter, download_tasks
+    global download_tasks
     
     try:
         data = await request.json()
@@ -37,6 +82,19 @@ async def download_model_file(request):
         target_folder = data['target_folder']
         filename = data.get('filename')  # Optional - can be extracted from URL
         overwrite = data.get('overwrite', False)
+        segments = data.get('segments', DEFAULT_SEGMENTS)  # Parallel ranges; 1 disables segmented mode
+        priority = data.get('priority', 0)  # Higher starts first
+        
+        if not isinstance(segments, int) or segments < 1:
+            return web.json_response({
+                "success": False,
+                "error": "'segments' must be a positive integer"
+            }, status=400)
+        if not isinstance(priority, int):
+            return web.json_response({
+                "success": False,
+                "error": "'priority' must be an integer"
+            }, status=400)
         
         # Validate URL format
         import urllib.parse
@@ -104,46 +162,20 @@ async def download_model_file(request):
                 "error": f"Target file already exists: {filename}. Set 'overwrite': true to replace it."
             }, status=409)
         
-        # Generate unique task ID
-        download_task_counter += 1
-        task_id = f"download_{download_task_counter}_{int(time.time())}"
-        
         # Check for existing partial download
         temp_path = target_file_path + ".downloading"
-        partial_size = 0
-        if os.path.exists(temp_path):
-            try:
-                partial_size = os.path.getsize(temp_path)
-            except:
-                partial_size = 0
+        partial_size = get_partial_download_size(temp_path)
         
         # Create download task info
-        task_info = {
-            "id": task_id,
-            "url": url,
-            "filename": filename,
-            "target_folder": target_folder,
-            "target_path": target_file_path,
-            "status": "starting",
-            "progress": 0,
-            "total_size": 0,
-            "downloaded_size": partial_size,
-            "speed": 0,
-            "eta": 0,
-            "created_at": time.time(),
-            "started_at": None,
-            "completed_at": None,
-            "error": None,
-            "cancelled": False,
-            "supports_resume": False,
-            "retry_count": 0,
-            "max_retries": 3
-        }
+        task_info = create_download_task(url, filename, target_folder, target_file_path, segments, priority)
+        task_id = task_info["id"]
+        task_info["downloaded_size"] = partial_size
         
         download_tasks[task_id] = task_info
+        download_journal.record(task_info)
         
-        # Start download task asynchronously
-        asyncio.create_task(perform_download(task_id))
+        # Queue the download; the scheduler starts it when a slot is free
+        schedule_download(task_info)
         
         response_data = {
             "success": True,
@@ -198,17 +230,19 @@ async def resume_download(request):
                 "error": f"Cannot resume task with status: {task['status']}"
             }, status=400)
         
+        # A cancelled download stops at its next chunk; it must not share the partial file with a new run
+        if download_scheduler.is_running(task_id):
+            return web.json_response({
+                "success": False,
+                "error": "The previous run of this download is still stopping; try again shortly"
+            }, status=409)
+        
         # Check if partial file exists
         temp_path = task["target_path"] + ".downloading"
-        partial_size = 0
-        if os.path.exists(temp_path):
-            try:
-                partial_size = os.path.getsize(temp_path)
-            except:
-                partial_size = 0
+        partial_size = get_partial_download_size(temp_path)
         
         # Reset task status for resume
-        task["status"] = "starting"
+        task["status"] = "queued"
         task["cancelled"] = False
         task["error"] = None
         task["downloaded_size"] = partial_size
@@ -216,9 +250,10 @@ async def resume_download(request):
         task["started_at"] = None
         task["completed_at"] = None
         task["retry_count"] = 0
+        download_journal.record(task)
         
-        # Start download task asynchronously
-        asyncio.create_task(perform_download(task_id))
+        # Queue the download; the scheduler starts it when a slot is free
+        schedule_download(task)
         
         response_data = {
             "success": True,
@@ -260,18 +295,21 @@ async def retry_all_failed_downloads(request):
         retry_results = []
         
         for task in failed_tasks:
+            if download_scheduler.is_running(task["id"]):
+                retry_results.append({
+                    "task_id": task["id"],
+                    "filename": task["filename"],
+                    "status": "failed_to_restart",
+                    "error": "The previous run of this download is still stopping"
+                })
+                continue
             try:
                 # Check if partial file exists
                 temp_path = task["target_path"] + ".downloading"
-                partial_size = 0
-                if os.path.exists(temp_path):
-                    try:
-                        partial_size = os.path.getsize(temp_path)
-                    except:
-                        partial_size = 0
+                partial_size = get_partial_download_size(temp_path)
                 
                 # Reset task status for retry
-                task["status"] = "starting"
+                task["status"] = "queued"
                 task["cancelled"] = False
                 task["error"] = None
                 task["downloaded_size"] = partial_size
@@ -279,9 +317,10 @@ async def retry_all_failed_downloads(request):
                 task["started_at"] = None
                 task["completed_at"] = None
                 task["retry_count"] = 0
+                download_journal.record(task)
                 
-                # Start download task asynchronously
-                asyncio.create_task(perform_download(task["id"]))
+                # Queue the download; the scheduler starts it when a slot is free
+                schedule_download(task)
                 retried_count += 1
                 
                 retry_results.append({
@@ -314,6 +353,92 @@ async def retry_all_failed_downloads(request):
         }, status=500)
 
 
+def schedule_download(task):
+    """Hand a task to the download scheduler (concurrency, per-host and bandwidth limits)"""
+    task_id = task["id"]
+    download_scheduler.submit(task_id, task["url"], lambda: perform_download(task_id), task.get("priority", 0))
+
+
+def restore_download_tasks():
+    """Rehydrate download tasks from the journal at startup; interrupted ones are queued again"""
+    global download_task_counter
+    
+    restored = 0
+    for record in download_journal.load():
+        task = dict(record, speed=0, eta=0, cancelled=False)
+        if task["status"] in ACTIVE_DOWNLOAD_STATUSES:
+            task["status"] = "queued"
+            task["started_at"] = None
+            task["error"] = None
+            task["downloaded_size"] = get_partial_download_size(task["target_path"] + ".downloading")
+            restored += 1
+        download_tasks[task["id"]] = task
+        
+        # IDs look like download_<counter>_<timestamp>
+        try:
+            download_task_counter = max(download_task_counter, int(task["id"].split("_")[1]))
+        except (IndexError, ValueError):
+            pass
+    
+    if restored:
+        print(f"🔄 Restored {restored} interrupted download(s) from the journal")
+
+def find_orphaned_downloads(known_paths):
+    """Partial segmented downloads under models/ that no task refers to, as (temp_path, url)"""
+    models_path = os.path.join(folder_paths.base_path, "models")
+    orphans = []
+    visited_inodes = set()
+    for root, dirs, files in os.walk(models_path, followlinks=True):
+        # Guard against symlink loops
+        try:
+            dir_stat = os.stat(root)
+        except OSError:
+            dirs[:] = []
+            continue
+        inode_key = (dir_stat.st_dev, dir_stat.st_ino)
+        if inode_key in visited_inodes:
+            dirs[:] = []
+            continue
+        visited_inodes.add(inode_key)
+        for name in files:
+            if not name.endswith(".downloading"):
+                continue
+            temp_path = os.path.join(root, name)
+            if temp_path[:-len(".downloading")] in known_paths:
+                continue
+            # Only segmented downloads record their URL next to the partial file
+            state = load_segment_state(temp_path)
+            if state is None or not state.get("url"):
+                print(f"⚠️ Partial download without a known URL, not resumed: {temp_path}")
+                continue
+            orphans.append((temp_path, state["url"]))
+    return orphans
+
+async def resume_restored_downloads(app=None):
+    """Re-attach orphaned partial files and queue every restored download (aiohttp on_startup hook)"""
+    known_paths = {task["target_path"] for task in download_tasks.values()}
+    try:
+        orphans = await run_io(find_orphaned_downloads, known_paths)
+    except Exception as e:
+        print(f"⚠️ Failed to scan for partial downloads: {e}")
+        orphans = []
+    
+    models_path = os.path.join(folder_paths.base_path, "models")
+    for temp_path, url in orphans:
+        target_path = temp_path[:-len(".downloading")]
+        task = create_download_task(
+            url, os.path.basename(target_path),
+            os.path.relpath(os.path.dirname(target_path), models_path).replace(os.sep, "/"), target_path
+        )
+        task["downloaded_size"] = get_partial_download_size(temp_path)
+        download_tasks[task["id"]] = task
+        download_journal.record(task)
+        print(f"🔗 Re-attached partial download: {task['filename']}")
+    
+    for task in list(download_tasks.values()):
+        if task["status"] == "queued":
+            schedule_download(task)
+
 async def check_server_support_resume(session, url):
     """Check if server supports HTTP Range requests"""
     try:
@@ -330,13 +455,49 @@ async def check_server_support_resume(session, url):
             return False
 
 async def get_downloaded_size(temp_path):
-    """Get size of partially downloaded file"""
-    if os.path.exists(temp_path):
-        try:
-            return os.path.getsize(temp_path)
-        except:
-            return 0
-    return 0
+    """Get number of bytes already downloaded into a partial file"""
+    return get_partial_download_size(temp_path)
+
+def make_progress_tracker(task, downloaded):
+    """Return a callback that records downloaded bytes, progress, speed and ETA on the task"""
+    last = {"time": time.time(), "downloaded": downloaded, "journaled": time.time()}
+    
+    def update(downloaded):
+        task["downloaded_size"] = downloaded
+        
+        # Update progress and speed
+        current_time = time.time()
+        if task["total_size"] > 0:
+            task["progress"] = (downloaded / task["total_size"]) * 100
+        
+        # Calculate speed and ETA every few chunks
+        time_diff = current_time - last["time"]
+        if time_diff >= 2.0:  # Update every 2 seconds
+            bytes_diff = downloaded - last["downloaded"]
+            task["speed"] = bytes_diff / time_diff  # bytes per second
+            
+            if task["speed"] > 0 and task["total_size"] > 0:
+                remaining_bytes = task["total_size"] - downloaded
+                task["eta"] = remaining_bytes / task["speed"]
+            
+            # Progress logging
+            progress_mb = downloaded / (1024 * 1024)
+            total_mb = task["total_size"] / (1024 * 1024) if task["total_size"] > 0 else 0
+            speed_mbps = task["speed"] / (1024 * 1024) if task["speed"] > 0 else 0
+            
+            if total_mb > 0:
+                print(f"📥 {task['filename']}: {progress_mb:.1f}/{total_mb:.1f} MB ({task['progress']:.1f}%) - {speed_mbps:.2f} MB/s")
+            else:
+                print(f"📥 {task['filename']}: {progress_mb:.1f} MB - {speed_mbps:.2f} MB/s")
+            
+            last["time"] = current_time
+            last["downloaded"] = downloaded
+            
+            if current_time - last["journaled"] >= JOURNAL_PROGRESS_INTERVAL:
+                download_journal.record(task)
+                last["journaled"] = current_time
+    
+    return update
 
 async def perform_download(task_id):
     """Background task to perform the actual download with resume support"""
@@ -352,9 +513,7 @@ async def perform_download(task_id):
     try:
         task["status"] = "downloading"
         task["started_at"] = time.time()
-        
-        import aiohttp
-        import aiofiles
+        download_journal.record(task)
         
         # Create temp filename to avoid partial files
         temp_path = task["target_path"] + ".downloading"
@@ -369,114 +528,117 @@ async def perform_download(task_id):
         
         while retry_count <= max_retries:
             try:
-                timeout = aiohttp.ClientTimeout(total=None, connect=30, sock_read=30)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    
-                    # Check if server supports resume (cache result in task)
-                    if "supports_resume" not in task or task["supports_resume"] is None:
-                        supports_resume = await check_server_support_resume(session, task["url"])
-                        task["supports_resume"] = supports_resume
-                    else:
-                        supports_resume = task["supports_resume"]
-                    
-                    # Prepare headers for resume if supported and needed
-                    headers = {}
-                    if supports_resume and downloaded > 0:
-                        headers['Range'] = f'bytes={downloaded}-'
-                        print(f"🔄 Requesting resume from byte {downloaded:,}")
-                    elif downloaded > 0 and not supports_resume:
-                        print("⚠️ Server doesn't support resume, starting over")
+                # Shared pool: keep-alive connections survive across retries and downloads
+                session = get_http_session()
+                
+                # Check if server supports resume (cache result in task)
+                if "supports_resume" not in task or task["supports_resume"] is None:
+                    supports_resume = await check_server_support_resume(session, task["url"])
+                    task["supports_resume"] = supports_resume
+                else:
+                    supports_resume = task["supports_resume"]
+                
+                # Segmented mode: parallel ranges for large files when the server accepts them.
+                # A single-stream partial file (no segment state) keeps resuming as a single stream.
+                segment_count = task.get("segments", DEFAULT_SEGMENTS)
+                if supports_resume and segment_count > 1 and (downloaded == 0 or load_segment_state(temp_path)):
+                    total_size = await probe_remote_file(session, task["url"])
+                    if total_size and total_size >= SEGMENTED_MIN_SIZE:
+                        task["total_size"] = total_size
+                        task["segmented"] = True
+                        segmented = SegmentedDownload(task["url"], temp_path, total_size, segment_count)
+                        if downloaded > 0:
+                            print(f"🔄 Resuming {len(segmented.segments)} segments from {segmented.downloaded:,} bytes")
+                        else:
+                            print(f"⚡ Segmented download with {len(segmented.segments)} parallel ranges")
+                        
+                        await segmented.run(
+                            session,
+                            lambda: task.get("cancelled", False),
+                            make_progress_tracker(task, segmented.downloaded),
+                            download_scheduler.throttle
+                        )
+                        segmented.finish()
+                        break
+                
+                # Prepare headers for resume if supported and needed
+                headers = {}
+                if supports_resume and downloaded > 0:
+                    headers['Range'] = f'bytes={downloaded}-'
+                    print(f"🔄 Requesting resume from byte {downloaded:,}")
+                elif downloaded > 0 and not supports_resume:
+                    print("⚠️ Server doesn't support resume, starting over")
+                    downloaded = 0
+                    task["downloaded_size"] = 0
+                    # Remove partial file since we can't resume
+                    try:
+                        os.remove(temp_path)
+                    except:
+                        pass
+                    remove_segment_state(temp_path)
+                
+                async with session.get(task["url"], headers=headers) as response:
+                    # Check response status
+                    if headers.get('Range') and response.status == 206:
+                        print("✅ Resume request accepted (HTTP 206)")
+                    elif headers.get('Range') and response.status == 200:
+                        print("⚠️ Resume request ignored, downloading full file")
                         downloaded = 0
                         task["downloaded_size"] = 0
-                        # Remove partial file since we can't resume
+                        # Remove partial file since server sent full content
                         try:
                             os.remove(temp_path)
                         except:
                             pass
+                    elif response.status != 200:
+                        raise aiohttp.ClientError(f"HTTP {response.status}: {response.reason}")
                     
-                    async with session.get(task["url"], headers=headers) as response:
-                        # Check response status
-                        if headers.get('Range') and response.status == 206:
-                            print("✅ Resume request accepted (HTTP 206)")
-                        elif headers.get('Range') and response.status == 200:
-                            print("⚠️ Resume request ignored, downloading full file")
-                            downloaded = 0
-                            task["downloaded_size"] = 0
-                            # Remove partial file since server sent full content
+                    # Get file size
+                    if response.status == 206:
+                        # For partial content, parse Content-Range header
+                        content_range = response.headers.get('content-range', '')
+                        if content_range:
+                            # Format: "bytes start-end/total"
                             try:
-                                os.remove(temp_path)
+                                total_size = int(content_range.split('/')[-1])
+                                task["total_size"] = total_size
                             except:
                                 pass
-                        elif response.status != 200:
-                            raise aiohttp.ClientError(f"HTTP {response.status}: {response.reason}")
-                        
-                        # Get file size
-                        if response.status == 206:
-                            # For partial content, parse Content-Range header
-                            content_range = response.headers.get('content-range', '')
-                            if content_range:
-                                # Format: "bytes start-end/total"
-                                try:
-                                    total_size = int(content_range.split('/')[-1])
-                                    task["total_size"] = total_size
-                                except:
-                                    pass
-                        else:
-                            # For full content, use Content-Length
-                            content_length = response.headers.get('content-length')
-                            if content_length:
-                                task["total_size"] = int(content_length)
-                        
-                        # Open file for append if resuming, write if starting fresh
-                        file_mode = 'ab' if downloaded > 0 else 'wb'
-                        
-                        # Download file in chunks
-                        chunk_size = 64 * 1024  # 64KB chunks for better performance
-                        last_time = time.time()
-                        last_downloaded = downloaded
-                        
-                        async with aiofiles.open(temp_path, file_mode) as file:
-                            async for chunk in response.content.iter_chunked(chunk_size):
-                                if task.get("cancelled", False):
-                                    task["status"] = "cancelled"
-                                    print(f"❌ Download cancelled: {task['filename']}")
-                                    return
-                                
-                                await file.write(chunk)
-                                downloaded += len(chunk)
-                                task["downloaded_size"] = downloaded
-                                
-                                # Update progress and speed
-                                current_time = time.time()
-                                if task["total_size"] > 0:
-                                    task["progress"] = (downloaded / task["total_size"]) * 100
-                                
-                                # Calculate speed and ETA every few chunks
-                                time_diff = current_time - last_time
-                                if time_diff >= 2.0:  # Update every 2 seconds
-                                    bytes_diff = downloaded - last_downloaded
-                                    task["speed"] = bytes_diff / time_diff  # bytes per second
-                                    
-                                    if task["speed"] > 0 and task["total_size"] > 0:
-                                        remaining_bytes = task["total_size"] - downloaded
-                                        task["eta"] = remaining_bytes / task["speed"]
-                                    
-                                    # Progress logging
-                                    progress_mb = downloaded / (1024 * 1024)
-                                    total_mb = task["total_size"] / (1024 * 1024) if task["total_size"] > 0 else 0
-                                    speed_mbps = task["speed"] / (1024 * 1024) if task["speed"] > 0 else 0
-                                    
-                                    if total_mb > 0:
-                                        print(f"📥 {task['filename']}: {progress_mb:.1f}/{total_mb:.1f} MB ({task['progress']:.1f}%) - {speed_mbps:.2f} MB/s")
-                                    else:
-                                        print(f"📥 {task['filename']}: {progress_mb:.1f} MB - {speed_mbps:.2f} MB/s")
-                                    
-                                    last_time = current_time
-                                    last_downloaded = downloaded
-                
+                    else:
+                        # For full content, use Content-Length
+                        content_length = response.headers.get('content-length')
+                        if content_length:
+                            task["total_size"] = int(content_length)
+                    
+                    # Open file for append if resuming, write if starting fresh
+                    file_mode = 'ab' if downloaded > 0 else 'wb'
+                    
+                    # Download file in chunks
+                    chunk_size = 64 * 1024  # 64KB chunks for better performance
+                    track_progress = make_progress_tracker(task, downloaded)
+                    
+                    async with aiofiles.open(temp_path, file_mode) as file:
+                        async for chunk in response.content.iter_chunked(chunk_size):
+                            if task.get("cancelled", False):
+                                raise DownloadCancelled()
+                            
+                            await download_scheduler.throttle(len(chunk))
+                            await file.write(chunk)
+                            downloaded += len(chunk)
+                            track_progress(downloaded)
+            
                 # Download completed successfully
                 break
                 
+            except DownloadCancelled:
+                task["status"] = "cancelled"
+                download_journal.record(task)
+                print(f"❌ Download cancelled: {task['filename']}")
+                # cancel_download removes the partial file; drop the segment state written on exit too
+                if not os.path.exists(temp_path):
+                    remove_segment_state(temp_path)
+                return
+                
             except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
                 retry_count += 1
                 task["retry_count"] = retry_count
@@ -488,6 +650,7 @@ async def perform_download(task_id):
                     
                     task["status"] = "retrying"
                     task["error"] = f"Retry {retry_count}/{max_retries}: {str(e)}"
+                    download_journal.record(task)
                     await asyncio.sleep(wait_time)
                     
                     # Update downloaded size for next attempt
@@ -532,13 +695,16 @@ async def perform_download(task_id):
                 except Exception as e:
                     print(f"⚠️ Failed to extract ZIP file: {task['filename']} - {str(e)}")
 
+        model_index.mark_dirty(task["target_path"])
         task["status"] = "completed"
         task["completed_at"] = time.time()
         task["progress"] = 100
+        download_journal.record(task)
         
     except Exception as e:
         task["status"] = "error"
         task["error"] = str(e)
+        download_journal.record(task)
         print(f"❌ Download failed: {task['filename']} - {str(e)}")
         
         # Don't clean up temp file on error - keep for potential resume
@@ -572,16 +738,19 @@ async def cancel_download(request):
                 "error": f"Cannot cancel task with status: {task['status']}"
             }, status=400)
         
-        # Mark task as cancelled
+        # Mark task as cancelled (and drop it from the queue if it has not started)
+        download_scheduler.remove(task_id)
         task["cancelled"] = True
         task["status"] = "cancelled"
         task["completed_at"] = time.time()
+        download_journal.record(task)
         
         # Clean up partial download file if it exists
         temp_path = task["target_path"] + ".downloading"
         try:
             if os.path.exists(temp_path):
                 os.remove(temp_path)
+            remove_segment_state(temp_path)
         except Exception as e:
             # Log the error but don't fail the cancellation
             print(f"Warning: Could not clean up temp file {temp_path}: {str(e)}")
@@ -647,7 +816,10 @@ async def list_downloads(request):
                 "started_at": task["started_at"],
                 "completed_at": task["completed_at"],
                 "error": task["error"],
-                "supports_resume": task.get("supports_resume", False),
+                "supports_resume": task.get("supports_resume") or False,
+                "segmented": task.get("segmented", False),
+                "priority": task.get("priority", 0),
+                "queue_position": download_scheduler.queue_position(task["id"]),
                 "retry_count": task.get("retry_count", 0),
                 "max_retries": task.get("max_retries", 3),
                 "can_resume": task["status"] in ["error", "cancelled"] and task.get("downloaded_size", 0) > 0
@@ -658,7 +830,8 @@ async def list_downloads(request):
         summary = {
             "total_tasks": len(all_tasks),
             "returned_tasks": len(clean_tasks),
-            "by_status": {}
+            "by_status": {},
+            "scheduler": download_scheduler.get_settings()
         }
         
         # Count tasks by status
@@ -691,16 +864,17 @@ async def clear_download_history(request):
         
         if preserve_active:
             # Keep only actively downloading tasks
-            active_statuses = ['starting', 'downloading']
             active_tasks = {
                 task_id: task for task_id, task in download_tasks.items() 
-                if task["status"] in active_statuses
+                if task["status"] in ACTIVE_DOWNLOAD_STATUSES
             }
             cleared_count = total_before - len(active_tasks)
+            download_journal.remove([task_id for task_id in download_tasks if task_id not in active_tasks])
             download_tasks = active_tasks
         else:
             # Clear all tasks
             cleared_count = total_before
+            download_journal.remove(list(download_tasks))
             download_tasks.clear()
         
         return web.json_response({
@@ -716,3 +890,76 @@ async def clear_download_history(request):
             "error": f"Failed to clear download history: {str(e)}"
         }, status=500)
 
+async def set_download_priority(request):
+    """Change the priority of a queued download"""
+    try:
+        task_id = request.match_info['task_id']
+        data = await request.json()
+        priority = data.get('priority')
+        
+        if not isinstance(priority, int):
+            return web.json_response({
+                "success": False,
+                "error": "'priority' must be an integer"
+            }, status=400)
+        
+        if task_id not in download_tasks:
+            return web.json_response({
+                "success": False,
+                "error": f"Download task not found: {task_id}"
+            }, status=404)
+        
+        task = download_tasks[task_id]
+        if not download_scheduler.set_priority(task_id, priority):
+            return web.json_response({
+                "success": False,
+                "error": f"Cannot change priority of task with status: {task['status']}"
+            }, status=400)
+        task["priority"] = priority
+        download_journal.record(task)
+        
+        return web.json_response({
+            "success": True,
+            "task_id": task_id,
+            "priority": priority,
+            "queue_position": download_scheduler.queue_position(task_id)
+        })
+        
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to set priority: {str(e)}"
+        }, status=500)
+
+async def get_download_scheduler_settings(request):
+    """Get download concurrency/bandwidth limits and current queue load"""
+    return web.json_response({
+        "success": True,
+        "settings": download_scheduler.get_settings()
+    })
+
+async def update_download_scheduler_settings(request):
+    """Update max_concurrent, per_host_limit and bandwidth_limit (bytes/s, 0 = unlimited)"""
+    try:
+        data = await request.json()
+        for field in ('max_concurrent', 'per_host_limit', 'bandwidth_limit'):
+            if field in data and not isinstance(data[field], int):
+                return web.json_response({
+                    "success": False,
+                    "error": f"'{field}' must be an integer"
+                }, status=400)
+        
+        download_scheduler.configure(
+            data.get('max_concurrent'), data.get('per_host_limit'), data.get('bandwidth_limit')
+        )
+        
+        return web.json_response({
+            "success": True,
+            "settings": download_scheduler.get_settings()
+        })
+        
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to update scheduler settings: {str(e)}"
+        }, status=500)
@@ -2,15 +2,28 @@ import os
 import shutil
 import io
 import time
-import hashlib
+import json
+import struct
+import asyncio
 from typing import Dict, List, Any, Optional
 from aiohttp import web
-from PIL import Image
 import folder_paths
 from ..utils.file_utils import (
     scan_directory_recursive, categorize_files, validate_filename, 
     build_file_path, is_video_file, find_matching_thumbnail
 )
+from ..utils.media_index import media_index, DEFAULT_PAGE_SIZE
+from ..utils.io_executor import run_io
+from ..utils.thumbnail_service import (
+    thumbnail_service, ThumbnailBusyError, RETRY_AFTER,
+    THUMBNAIL_FORMATS, THUMBNAIL_MAX_AGE, negotiate_format
+)
+
+# Batch thumbnail endpoint limits
+BATCH_MAX_ITEMS = 200
+BATCH_CONCURRENCY = 8
+BATCH_CONTENT_TYPE = "application/x-comfymobile-thumbnail-frames"
+
 
 def get_folder_path(folder_type: str) -> str:
     """Get the absolute path for a folder type"""
@@ -23,19 +36,106 @@ def get_folder_path(folder_type: str) -> str:
     else:
         raise ValueError(f"Invalid folder type: {folder_type}")
 
+def is_paginated_request(request) -> bool:
+    """Paginated listing is used when the client passes limit or after"""
+    return 'limit' in request.query or 'after' in request.query
+
+def wants_placeholders(request) -> bool:
+    """Whether the client asked for image placeholders (?placeholders=true)"""
+    return request.query.get('placeholders', '').lower() in ('1', 'true', 'yes')
+
+
+def with_placeholders(files: List[Dict[str, Any]], copy: bool = True) -> List[Dict[str, Any]]:
+    """Attach precomputed {width, height, color} placeholders (None until computed)"""
+    if copy:
+        files = [dict(file_data) for file_data in files]
+    for file_data in files:
+        file_data["placeholder"] = media_index.get_placeholder(file_data)
+    return files
+
+
+def parse_page_params(query) -> Dict[str, Any]:
+    """
+    Parse pagination and filter query params for file listings.
+    Query params: limit, after, category, extension (or ext), subfolder, since, until
+    Comma-separated values are accepted for category and extension.
+    """
+    def parse_set(name):
+        value = query.get(name, '').strip()
+        if not value:
+            return None
+        return {item.strip().lower().lstrip('.') for item in value.split(',') if item.strip()}
+
+    def parse_time(name):
+        value = query.get(name)
+        if value is None or value == '':
+            return None
+        return float(value)
+
+    categories = parse_set('category')
+    if categories and not categories <= {'images', 'videos', 'files'}:
+        raise ValueError("Invalid category. Must be 'images', 'videos', or 'files'")
+
+    return {
+        "limit": int(query.get('limit', DEFAULT_PAGE_SIZE)),
+        "after": query.get('after') or None,
+        "categories": categories,
+        "extensions": parse_set('extension') or parse_set('ext'),
+        "subfolder": query.get('subfolder'),
+        "since": parse_time('since'),
+        "until": parse_time('until')
+    }
+
+def list_files_page(request, folder_types: List[str]):
+    """Build a keyset-paginated file listing response"""
+    try:
+        params = parse_page_params(request.query)
+        page = media_index.page(folder_types, **params)
+    except ValueError as e:
+        return web.json_response({
+            "status": "error",
+            "message": str(e)
+        }, status=400)
+
+    items = page["items"]
+    if wants_placeholders(request):
+        items = with_placeholders(items, copy=False)
+
+    return web.json_response({
+        "status": "success",
+        "items": items,
+        "count": len(items),
+        "next_cursor": page["next_cursor"],
+        "has_more": page["has_more"],
+        "stats": {
+            "by_folder": page["counts"]
+        }
+    })
+
 async def list_all_files(request):
-    """List all files from input, temp, and output directories with subfolder information"""
+    """List all files from input, temp, and output directories with subfolder information
+    
+    Pass limit/after (plus optional category, extension, subfolder, since, until)
+    to get a cursor-paginated, newest-first page instead of the full listing.
+    Pass placeholders=true to include image dimensions and dominant color.
+    """
     try:
-        # Get ComfyUI folder paths
-        input_path = folder_paths.get_input_directory()
-        output_path = folder_paths.get_output_directory() 
-        temp_path = folder_paths.get_temp_directory()
+        if is_paginated_request(request):
+            return list_files_page(request, ['input', 'output', 'temp'])
         
-        # Scan all directories
+        # Read all directories from the media index (scans only folders the watcher doesn't cover)
+        files_by_folder = {
+            folder_type: media_index.get_files(folder_type)
+            for folder_type in ("input", "output", "temp")
+        }
+        if wants_placeholders(request):
+            files_by_folder = {
+                folder_type: with_placeholders(folder_files)
+                for folder_type, folder_files in files_by_folder.items()
+            }
         all_files = []
-        all_files.extend(scan_directory_recursive(input_path, "input"))
-        all_files.extend(scan_directory_recursive(output_path, "output"))
-        all_files.extend(scan_directory_recursive(temp_path, "temp"))
+        for folder_files in files_by_folder.values():
+            all_files.extend(folder_files)
         
         # Sort by modification time (newest first)
         all_files.sort(key=lambda x: x["modified"], reverse=True)
@@ -52,9 +152,8 @@ async def list_all_files(request):
                 "files": len(categorized["files"])
             },
             "by_folder": {
-                "input": len([f for f in all_files if f["type"] == "input"]),
-                "output": len([f for f in all_files if f["type"] == "output"]),
-                "temp": len([f for f in all_files if f["type"] == "temp"])
+                folder_type: len(folder_files)
+                for folder_type, folder_files in files_by_folder.items()
             }
         }
         
@@ -73,7 +172,10 @@ async def list_all_files(request):
         }, status=500)
 
 async def list_files_by_type(request):
-    """List files from a specific folder type (input, output, temp)"""
+    """List files from a specific folder type (input, output, temp)
+    
+    Accepts the same pagination and placeholders params as list_all_files.
+    """
     try:
         folder_type = request.match_info['folder_type'].lower()
         
@@ -83,6 +185,9 @@ async def list_files_by_type(request):
                 "message": "Invalid folder type. Must be 'input', 'output', or 'temp'"
             }, status=400)
         
+        if is_paginated_request(request):
+            return list_files_page(request, [folder_type])
+        
         # Get appropriate folder path
         if folder_type == "input":
             base_path = folder_paths.get_input_directory()
@@ -91,11 +196,10 @@ async def list_files_by_type(request):
         else:  # temp
             base_path = folder_paths.get_temp_directory()
         
-        # Scan directory
-        files = scan_directory_recursive(base_path, folder_type)
-        
-        # Sort by modification time (newest first)
-        files.sort(key=lambda x: x["modified"], reverse=True)
+        # Read directory from the media index (already newest first)
+        files = media_index.get_files(folder_type)
+        if wants_placeholders(request):
+            files = with_placeholders(files)
         
         # Categorize files
         categorized = categorize_files(files)
@@ -127,6 +231,241 @@ async def list_files_by_type(request):
         }, status=500)
 
 
+def delete_one_file(file_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Delete one file (blocking; run through run_io)"""
+    filename = file_info.get('filename')
+    subfolder = file_info.get('subfolder', '')
+    folder_type = file_info.get('type', 'output')
+    
+    try:
+        # Validate inputs
+        if not validate_filename(filename):
+            return {
+                "filename": filename,
+                "status": "error",
+                "message": "Invalid filename"
+            }
+        
+        if folder_type not in ['input', 'output', 'temp']:
+            return {
+                "filename": filename,
+                "status": "error", 
+                "message": f"Invalid folder type: {folder_type}"
+            }
+        
+        # Build file path
+        file_path = build_file_path(folder_type, filename, subfolder)
+        
+        # Check if file exists
+        if not os.path.exists(file_path):
+            return {
+                "filename": filename,
+                "status": "error",
+                "message": "File not found"
+            }
+        
+        # Delete file
+        os.remove(file_path)
+        thumbnail_service.cache.purge_source(file_path)
+        
+        print(f"✅ Deleted file: {file_path}")
+        return {
+            "filename": filename,
+            "subfolder": subfolder,
+            "type": folder_type,
+            "status": "success",
+            "message": "File deleted successfully"
+        }
+        
+    except Exception as e:
+        return {
+            "filename": filename,
+            "status": "error",
+            "message": str(e)
+        }
+
+def move_one_file(file_info: Dict[str, Any], destination_type: str) -> Dict[str, Any]:
+    """Move one file to another folder type (blocking; run through run_io)"""
+    filename = file_info.get('filename')
+    subfolder = file_info.get('subfolder', '')
+    source_type = file_info.get('type', 'output')
+    
+    try:
+        # Validate inputs
+        if not validate_filename(filename):
+            return {
+                "filename": filename,
+                "status": "error",
+                "message": "Invalid filename"
+            }
+        
+        if source_type not in ['input', 'output', 'temp']:
+            return {
+                "filename": filename,
+                "status": "error",
+                "message": f"Invalid source folder type: {source_type}"
+            }
+        
+        # Skip if source and destination are the same
+        if source_type == destination_type:
+            return {
+                "filename": filename,
+                "status": "skipped",
+                "message": "Source and destination are the same"
+            }
+        
+        # Build source and destination paths
+        source_path = build_file_path(source_type, filename, subfolder)
+        destination_path = build_file_path(destination_type, filename, subfolder)
+        
+        # Check if source file exists
+        if not os.path.exists(source_path):
+            return {
+                "filename": filename,
+                "status": "error",
+                "message": "Source file not found"
+            }
+        
+        # Create destination subfolder if needed
+        dest_dir = os.path.dirname(destination_path)
+        if not os.path.exists(dest_dir):
+            os.makedirs(dest_dir, exist_ok=True)
+        
+        # Handle existing destination file
+        if os.path.exists(destination_path):
+            # Create backup name
+            base, ext = os.path.splitext(destination_path)
+            counter = 1
+            while os.path.exists(f"{base}_{counter}{ext}"):
+                counter += 1
+            backup_path = f"{base}_{counter}{ext}"
+            shutil.move(destination_path, backup_path)
+            print(f"📝 Moved existing file to: {backup_path}")
+        
+        # Move file
+        shutil.move(source_path, destination_path)
+        thumbnail_service.cache.purge_source(source_path)
+        # The moved file keeps its mtime, so thumbnails of the replaced file could still match
+        thumbnail_service.cache.purge_source(destination_path)
+        
+        print(f"✅ Moved file: {source_path} -> {destination_path}")
+        return {
+            "filename": filename,
+            "subfolder": subfolder,
+            "source_type": source_type,
+            "destination_type": destination_type,
+            "status": "success",
+            "message": "File moved successfully"
+        }
+        
+    except Exception as e:
+        return {
+            "filename": filename,
+            "status": "error",
+            "message": str(e)
+        }
+
+def copy_one_file(file_info: Dict[str, Any], destination_type: str) -> Dict[str, Any]:
+    """Copy one file to another folder type (blocking; run through run_io)"""
+    filename = file_info.get('filename')
+    subfolder = file_info.get('subfolder', '')
+    source_type = file_info.get('type', 'output')
+    
+    try:
+        # Validate inputs
+        if not validate_filename(filename):
+            return {
+                "filename": filename,
+                "status": "error",
+                "message": "Invalid filename"
+            }
+        
+        if source_type not in ['input', 'output', 'temp']:
+            return {
+                "filename": filename,
+                "status": "error",
+                "message": f"Invalid source folder type: {source_type}"
+            }
+        
+        # Skip if source and destination are the same
+        if source_type == destination_type:
+            return {
+                "filename": filename,
+                "status": "skipped",
+                "message": "Source and destination are the same"
+            }
+        
+        # Build source and destination paths
+        source_path = build_file_path(source_type, filename, subfolder)
+        destination_path = build_file_path(destination_type, filename, subfolder)
+        
+        # Check if source file exists
+        if not os.path.exists(source_path):
+            return {
+                "filename": filename,
+                "status": "error",
+                "message": "Source file not found"
+            }
+        
+        # Create destination subfolder if needed
+        dest_dir = os.path.dirname(destination_path)
+        if not os.path.exists(dest_dir):
+            os.makedirs(dest_dir, exist_ok=True)
+        
+        # Overwrite existing destination file if it exists
+        final_destination_path = destination_path
+        if os.path.exists(destination_path):
+            print(f"📝 File exists, overwriting: {destination_path}")
+        
+        # Copy file (overwrite if exists)
+        shutil.copy2(source_path, final_destination_path)
+        # copy2 keeps the source mtime, so thumbnails of an overwritten file could still match
+        thumbnail_service.cache.purge_source(final_destination_path)
+        
+        # If it's a video file being copied to input folder, also try to copy matching thumbnail
+        thumbnail_copied = False
+        if is_video_file(filename) and destination_type == 'input':
+            matching_thumbnail = find_matching_thumbnail(filename, source_type, subfolder)
+            if matching_thumbnail:
+                try:
+                    # Build paths for thumbnail
+                    thumbnail_source_path = build_file_path(source_type, matching_thumbnail, subfolder)
+                    thumbnail_destination_path = build_file_path(destination_type, matching_thumbnail, subfolder)
+                    
+                    if os.path.exists(thumbnail_source_path):
+                        # Create destination subfolder for thumbnail if needed
+                        thumbnail_dest_dir = os.path.dirname(thumbnail_destination_path)
+                        if not os.path.exists(thumbnail_dest_dir):
+                            os.makedirs(thumbnail_dest_dir, exist_ok=True)
+                        
+                        # Copy thumbnail (overwrite if exists)
+                        shutil.copy2(thumbnail_source_path, thumbnail_destination_path)
+                        thumbnail_service.cache.purge_source(thumbnail_destination_path)
+                        thumbnail_copied = True
+                        print(f"📸 Auto-copied video thumbnail: {thumbnail_source_path} -> {thumbnail_destination_path}")
+                except Exception as thumb_error:
+                    print(f"⚠️ Failed to copy video thumbnail {matching_thumbnail}: {thumb_error}")
+        
+        # Get the final filename for response
+        final_filename = os.path.basename(final_destination_path)
+        
+        print(f"✅ Copied file: {source_path} -> {final_destination_path}{' (with thumbnail)' if thumbnail_copied else ''}")
+        return {
+            "filename": filename,
+            "final_filename": final_filename,
+            "subfolder": subfolder,
+            "source_type": source_type,
+            "destination_type": destination_type,
+            "status": "success",
+            "message": f"File copied successfully{' (with thumbnail)' if thumbnail_copied else ''}"
+        }
+        
+    except Exception as e:
+        return {
+            "filename": filename,
+            "status": "error",
+            "message": str(e)
+        }
 
 async def delete_files(request):
     """Delete one or multiple files"""
@@ -155,60 +494,10 @@ async def delete_files(request):
         deleted_count = 0
         
         for file_info in files_to_delete:
-            filename = file_info.get('filename')
-            subfolder = file_info.get('subfolder', '')
-            folder_type = file_info.get('type', 'output')
-            
-            try:
-                # Validate inputs
-                if not validate_filename(filename):
-                    results.append({
-                        "filename": filename,
-                        "status": "error",
-                        "message": "Invalid filename"
-                    })
-                    continue
-                
-                if folder_type not in ['input', 'output', 'temp']:
-                    results.append({
-                        "filename": filename,
-                        "status": "error", 
-                        "message": f"Invalid folder type: {folder_type}"
-                    })
-                    continue
-                
-                # Build file path
-                file_path = build_file_path(folder_type, filename, subfolder)
-                
-                # Check if file exists
-                if not os.path.exists(file_path):
-                    results.append({
-                        "filename": filename,
-                        "status": "error",
-                        "message": "File not found"
-                    })
-                    continue
-                
-                # Delete file
-                os.remove(file_path)
+            result = await run_io(delete_one_file, file_info)
+            if result["status"] == "success":
                 deleted_count += 1
-                
-                results.append({
-                    "filename": filename,
-                    "subfolder": subfolder,
-                    "type": folder_type,
-                    "status": "success",
-                    "message": "File deleted successfully"
-                })
-                
-                print(f"✅ Deleted file: {file_path}")
-                
-            except Exception as e:
-                results.append({
-                    "filename": filename,
-                    "status": "error",
-                    "message": str(e)
-                })
+            results.append(result)
         
         return web.json_response({
             "status": "success",
@@ -258,87 +547,10 @@ async def move_files(request):
         moved_count = 0
         
         for file_info in files_to_move:
-            filename = file_info.get('filename')
-            subfolder = file_info.get('subfolder', '')
-            source_type = file_info.get('type', 'output')
-            
-            try:
-                # Validate inputs
-                if not validate_filename(filename):
-                    results.append({
-                        "filename": filename,
-                        "status": "error",
-                        "message": "Invalid filename"
-                    })
-                    continue
-                
-                if source_type not in ['input', 'output', 'temp']:
-                    results.append({
-                        "filename": filename,
-                        "status": "error",
-                        "message": f"Invalid source folder type: {source_type}"
-                    })
-                    continue
-                
-                # Skip if source and destination are the same
-                if source_type == destination_type:
-                    results.append({
-                        "filename": filename,
-                        "status": "skipped",
-                        "message": "Source and destination are the same"
-                    })
-                    continue
-                
-                # Build source and destination paths
-                source_path = build_file_path(source_type, filename, subfolder)
-                destination_path = build_file_path(destination_type, filename, subfolder)
-                
-                # Check if source file exists
-                if not os.path.exists(source_path):
-                    results.append({
-                        "filename": filename,
-                        "status": "error",
-                        "message": "Source file not found"
-                    })
-                    continue
-                
-                # Create destination subfolder if needed
-                dest_dir = os.path.dirname(destination_path)
-                if not os.path.exists(dest_dir):
-                    os.makedirs(dest_dir, exist_ok=True)
-                
-                # Handle existing destination file
-                if os.path.exists(destination_path):
-                    # Create backup name
-                    base, ext = os.path.splitext(destination_path)
-                    counter = 1
-                    while os.path.exists(f"{base}_{counter}{ext}"):
-                        counter += 1
-                    backup_path = f"{base}_{counter}{ext}"
-                    shutil.move(destination_path, backup_path)
-                    print(f"📝 Moved existing file to: {backup_path}")
-                
-                # Move file
-                shutil.move(source_path, destination_path)
+            result = await run_io(move_one_file, file_info, destination_type)
+            if result["status"] == "success":
                 moved_count += 1
-                
-                results.append({
-                    "filename": filename,
-                    "subfolder": subfolder,
-                    "source_type": source_type,
-                    "destination_type": destination_type,
-                    "status": "success",
-                    "message": "File moved successfully"
-                })
-                
-                print(f"✅ Moved file: {source_path} -> {destination_path}")
-                
-            except Exception as e:
-                results.append({
-                    "filename": filename,
-                    "status": "error",
-                    "message": str(e)
-                })
+            results.append(result)
         
         return web.json_response({
             "status": "success",
@@ -390,108 +602,10 @@ async def copy_files(request):
         copied_count = 0
         
         for file_info in files_to_copy:
-            filename = file_info.get('filename')
-            subfolder = file_info.get('subfolder', '')
-            source_type = file_info.get('type', 'output')
-            
-            try:
-                # Validate inputs
-                if not validate_filename(filename):
-                    results.append({
-                        "filename": filename,
-                        "status": "error",
-                        "message": "Invalid filename"
-                    })
-                    continue
-                
-                if source_type not in ['input', 'output', 'temp']:
-                    results.append({
-                        "filename": filename,
-                        "status": "error",
-                        "message": f"Invalid source folder type: {source_type}"
-                    })
-                    continue
-                
-                # Skip if source and destination are the same
-                if source_type == destination_type:
-                    results.append({
-                        "filename": filename,
-                        "status": "skipped",
-                        "message": "Source and destination are the same"
-                    })
-                    continue
-                
-                # Build source and destination paths
-                source_path = build_file_path(source_type, filename, subfolder)
-                destination_path = build_file_path(destination_type, filename, subfolder)
-                
-                # Check if source file exists
-                if not os.path.exists(source_path):
-                    results.append({
-                        "filename": filename,
-                        "status": "error",
-                        "message": "Source file not found"
-                    })
-                    continue
-                
-                # Create destination subfolder if needed
-                dest_dir = os.path.dirname(destination_path)
-                if not os.path.exists(dest_dir):
-                    os.makedirs(dest_dir, exist_ok=True)
-                
-                # Overwrite existing destination file if it exists
-                final_destination_path = destination_path
-                if os.path.exists(destination_path):
-                    print(f"📝 File exists, overwriting: {destination_path}")
-                
-                # Copy file (overwrite if exists)
-                shutil.copy2(source_path, final_destination_path)
+            result = await run_io(copy_one_file, file_info, destination_type)
+            if result["status"] == "success":
                 copied_count += 1
-                
-                # If it's a video file being copied to input folder, also try to copy matching thumbnail
-                thumbnail_copied = False
-                if is_video_file(filename) and destination_type == 'input':
-                    matching_thumbnail = find_matching_thumbnail(filename, source_type, subfolder)
-                    if matching_thumbnail:
-                        try:
-                            # Build paths for thumbnail
-                            thumbnail_source_path = build_file_path(source_type, matching_thumbnail, subfolder)
-                            thumbnail_destination_path = build_file_path(destination_type, matching_thumbnail, subfolder)
-                            
-                            if os.path.exists(thumbnail_source_path):
-                                # Create destination subfolder for thumbnail if needed
-                                thumbnail_dest_dir = os.path.dirname(thumbnail_destination_path)
-                                if not os.path.exists(thumbnail_dest_dir):
-                                    os.makedirs(thumbnail_dest_dir, exist_ok=True)
-                                
-                                # Copy thumbnail (overwrite if exists)
-                                shutil.copy2(thumbnail_source_path, thumbnail_destination_path)
-                                thumbnail_copied = True
-                                print(f"📸 Auto-copied video thumbnail: {thumbnail_source_path} -> {thumbnail_destination_path}")
-                        except Exception as thumb_error:
-                            print(f"⚠️ Failed to copy video thumbnail {matching_thumbnail}: {thumb_error}")
-                
-                # Get the final filename for response
-                final_filename = os.path.basename(final_destination_path)
-                
-                results.append({
-                    "filename": filename,
-                    "final_filename": final_filename,
-                    "subfolder": subfolder,
-                    "source_type": source_type,
-                    "destination_type": destination_type,
-                    "status": "success",
-                    "message": f"File copied successfully{' (with thumbnail)' if thumbnail_copied else ''}"
-                })
-                
-                print(f"✅ Copied file: {source_path} -> {final_destination_path}{' (with thumbnail)' if thumbnail_copied else ''}")
-                
-            except Exception as e:
-                results.append({
-                    "filename": filename,
-                    "status": "error",
-                    "message": str(e)
-                })
+            results.append(result)
         
         return web.json_response({
             "status": "success",
@@ -508,10 +622,62 @@ async def copy_files(request):
         }, status=500)
 
 
+def thumbnail_etag(stat: os.stat_result, width: int, fmt: str) -> str:
+    """ETag of a thumbnail, derived from the source file so it survives cache eviction"""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}-{width}-{fmt}"'
+
+
+def etag_matches(request, etag: str) -> bool:
+    """Check the If-None-Match header against an ETag"""
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def read_thumbnail(cache_path: str) -> bytes:
+    """Read a cached thumbnail (small enough to read in one go)"""
+    with open(cache_path, 'rb') as f:
+        return f.read()
+
+
+def thumbnail_response(cache_path: str, fmt: str, headers: Dict[str, str]):
+    """Serve a cached thumbnail"""
+    return web.Response(body=read_thumbnail(cache_path), content_type=THUMBNAIL_FORMATS[fmt][1], headers=headers)
+
+
+async def prepare_thumbnail(file_path: str, filename: str, folder_type: str, subfolder: str,
+                            width: int, fmt: str, mtime: float) -> str:
+    """
+    Return the cache path of an up-to-date thumbnail, rendering it if needed.
+    Raises ThumbnailBusyError when the worker queue is full.
+    """
+    cache_path = thumbnail_service.get_cache_path(file_path, width, fmt)
+    
+    # If cache is newer than original, we can use it
+    if thumbnail_service.cache.lookup(cache_path, mtime):
+        return cache_path
+        
+    source_path = None
+    is_video = is_video_file(filename)
+    if is_video:
+        matching_thumbnail = find_matching_thumbnail(filename, folder_type, subfolder)
+        if matching_thumbnail:
+            source_path = build_file_path(folder_type, matching_thumbnail, subfolder)
+            
+    # Create thumbnail in the worker pool
+    await thumbnail_service.generate(file_path, cache_path, width, source_path, is_video)
+    return cache_path
+
+
 async def view_thumbnail(request):
     """
-    Get a resized thumbnail of an image with disk caching.
-    Query params: filename, subfolder, type, width (default 256)
+    Get a resized thumbnail of an image or video with disk caching.
+    Thumbnails are rendered in the worker pool; returns 503 when its queue is full.
+    Videos use their matching preview image if present, otherwise an ffmpeg poster frame.
+    The format (AVIF/WebP/JPEG) is negotiated from the Accept header unless given explicitly.
+    Query params: filename, subfolder, type, width (default 256), format (optional)
     """
     try:
         query = request.query
@@ -534,59 +700,134 @@ async def view_thumbnail(request):
             
         # Get original file stats for cache validation
         stat = os.stat(file_path)
-        mtime = stat.st_mtime
-        size = stat.st_size
-        
-        # Create cache directory in temp folder
-        temp_dir = folder_paths.get_temp_directory()
-        cache_dir = os.path.join(temp_dir, ".mobile_thumbnails")
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir, exist_ok=True)
-            
-        # Generate cache key based on path and width
-        cache_key = hashlib.md5(f"{file_path}_{width}".encode()).hexdigest()
-        cache_path = os.path.join(cache_dir, f"{cache_key}.jpg")
-        
-        # Check if valid cache exists
-        use_cache = False
-        if os.path.exists(cache_path):
-            cache_stat = os.stat(cache_path)
-            # If cache is newer than original, we can use it
-            if cache_stat.st_mtime >= mtime:
-                use_cache = True
-                
-        if use_cache:
-            return web.FileResponse(cache_path)
-            
-        # Create thumbnail
+        fmt = negotiate_format(request.headers.get('Accept', ''), query.get('format'))
+        
+        headers = {
+            "ETag": thumbnail_etag(stat, width, fmt),
+            "Cache-Control": f"private, max-age={THUMBNAIL_MAX_AGE}",
+            "Vary": "Accept"
+        }
+        if etag_matches(request, headers["ETag"]):
+            return web.Response(status=304, headers=headers)
+        
         try:
-            with Image.open(file_path) as img:
-                # Calculate aspect ratio
-                aspect = img.height / img.width
-                height = int(width * aspect)
-                
-                # Resize if needed (don't upscale)
-                if img.width > width:
-                    # Use Lanczos (standard in modern PILLOW) or Bilinear for speed
-                    # PILLOW 10.0+ uses Resampling.LANCZOS, older uses Image.LANCZOS
-                    resample_filter = getattr(Image, 'Resampling', Image).LANCZOS
-                    img = img.resize((width, height), resample_filter)
-                
-                # Convert to RGB if necessary (e.g. for PNG with alpha to JPG)
-                if img.mode in ('RGBA', 'P', 'LA'):
-                    img = img.convert('RGB')
-                
-                # Save to cache and stream to response
-                # We use JPG for thumbnails to minimize transfer size
-                img.save(cache_path, "JPEG", quality=80, optimize=True)
-                
-            return web.FileResponse(cache_path)
+            cache_path = await prepare_thumbnail(file_path, filename, folder_type, subfolder, width, fmt, stat.st_mtime)
+            return thumbnail_response(cache_path, fmt, headers)
+            
+        except ThumbnailBusyError as busy:
+            return web.Response(status=503, text=str(busy), headers={"Retry-After": str(RETRY_AFTER)})
             
         except Exception as img_err:
             print(f"❌ Thumbnail generation failed: {img_err}")
+            if is_video_file(filename):
+                # Never stream a whole video in place of a thumbnail
+                return web.Response(status=404, text="Thumbnail not available")
             # Fallback to original file if resizing fails
             return web.FileResponse(file_path)
             
     except Exception as e:
         print(f"❌ Error in view_thumbnail: {e}")
         return web.Response(status=500, text=str(e))
+
+
+def encode_thumbnail_frame(header: Dict[str, Any], body: bytes = b"") -> bytes:
+    """Frame layout: uint32 header length, JSON header, uint32 body length, body (big-endian lengths)"""
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return struct.pack(">I", len(header_bytes)) + header_bytes + struct.pack(">I", len(body)) + body
+
+
+async def batch_thumbnails(request):
+    """
+    Stream many thumbnails in one response.
+    Body: {"items": [{filename, subfolder, type, width, etag?}], "format"?: "jpeg"|"webp"|"avif"}
+    Frames (see encode_thumbnail_frame) are written as soon as each thumbnail is ready,
+    so they arrive out of order; the header "index" refers to the position in items.
+    Per-item failures are reported in the frame header "status" (304, 400, 403, 404, 500, 503).
+    """
+    try:
+        data = await request.json()
+        items = data.get('items', [])
+        if not isinstance(items, list) or not items:
+            return web.json_response({
+                "status": "error",
+                "message": "No items specified"
+            }, status=400)
+        if len(items) > BATCH_MAX_ITEMS:
+            return web.json_response({
+                "status": "error",
+                "message": f"Too many items (max {BATCH_MAX_ITEMS})"
+            }, status=400)
+        fmt = negotiate_format(request.headers.get('Accept', ''), data.get('format'))
+    except Exception as e:
+        return web.json_response({
+            "status": "error",
+            "message": str(e)
+        }, status=400)
+        
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def produce(index: int, item: Dict[str, Any]):
+        header = {"index": index}
+        try:
+            filename = item.get('filename')
+            subfolder = item.get('subfolder', '')
+            folder_type = item.get('type', 'output')
+            width = int(item.get('width', 256))
+            if not filename:
+                return dict(header, status=400, message="Filename required"), b""
+            try:
+                file_path = build_file_path(folder_type, filename, subfolder)
+            except ValueError as e:
+                return dict(header, status=403, message=str(e)), b""
+            if not os.path.exists(file_path):
+                return dict(header, status=404, message="File not found"), b""
+                
+            stat = os.stat(file_path)
+            header["etag"] = thumbnail_etag(stat, width, fmt)
+            if item.get('etag') == header["etag"]:
+                return dict(header, status=304), b""
+                
+            async with semaphore:
+                cache_path = await prepare_thumbnail(file_path, filename, folder_type, subfolder, width, fmt, stat.st_mtime)
+            header.update(status=200, content_type=THUMBNAIL_FORMATS[fmt][1])
+            return header, read_thumbnail(cache_path)
+            
+        except ThumbnailBusyError as busy:
+            return dict(header, status=503, message=str(busy)), b""
+        except Exception as e:
+            return dict(header, status=500, message=str(e)), b""
+            
+    response = web.StreamResponse(headers={
+        "Content-Type": BATCH_CONTENT_TYPE,
+        "Cache-Control": "no-store"
+    })
+    await response.prepare(request)
+    
+    tasks = [asyncio.ensure_future(produce(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            header, body = await next_done
+            await response.write(encode_thumbnail_frame(header, body))
+        await response.write_eof()
+    except ConnectionResetError:
+        # Client went away; thumbnails already being rendered still land in the cache
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+    return response
+
+
+async def get_thumbnail_cache_stats(request):
+    """Get size and hit/miss/eviction counters of the thumbnail cache"""
+    try:
+        return web.json_response({
+            "status": "success",
+            "stats": thumbnail_service.cache.get_stats()
+        })
+        
+    except Exception as e:
+        return web.json_response({
+            "status": "error",
+            "message": str(e)
+        }, status=500)
@@ -1,49 +1,153 @@
 """
 Manager Proxy Handler
 Provides proxy endpoints for ComfyUI Manager APIs to bypass CORS issues.
+
+Every request under /comfymobile/api/manager/ is forwarded to the Manager on
+the same server and streamed in both directions, so large responses are
+never buffered in memory. Paths map as follows:
+    /comfymobile/api/manager/queue/start        -> /api/manager/queue/start
+    /comfymobile/api/manager/customnode/getlist -> /api/customnode/getlist
+(see MANAGER_API_SECTIONS). If the client disconnects, the upstream request
+is cancelled.
 """
 
-from typing import Iterable
+import asyncio
+from typing import Iterable, Tuple
 from aiohttp import web
 import aiohttp
+from ..utils.http_client import get_http_session
 
 PROXY_HEADER_WHITELIST: Iterable[str] = (
     "content-type",
     "cache-control",
     "pragma",
     "expires",
+    "content-disposition",
+    "last-modified",
+    "etag",
 )
 
-async def _proxy_request(request: web.Request, method: str, target_path: str) -> web.StreamResponse:
-    origin = request.url.origin()
-    target_url = origin.with_path(target_path)
-    if method == "GET":
-        target_url = target_url.with_query(request.rel_url.query)
-
-    data = None
-    headers = {}
-    if method in {"POST", "PUT", "PATCH"}:
+# Request headers passed on to the Manager
+PROXY_REQUEST_HEADERS: Iterable[str] = (
+    "content-type",
+    "accept",
+    "cache-control",
+    "if-none-match",
+    "if-modified-since",
+)
+
+# First path segments served by the Manager under /api/<section>/ rather than /api/manager/
+MANAGER_API_SECTIONS: Iterable[str] = (
+    "customnode",
+    "externalmodel",
+    "snapshot",
+    "comfyui_manager",
+)
+
+# Upstream timeouts by Manager path prefix (first match wins). sock_read bounds the gap
+# between chunks rather than the whole transfer, so long streams are not cut off.
+PROXY_ROUTE_TIMEOUTS: Tuple[Tuple[str, aiohttp.ClientTimeout], ...] = (
+    ("/api/customnode/getlist", aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=180)),
+    ("/api/externalmodel/getlist", aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=180)),
+    ("/api/snapshot/restore", aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=600)),
+    ("/api/manager/queue/", aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30)),
+)
+DEFAULT_PROXY_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=60)
+
+# Response body chunk size when streaming back to the client
+PROXY_CHUNK_SIZE = 64 * 1024
+
+# Seconds between checks for a disconnected client while waiting on the Manager
+DISCONNECT_POLL_INTERVAL = 1.0
+
+
+def get_manager_target_path(path: str) -> str:
+    """Map a path below /comfymobile/api/manager/ to the Manager's own route"""
+    path = path.strip("/")
+    if path.split("/", 1)[0] in MANAGER_API_SECTIONS:
+        return f"/api/{path}"
+    return f"/api/manager/{path}"
+
+
+def get_proxy_timeout(target_path: str) -> aiohttp.ClientTimeout:
+    for prefix, timeout in PROXY_ROUTE_TIMEOUTS:
+        if target_path.startswith(prefix):
+            return timeout
+    return DEFAULT_PROXY_TIMEOUT
+
+
+def is_client_gone(request: web.Request) -> bool:
+    transport = request.transport
+    return transport is None or transport.is_closing()
+
+
+async def _stream_upstream(request: web.Request, method: str, target_url: str, headers: dict,
+                           timeout: aiohttp.ClientTimeout) -> web.StreamResponse:
+    session = get_http_session()
+    data = request.content if request.can_read_body else None
+    async with session.request(method, target_url, data=data, headers=headers, timeout=timeout) as resp:
+        proxy_headers = {
+            name: value
+            for name, value in resp.headers.items()
+            if name.lower() in PROXY_HEADER_WHITELIST
+        }
+        response = web.StreamResponse(status=resp.status, reason=resp.reason, headers=proxy_headers)
+        await response.prepare(request)
+        # Leaving the block early (disconnect, cancellation) closes the upstream connection
         try:
-            if request.can_read_body:
-                data = await request.read()
-            else:
-                data = b""
-        except Exception:
-            data = b""
-        content_type = request.headers.get("Content-Type")
-        if content_type:
-            headers["Content-Type"] = content_type
-
-    async with aiohttp.ClientSession() as session:
-        http_method = getattr(session, method.lower())
-        async with http_method(str(target_url), data=data, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as resp:
-            resp_body = await resp.read()
-            proxy_headers = {
-                name: value
-                for name, value in resp.headers.items()
-                if name.lower() in PROXY_HEADER_WHITELIST
-            }
-            return web.Response(body=resp_body, status=resp.status, headers=proxy_headers)
+            async for chunk in resp.content.iter_chunked(PROXY_CHUNK_SIZE):
+                await response.write(chunk)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Upstream failed or the client left after headers were sent; drop the connection
+            # so a partial body is never mistaken for a complete one
+            print(f"[ManagerProxy] Stream aborted for {target_url}: {e}")
+            if request.transport is not None:
+                request.transport.close()
+            return response
+        await response.write_eof()
+        return response
+
+
+async def _proxy_request(request: web.Request, method: str, target_path: str) -> web.StreamResponse:
+    target_url = request.url.origin().with_path(target_path).with_query(request.rel_url.query)
+    headers = {
+        name: value
+        for name, value in request.headers.items()
+        if name.lower() in PROXY_REQUEST_HEADERS
+    }
+
+    upstream = asyncio.ensure_future(
+        _stream_upstream(request, method, str(target_url), headers, get_proxy_timeout(target_path))
+    )
+    try:
+        # Cancel the upstream call if the client goes away while the Manager is still working
+        while True:
+            done, _ = await asyncio.wait({upstream}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return upstream.result()
+            if is_client_gone(request):
+                upstream.cancel()
+                print(f"[ManagerProxy] Client disconnected, cancelled {method} {target_path}")
+                # Nobody is listening; nginx's "client closed request" status, for the access log only
+                return web.Response(status=499)
+    except asyncio.CancelledError:
+        upstream.cancel()
+        raise
+    except asyncio.TimeoutError:
+        return web.json_response({
+            "success": False,
+            "error": f"Manager did not respond in time: {target_path}"
+        }, status=504)
+    except aiohttp.ClientError as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Manager request failed: {str(e)}"
+        }, status=502)
+
+async def manager_proxy(request: web.Request) -> web.StreamResponse:
+    """Forward any method under /comfymobile/api/manager/ to the Manager"""
+    target_path = get_manager_target_path(request.match_info.get("path", ""))
+    return await _proxy_request(request, request.method, target_path)
 
 async def manager_queue_start(request: web.Request) -> web.StreamResponse:
     return await _proxy_request(request, "GET", "/api/manager/queue/start")
@@ -2,11 +2,46 @@
 
 import os
 import json
+import hashlib
 import shutil
 import time
+import asyncio
 from typing import Dict, List, Any, Optional
 from aiohttp import web
 import folder_paths
+from ..utils.model_index import model_index, get_models_path
+from ..utils.model_hashes import model_hasher, autov2_from_sha256
+from ..utils.model_copy import copy_model_data, CopyCancelled
+from ..utils.io_executor import run_io, run_job
+from ..utils.upload_sessions import (
+    upload_sessions, UploadSessionError, WRITE_BUFFER_SIZE, open_upload_file, write_at
+)
+from ..utils.model_dedupe import (
+    find_duplicate_groups, dedupe_files, dedupe_lock, DedupeError, DEDUPE_MIN_SIZE, DEDUPE_MODES
+)
+
+# Background model copy jobs, tracked like download tasks
+copy_job_counter = 0
+copy_jobs = {}
+
+# Background duplicate scan and dedupe jobs
+dedupe_job_counter = 0
+dedupe_jobs = {}
+
+# Finished copy and dedupe jobs are kept this long, and at most this many of each kind
+FINISHED_JOB_TTL = 3600
+MAX_FINISHED_JOBS = 50
+
+def prune_finished_jobs(jobs):
+    """Forget finished jobs past FINISHED_JOB_TTL or beyond the newest MAX_FINISHED_JOBS"""
+    now = time.time()
+    finished = sorted(
+        (job for job in jobs.values() if job["completed_at"] is not None),
+        key=lambda job: job["completed_at"], reverse=True
+    )
+    for index, job in enumerate(finished):
+        if index >= MAX_FINISHED_JOBS or now - job["completed_at"] > FINISHED_JOB_TTL:
+            del jobs[job["id"]]
 
 # Import the rename_trigger_word_key function from lora_handler
 try:
@@ -16,11 +51,36 @@ except ImportError:
     def rename_trigger_word_key(old_filename, new_filename):
         return True
 
+def build_model_entry(row: Dict[str, Any], models_path: str) -> Dict[str, Any]:
+    """Build the API model entry for a model index row"""
+    filename = row["filename"]
+    subfolder = row["subfolder"]
+    file_size = row["size"]
+    modified_time = row["mtime"]
+    sha256 = model_hasher.get_known_hash(row["rel_path"], file_size, modified_time)
+
+    return {
+        "name": filename,
+        "filename": filename,
+        "folder_type": row["folder_type"],
+        "subfolder": subfolder,
+        "path": os.path.join(subfolder, filename) if subfolder else filename,
+        "full_path": os.path.join(models_path, *row["rel_path"].split("/")),
+        "relative_path": row["rel_path"],
+        "size": file_size,
+        "size_mb": round(file_size / (1024 * 1024), 2),
+        "extension": row["extension"],
+        "modified": modified_time,
+        "modified_iso": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(modified_time)),
+        "sha256": sha256,
+        "autov2": autov2_from_sha256(sha256) if sha256 else None
+    }
+
 async def list_model_folders(request):
     """List all available model folders in ComfyUI models directory"""
     try:
         # Get models directory path
-        models_path = os.path.join(folder_paths.base_path, "models")
+        models_path = get_models_path()
         
         if not os.path.exists(models_path):
             return web.json_response({
@@ -31,46 +91,17 @@ async def list_model_folders(request):
         
         folders = []
         
-        # Scan all directories in models folder
-        for item in os.listdir(models_path):
-            item_path = os.path.join(models_path, item)
-            if os.path.isdir(item_path):
-                # Get folder info
-                folder_info = {
-                    "name": item,
-                    "path": item,  # Relative path from models/
-                    "full_path": item_path,
-                    "file_count": 0,
-                    "subfolder_count": 0,
-                    "has_subfolders": False
-                }
-                
-                # Count all files recursively including subfolders
-                try:
-                    file_count = 0
-                    subfolder_count = 0
-                    
-                    for root, dirs, files in os.walk(item_path):
-                        # Count files (excluding hidden files and .json files)
-                        valid_files = [f for f in files 
-                                     if not f.startswith('.') and not f.startswith('__') and not f.lower().endswith('.json')]
-                        file_count += len(valid_files)
-                        
-                        # Count subfolders (only immediate subfolders for the main directory)
-                        if root == item_path:
-                            subfolder_count = len([d for d in dirs 
-                                                 if not d.startswith('.') and not d.startswith('__')])
-                    
-                    folder_info["file_count"] = file_count
-                    folder_info["subfolder_count"] = subfolder_count
-                    folder_info["has_subfolders"] = subfolder_count > 0
-                    
-                except (PermissionError, OSError):
-                    folder_info["file_count"] = 0
-                    folder_info["subfolder_count"] = 0
-                    folder_info["has_subfolders"] = False
-                
-                folders.append(folder_info)
+        # Folder statistics come from the model index (recursive file counts, immediate subfolders)
+        for folder_stats in await model_index.query(model_index.get_folders):
+            subfolder_count = folder_stats["subfolder_count"]
+            folders.append({
+                "name": folder_stats["name"],
+                "path": folder_stats["name"],  # Relative path from models/
+                "full_path": os.path.join(models_path, folder_stats["name"]),
+                "file_count": folder_stats["file_count"],
+                "subfolder_count": subfolder_count,
+                "has_subfolders": subfolder_count > 0
+            })
         
         # Sort folders alphabetically
         folders.sort(key=lambda x: x["name"].lower())
@@ -94,7 +125,7 @@ async def list_all_models(request):
     """List all model files recursively from all model folders"""
     try:
         # Get models directory path
-        models_path = os.path.join(folder_paths.base_path, "models")
+        models_path = get_models_path()
         
         if not os.path.exists(models_path):
             return web.json_response({
@@ -103,62 +134,9 @@ async def list_all_models(request):
                 "models": []
             })
         
-        all_models = []
-        
-        # Recursively scan all directories in models folder
-        for root, dirs, files in os.walk(models_path):
-            # Skip hidden directories
-            dirs[:] = [d for d in dirs if not d.startswith('.') and not d.startswith('__')]
-            
-            # Calculate relative path from models directory
-            rel_path = os.path.relpath(root, models_path)
-            folder_type = rel_path.split(os.sep)[0] if rel_path != "." else "root"
-            subfolder = os.path.relpath(root, os.path.join(models_path, folder_type)).replace(os.sep, "/") if rel_path != "." else ""
-            if subfolder == ".":
-                subfolder = ""
-            
-            for filename in files:
-                if filename.startswith('.') or filename.startswith('__'):
-                    continue
-                
-                # Skip .json files (ComfyUI auto-generated files)
-                if filename.lower().endswith('.json'):
-                    continue
-                
-                # Get file extension
-                file_ext = os.path.splitext(filename)[1].lower()
-                
-                file_path = os.path.join(root, filename)
-                
-                # Get file info
-                try:
-                    stat_info = os.stat(file_path)
-                    file_size = stat_info.st_size
-                    modified_time = stat_info.st_mtime
-                except OSError:
-                    file_size = 0
-                    modified_time = 0
-                
-                # Create model entry
-                model_info = {
-                    "name": filename,
-                    "filename": filename,
-                    "folder_type": folder_type,
-                    "subfolder": subfolder,
-                    "path": os.path.join(subfolder, filename) if subfolder else filename,
-                    "full_path": file_path,
-                    "relative_path": os.path.relpath(file_path, models_path).replace(os.sep, "/"),
-                    "size": file_size,
-                    "size_mb": round(file_size / (1024 * 1024), 2),
-                    "extension": file_ext,
-                    "modified": modified_time,
-                    "modified_iso": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(modified_time))
-                }
-                
-                all_models.append(model_info)
-        
-        # Sort by modification time (newest first)
-        all_models.sort(key=lambda x: x['modified'], reverse=True)
+        # Indexed files, sorted by modification time (newest first)
+        rows = await model_index.query(model_index.get_files, order_by="modified")
+        all_models = [build_model_entry(row, models_path) for row in rows]
         
         # Group by folder type
         grouped_models = {}
@@ -191,7 +169,7 @@ async def list_models_in_folder(request):
         folder_name = request.match_info['folder_name']
         
         # Get models directory path
-        models_path = os.path.join(folder_paths.base_path, "models")
+        models_path = get_models_path()
         folder_path = os.path.join(models_path, folder_name)
         
         if not os.path.exists(folder_path):
@@ -201,59 +179,9 @@ async def list_models_in_folder(request):
                 "models": []
             })
         
-        models = []
-        
-        # Recursively scan the specific folder
-        for root, dirs, files in os.walk(folder_path):
-            # Skip hidden directories
-            dirs[:] = [d for d in dirs if not d.startswith('.') and not d.startswith('__')]
-            
-            # Calculate relative path from folder
-            rel_path = os.path.relpath(root, folder_path)
-            subfolder = "" if rel_path == "." else rel_path.replace(os.sep, "/")
-            
-            for filename in files:
-                if filename.startswith('.') or filename.startswith('__'):
-                    continue
-                
-                # Skip .json files (ComfyUI auto-generated files)
-                if filename.lower().endswith('.json'):
-                    continue
-                
-                # Get file extension
-                file_ext = os.path.splitext(filename)[1].lower()
-                
-                file_path = os.path.join(root, filename)
-                
-                # Get file info
-                try:
-                    stat_info = os.stat(file_path)
-                    file_size = stat_info.st_size
-                    modified_time = stat_info.st_mtime
-                except OSError:
-                    file_size = 0
-                    modified_time = 0
-                
-                # Create model entry
-                model_info = {
-                    "name": filename,
-                    "filename": filename,
-                    "folder_type": folder_name,
-                    "subfolder": subfolder,
-                    "path": os.path.join(subfolder, filename) if subfolder else filename,
-                    "relative_path": os.path.join(folder_name, subfolder, filename) if subfolder else os.path.join(folder_name, filename),
-                    "full_path": file_path,
-                    "size": file_size,
-                    "size_mb": round(file_size / (1024 * 1024), 2),
-                    "extension": file_ext,
-                    "modified": modified_time,
-                    "modified_iso": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(modified_time))
-                }
-                
-                models.append(model_info)
-        
-        # Sort by name
-        models.sort(key=lambda x: x['name'].lower())
+        # Indexed files of this folder, sorted by name
+        rows = await model_index.query(model_index.get_files, folder_name, order_by="name")
+        models = [build_model_entry(row, models_path) for row in rows]
         
         return web.json_response({
             "success": True,
@@ -275,7 +203,8 @@ async def list_loras(request):
     """List all available LoRA models from the loras folder"""
     try:
         # Get loras directory path
-        loras_path = os.path.join(folder_paths.base_path, "models", "loras")
+        models_path = get_models_path()
+        loras_path = os.path.join(models_path, "loras")
         
         if not os.path.exists(loras_path):
             return web.json_response({
@@ -287,67 +216,9 @@ async def list_loras(request):
                 "message": "LoRAs directory not found"
             })
         
-        loras = []
-        
-        # Recursively scan loras directory
-        for root, dirs, files in os.walk(loras_path):
-            # Skip hidden directories
-            dirs[:] = [d for d in dirs if not d.startswith('.') and not d.startswith('__')]
-            
-            for filename in files:
-                if filename.startswith('.') or filename.startswith('__'):
-                    continue
-                
-                # Skip .json files (ComfyUI auto-generated files)
-                if filename.lower().endswith('.json'):
-                    continue
-                
-                # Get file extension
-                file_ext = os.path.splitext(filename)[1].lower()
-                
-                file_path = os.path.join(root, filename)
-                
-                # Calculate relative path from loras directory
-                rel_path = os.path.relpath(root, loras_path)
-                subfolder = "" if rel_path == "." else rel_path.replace(os.sep, "/")
-                
-                # Get file info
-                try:
-                    stat_info = os.stat(file_path)
-                    file_size = stat_info.st_size
-                    modified_time = stat_info.st_mtime
-                except OSError:
-                    file_size = 0
-                    modified_time = 0
-                
-                # Create LoRA entry
-                lora_info = {
-                    "name": filename,
-                    "filename": filename,
-                    "folder_type": "loras",
-                    "subfolder": subfolder,
-                    "path": os.path.join(subfolder, filename) if subfolder else filename,
-                    "relative_path": os.path.join("loras", subfolder, filename) if subfolder else os.path.join("loras", filename),
-                    "full_path": file_path,
-                    "size": file_size,
-                    "size_mb": round(file_size / (1024 * 1024), 2),
-                    "extension": file_ext,
-                    "modified": modified_time,
-                    "modified_iso": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(modified_time))
-                }
-                
-                loras.append(lora_info)
-        
-        # Sort by name
-        loras.sort(key=lambda x: x['name'].lower())
-        
-        # Group by subfolder for better organization
-        grouped_loras = {}
-        for lora in loras:
-            subfolder = lora['subfolder'] or 'root'
-            if subfolder not in grouped_loras:
-                grouped_loras[subfolder] = []
-            grouped_loras[subfolder].append(lora)
+        # Indexed LoRA files, sorted by name
+        rows = await model_index.query(model_index.get_files, "loras", order_by="name")
+        loras = [build_model_entry(row, models_path) for row in rows]
         
         return web.json_response({
             "success": True,
@@ -449,8 +320,9 @@ async def move_model_file(request):
         
         # Perform the move operation
         try:
-            import shutil
-            shutil.move(source_file_path, target_file_path)
+            # Cross-device moves copy the whole file; keep that off the event loop and the I/O pool
+            await run_job(shutil.move, source_file_path, target_file_path)
+            model_index.mark_dirty(target_file_path)
             
             # Verify the move was successful
             if not os.path.exists(target_file_path):
@@ -500,7 +372,9 @@ async def move_model_file(request):
 
 
 async def copy_model_file(request):
-    """Copy a model file within the models directory"""
+    """Copy a model file within the models directory (as a background job unless 'wait' is set)"""
+    global copy_job_counter
+    
     try:
         data = await request.json()
         
@@ -574,6 +448,15 @@ async def copy_model_file(request):
                     "error": f"Target file already exists: {new_filename}. Set 'overwrite': true to replace it."
                 }, status=409)
         
+        # A copy to the same target still in progress would be replaced by this one halfway
+        for job in copy_jobs.values():
+            if job["target_path"] == target_file_path and job["status"] in ("queued", "copying"):
+                return web.json_response({
+                    "success": False,
+                    "error": f"A copy to {new_filename} is already in progress",
+                    "job_id": job["id"]
+                }, status=409)
+        
         # Check available disk space
         try:
             source_size = os.path.getsize(source_file_path)
@@ -588,42 +471,63 @@ async def copy_model_file(request):
             # Continue if we can't check disk space
             print(f"Warning: Could not check disk space: {e}")
         
-        # Perform the copy operation
-        try:
-            shutil.copy2(source_file_path, target_file_path)
-            
-            # Verify the copy was successful
-            if not os.path.exists(target_file_path):
-                return web.json_response({
-                    "success": False,
-                    "error": "File copy failed: target file was not created"
-                }, status=500)
-            
-            # Get file info for response
-            file_stats = os.stat(target_file_path)
-            file_size = file_stats.st_size
-            
+        # Copy off the event loop as a tracked job
+        prune_finished_jobs(copy_jobs)
+        copy_job_counter += 1
+        job_id = f"copy_{copy_job_counter}_{int(time.time())}"
+        file_info = {
+            "filename": filename,
+            "new_filename": new_filename,
+            "source_folder": source_folder,
+            "target_folder": target_folder,
+            "source_subfolder": source_subfolder,
+            "target_subfolder": target_subfolder,
+            "new_path": target_file_path
+        }
+        copy_jobs[job_id] = {
+            "id": job_id,
+            "source_path": source_file_path,
+            "target_path": target_file_path,
+            "file_info": file_info,
+            "status": "queued",
+            "method": None,
+            "progress": 0,
+            "total_size": os.path.getsize(source_file_path),
+            "copied_size": 0,
+            "speed": 0,
+            "eta": 0,
+            "created_at": time.time(),
+            "started_at": None,
+            "completed_at": None,
+            "error": None,
+            "cancelled": False
+        }
+        
+        if not data.get('wait', False):
+            asyncio.ensure_future(perform_copy(job_id))
             return web.json_response({
                 "success": True,
-                "message": f"Successfully copied {filename} from {source_folder} to {target_folder}",
-                "file_info": {
-                    "filename": filename,
-                    "new_filename": new_filename,
-                    "source_folder": source_folder,
-                    "target_folder": target_folder,
-                    "source_subfolder": source_subfolder,
-                    "target_subfolder": target_subfolder,
-                    "file_size": file_size,
-                    "new_path": target_file_path
-                }
+                "message": f"Copy of {filename} from {source_folder} to {target_folder} started",
+                "job_id": job_id,
+                "file_info": file_info
             })
-            
-        except Exception as e:
+        
+        # 'wait': true keeps the old behaviour of answering once the copy is done
+        job = await perform_copy(job_id)
+        if job["status"] != "completed":
             return web.json_response({
                 "success": False,
-                "error": f"Failed to copy file: {str(e)}"
+                "job_id": job_id,
+                "error": f"Failed to copy file: {job['error']}"
             }, status=500)
         
+        return web.json_response({
+            "success": True,
+            "message": f"Successfully copied {filename} from {source_folder} to {target_folder}",
+            "job_id": job_id,
+            "file_info": dict(file_info, file_size=job["total_size"])
+        })
+        
     except json.JSONDecodeError as e:
         return web.json_response({
             "success": False,
@@ -635,6 +539,117 @@ async def copy_model_file(request):
             "error": f"Unexpected error: {str(e)}"
         }, status=500)
 
+async def perform_copy(job_id):
+    """Run a copy job in a worker thread, recording progress like download tasks"""
+    job = copy_jobs[job_id]
+    last = {"time": 0, "copied": 0}
+    
+    def on_progress(copied):
+        job["copied_size"] = copied
+        if job["total_size"] > 0:
+            job["progress"] = (copied / job["total_size"]) * 100
+        now = time.time()
+        if now - last["time"] >= 1.0:
+            job["speed"] = (copied - last["copied"]) / (now - last["time"])
+            if job["speed"] > 0:
+                job["eta"] = (job["total_size"] - copied) / job["speed"]
+            last["time"] = now
+            last["copied"] = copied
+    
+    def copy():
+        # The job stays queued until a job worker is free
+        if job["cancelled"]:
+            raise CopyCancelled()
+        job["status"] = "copying"
+        job["started_at"] = last["time"] = time.time()
+        return copy_model_data(
+            job["source_path"], job["target_path"],
+            on_progress, lambda: job["cancelled"], job["id"]
+        )
+    
+    try:
+        job["method"] = await run_job(copy)
+        model_index.mark_dirty(job["target_path"])
+        
+        # A copy has the same content; reuse the source hash instead of rehashing
+        models_path = get_models_path()
+        source_hash = model_hasher.get_hash(os.path.relpath(job["source_path"], models_path).replace(os.sep, "/"))
+        if source_hash:
+            model_hasher.remember(job["target_path"], source_hash["sha256"])
+        
+        job["status"] = "completed"
+        job["progress"] = 100
+        job["eta"] = 0
+        print(f"✅ Copied {job['file_info']['filename']} ({job['total_size']:,} bytes, {job['method']})")
+    except CopyCancelled:
+        job["status"] = "cancelled"
+    except Exception as e:
+        job["status"] = "error"
+        job["error"] = str(e)
+        print(f"❌ Copy failed: {job['file_info']['filename']} - {str(e)}")
+    finally:
+        job["completed_at"] = time.time()
+    return job
+
+def build_copy_job_entry(job):
+    """API view of a copy job (no absolute source path)"""
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "method": job["method"],
+        "progress": job["progress"],
+        "total_size": job["total_size"],
+        "copied_size": job["copied_size"],
+        "speed": job["speed"],
+        "eta": job["eta"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "completed_at": job["completed_at"],
+        "error": job["error"],
+        "file_info": job["file_info"]
+    }
+
+async def list_copy_jobs(request):
+    """Get status of all model copy jobs"""
+    prune_finished_jobs(copy_jobs)
+    jobs = sorted(copy_jobs.values(), key=lambda job: job["created_at"], reverse=True)
+    return web.json_response({
+        "success": True,
+        "jobs": [build_copy_job_entry(job) for job in jobs]
+    })
+
+async def get_copy_job(request):
+    """Get status of one model copy job"""
+    job = copy_jobs.get(request.match_info['job_id'])
+    if job is None:
+        return web.json_response({
+            "success": False,
+            "error": f"Copy job not found: {request.match_info['job_id']}"
+        }, status=404)
+    return web.json_response({
+        "success": True,
+        "job": build_copy_job_entry(job)
+    })
+
+async def cancel_copy_job(request):
+    """Cancel a running copy job; the partial copy is removed"""
+    job = copy_jobs.get(request.match_info['job_id'])
+    if job is None:
+        return web.json_response({
+            "success": False,
+            "error": f"Copy job not found: {request.match_info['job_id']}"
+        }, status=404)
+    if job["status"] not in ("queued", "copying"):
+        return web.json_response({
+            "success": False,
+            "error": f"Cannot cancel job with status: {job['status']}"
+        }, status=400)
+    job["cancelled"] = True
+    return web.json_response({
+        "success": True,
+        "message": f"Copy job {job['id']} cancelling"
+    })
+
 async def delete_model_file(request):
     """Delete a model file from the models directory"""
     try:
@@ -697,7 +712,8 @@ async def delete_model_file(request):
         
         # Perform the delete operation
         try:
-            os.remove(file_path)
+            await run_io(os.remove, file_path)
+            model_index.mark_dirty()
             
             # Verify the delete was successful
             if os.path.exists(file_path):
@@ -795,7 +811,8 @@ async def rename_model_file(request):
         
         # Perform the rename operation
         try:
-            os.rename(old_file_path, new_file_path)
+            await run_io(os.rename, old_file_path, new_file_path)
+            model_index.mark_dirty(new_file_path)
             
             # Verify the rename was successful
             if not os.path.exists(new_file_path):
@@ -872,7 +889,7 @@ async def search_models(request):
             }, status=400)
 
         # Get models directory path
-        models_path = os.path.join(folder_paths.base_path, "models")
+        models_path = get_models_path()
 
         if not os.path.exists(models_path):
             return web.json_response({
@@ -881,98 +898,24 @@ async def search_models(request):
                 "results": []
             })
 
-        results = []
-        query_lower = query.lower()
-
-        # Determine search path
-        search_path = models_path
-        if folder_type:
-            folder_path = os.path.join(models_path, folder_type)
-            if os.path.exists(folder_path):
-                search_path = folder_path
-            else:
-                return web.json_response({
-                    "success": False,
-                    "error": f"Folder type not found: {folder_type}",
-                    "results": []
-                })
-
-        # Recursively search for matching files
-        for root, dirs, files in os.walk(search_path):
-            # Skip hidden directories
-            dirs[:] = [d for d in dirs if not d.startswith('.') and not d.startswith('__')]
-
-            # Calculate relative path from models directory
-            rel_path = os.path.relpath(root, models_path)
-            if rel_path == ".":
-                current_folder_type = "root"
-                subfolder = ""
-            else:
-                path_parts = rel_path.split(os.sep)
-                current_folder_type = path_parts[0]
-                subfolder = os.path.join(*path_parts[1:]).replace(os.sep, "/") if len(path_parts) > 1 else ""
-
-            for filename in files:
-                if filename.startswith('.') or filename.startswith('__'):
-                    continue
-
-                # Skip .json files (ComfyUI auto-generated files)
-                if filename.lower().endswith('.json'):
-                    continue
-
-                # Check if filename contains the search query
-                if query_lower not in filename.lower():
-                    continue
-
-                # Get file extension
-                file_ext = os.path.splitext(filename)[1].lower()
-
-                file_path = os.path.join(root, filename)
-
-                # Get file info
-                try:
-                    stat_info = os.stat(file_path)
-                    file_size = stat_info.st_size
-                    modified_time = stat_info.st_mtime
-                except OSError:
-                    file_size = 0
-                    modified_time = 0
-
-                # Create result entry
-                result_info = {
-                    "name": filename,
-                    "filename": filename,
-                    "folder_type": current_folder_type,
-                    "subfolder": subfolder,
-                    "path": os.path.join(subfolder, filename) if subfolder else filename,
-                    "full_path": file_path,
-                    "relative_path": os.path.relpath(file_path, models_path).replace(os.sep, "/"),
-                    "size": file_size,
-                    "size_mb": round(file_size / (1024 * 1024), 2),
-                    "extension": file_ext,
-                    "modified": modified_time,
-                    "modified_iso": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(modified_time)),
-                    "match_type": "filename"
-                }
-
-                results.append(result_info)
-
-        # Sort by relevance (exact matches first, then by name)
-        def sort_key(item):
-            filename_lower = item['filename'].lower()
-            if filename_lower == query_lower:
-                return (0, filename_lower)  # Exact match
-            elif filename_lower.startswith(query_lower):
-                return (1, filename_lower)  # Starts with query
-            else:
-                return (2, filename_lower)  # Contains query
-
-        results.sort(key=sort_key)
+        if folder_type and not os.path.exists(os.path.join(models_path, folder_type)):
+            return web.json_response({
+                "success": False,
+                "error": f"Folder type not found: {folder_type}",
+                "results": []
+            })
 
         # Limit results to avoid overwhelming the client
         max_results = 100
-        if len(results) > max_results:
-            results = results[:max_results]
+
+        # Index search is sorted by relevance (exact matches first, then prefix, then by name)
+        rows = await model_index.query(model_index.search, query, folder_type or None, max_results)
+
+        results = []
+        for row in rows:
+            result_info = build_model_entry(row, models_path)
+            result_info["match_type"] = "filename"
+            results.append(result_info)
 
         return web.json_response({
             "success": True,
@@ -1035,11 +978,20 @@ async def check_file_exists(request):
         # Check if file exists
         exists = os.path.exists(target_file_path)
 
-        return web.json_response({
+        response_data = {
             "success": True,
             "exists": exists,
             "path": target_file_path if exists else None
-        })
+        }
+
+        # Optional content check: SHA256 or AutoV2 of the file about to be uploaded
+        file_hash = data.get('hash') or data.get('sha256')
+        if file_hash:
+            matches = model_hasher.find_by_hash(file_hash)
+            response_data["content_exists"] = bool(matches)
+            response_data["matching_files"] = matches
+
+        return web.json_response(response_data)
 
     except Exception as e:
         return web.json_response({
@@ -1329,10 +1281,12 @@ async def upload_model_file(request):
             except OSError:
                 # Fallback to shutil.move if cross-device
                 print(f"[UPLOAD] Using shutil.move (cross-device)")
-                shutil.move(temp_upload_file, target_file_path)
+                await run_job(shutil.move, temp_upload_file, target_file_path)
                 move_time = time.time() - move_start
                 print(f"[UPLOAD] File moved in {move_time:.2f}s")
 
+            model_index.mark_dirty(target_file_path)
+
             # Verify the final file exists
             if not os.path.exists(target_file_path):
                 print(f"[UPLOAD] Error: File was not created after move")
@@ -1413,3 +1367,568 @@ async def upload_model_file(request):
                 "success": False,
                 "error": f"Upload failed: {error_msg}"
             }, status=500)
+
+
+def upload_session_response(session: Dict[str, Any], status: int = 200) -> web.Response:
+    """Session status, with the contiguous offset also in an Upload-Offset header (tus style)"""
+    info = upload_sessions.describe(session)
+    return web.json_response(
+        {"success": True, "session": info},
+        status=status,
+        headers={"Upload-Offset": str(info["offset"]), "Upload-Length": str(info["size"])}
+    )
+
+
+async def create_upload_session(request):
+    """
+    Start a chunked, resumable model upload.
+
+    Body: {"folder": "loras", "subfolder": "", "filename": "x.safetensors",
+           "size": <bytes>, "sha256": "<optional hex>", "overwrite": false}
+    """
+    try:
+        data = await request.json()
+        folder = (data.get('folder') or '').strip()
+        subfolder = (data.get('subfolder') or '').strip()
+        filename = (data.get('filename') or '').strip()
+        sha256 = (data.get('sha256') or '').strip().lower() or None
+        overwrite = bool(data.get('overwrite', False))
+        size = data.get('size')
+
+        if not folder or '..' in folder or '/' in folder or '\\' in folder:
+            return web.json_response({
+                "success": False,
+                "error": "Folder parameter is required (e.g., 'checkpoints', 'loras', 'vae')"
+            }, status=400)
+        if subfolder and ('..' in subfolder or subfolder.startswith('/') or subfolder.startswith('\\')):
+            return web.json_response({
+                "success": False,
+                "error": "Invalid subfolder path"
+            }, status=400)
+        if not filename or '..' in filename or '/' in filename or '\\' in filename or filename.startswith('.'):
+            return web.json_response({
+                "success": False,
+                "error": "Invalid filename"
+            }, status=400)
+        if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+            return web.json_response({
+                "success": False,
+                "error": "'size' must be the total file size in bytes"
+            }, status=400)
+        if sha256 is not None and (len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256)):
+            return web.json_response({
+                "success": False,
+                "error": "'sha256' must be 64 hex characters"
+            }, status=400)
+
+        target_folder_path = os.path.join(get_models_path(), folder)
+        if subfolder:
+            target_folder_path = os.path.join(target_folder_path, subfolder)
+        target_file_path = os.path.join(target_folder_path, filename)
+
+        await run_io(upload_sessions.expire)
+        session = await run_io(
+            upload_sessions.create, folder, subfolder, filename, target_file_path, size, sha256, overwrite
+        )
+        return upload_session_response(session, status=201)
+
+    except UploadSessionError as e:
+        response = {"success": False, "error": str(e)}
+        if e.session_id:
+            response["session_id"] = e.session_id
+        return web.json_response(response, status=e.status)
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to create upload session: {str(e)}"
+        }, status=500)
+
+
+async def list_upload_sessions(request):
+    """List chunked upload sessions that have not been finalized"""
+    sessions = [upload_sessions.describe(session) for session in upload_sessions.list_sessions()]
+    return web.json_response({
+        "success": True,
+        "sessions": sessions,
+        "count": len(sessions)
+    })
+
+
+async def get_upload_session(request):
+    """Offset, received bytes and missing ranges of an upload session (also answers HEAD)"""
+    session = upload_sessions.get(request.match_info['session_id'])
+    if not session:
+        return web.json_response({
+            "success": False,
+            "error": "Upload session not found"
+        }, status=404)
+    return upload_session_response(session)
+
+
+async def upload_session_chunk(request):
+    """
+    Write one chunk of an upload session.
+
+    PUT body: raw bytes, written at the offset given by the Upload-Offset header
+    (or ?offset=). Chunks may arrive in any order and in parallel. With an
+    X-Chunk-SHA256 header the chunk is only counted after its hash matches;
+    without one, whatever arrived before a dropped connection is kept.
+    """
+    session = upload_sessions.get(request.match_info['session_id'])
+    if not session:
+        return web.json_response({
+            "success": False,
+            "error": "Upload session not found"
+        }, status=404)
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.query.get('offset', '')))
+    except ValueError:
+        return web.json_response({
+            "success": False,
+            "error": "Chunk offset is required (Upload-Offset header or ?offset=)"
+        }, status=400)
+    length = request.content_length
+    if offset < 0 or offset > session["size"] or (length is not None and offset + length > session["size"]):
+        return web.json_response({
+            "success": False,
+            "error": f"Chunk does not fit in the declared upload size ({session['size']:,} bytes)"
+        }, status=416)
+
+    expected_hash = (request.headers.get('X-Chunk-SHA256') or '').strip().lower() or None
+    digest = hashlib.sha256() if expected_hash else None
+
+    # Registered before any await, so a finalize either sees this write or rejects it
+    if not upload_sessions.try_begin_write(session):
+        return web.json_response({
+            "success": False,
+            "error": "Upload session is being finalized"
+        }, status=409)
+
+    fd = None
+    position = offset
+    verified = expected_hash is None
+    finished = False
+    try:
+        fd = await run_io(open_upload_file, session["data_path"])
+        buffer = bytearray()
+        async for data in request.content.iter_chunked(1024 * 1024):
+            if position + len(buffer) + len(data) > session["size"]:
+                finished = True
+                return web.json_response({
+                    "success": False,
+                    "error": f"Chunk does not fit in the declared upload size ({session['size']:,} bytes)"
+                }, status=416)
+            buffer += data
+            if len(buffer) >= WRITE_BUFFER_SIZE:
+                await run_io(write_at, fd, buffer, position)
+                if digest:
+                    digest.update(buffer)
+                position += len(buffer)
+                buffer = bytearray()
+        if buffer:
+            await run_io(write_at, fd, buffer, position)
+            if digest:
+                digest.update(buffer)
+            position += len(buffer)
+
+        if digest:
+            verified = digest.hexdigest() == expected_hash
+            if not verified:
+                finished = True
+                return web.json_response({
+                    "success": False,
+                    "error": "Chunk SHA256 mismatch; send the chunk again"
+                }, status=422)
+        finished = True
+    finally:
+        upload_sessions.end_write(session, offset, position if verified else offset)
+        if fd is not None:
+            os.close(fd)
+        if not finished:
+            # Dropped connection: keep what arrived so the client can continue from it
+            try:
+                await run_io(upload_sessions.save, session)
+            except Exception as e:
+                print(f"[UPLOAD] Failed to save upload session {session['id']}: {e}")
+
+    try:
+        await run_io(upload_sessions.save, session)
+    except Exception as e:
+        # The chunk is recorded in memory; the next save persists it
+        print(f"[UPLOAD] Failed to save upload session {session['id']}: {e}")
+    return upload_session_response(session)
+
+
+async def finalize_upload_session(request):
+    """
+    Verify a complete upload session against its SHA256 and move it into place.
+
+    Optional body: {"sha256": "<hex>"} if it was not given when the session was created.
+    """
+    try:
+        session = upload_sessions.get(request.match_info['session_id'])
+        if not session:
+            return web.json_response({
+                "success": False,
+                "error": "Upload session not found"
+            }, status=404)
+
+        sha256 = None
+        if request.can_read_body:
+            try:
+                data = await request.json()
+                sha256 = (data.get('sha256') or '').strip().lower() or None
+            except Exception:
+                pass
+
+        try:
+            # Hashes the whole file
+            actual = await run_job(upload_sessions.finalize, session, sha256)
+        except UploadSessionError as e:
+            response = {"success": False, "error": str(e), "session": upload_sessions.describe(session)}
+            return web.json_response(response, status=e.status)
+
+        file_stats = os.stat(session["target_path"])
+        folder, subfolder, filename = session["folder"], session["subfolder"], session["filename"]
+        print(f"[UPLOAD] Success: File uploaded - {filename} ({file_stats.st_size:,} bytes, sha256 {actual})")
+        return web.json_response({
+            "success": True,
+            "message": f"Successfully uploaded {filename} to {folder}" + (f"/{subfolder}" if subfolder else ""),
+            "file_info": {
+                "filename": filename,
+                "folder": folder,
+                "subfolder": subfolder,
+                "size": file_stats.st_size,
+                "size_mb": round(file_stats.st_size / (1024 * 1024), 2),
+                "modified": file_stats.st_mtime,
+                "modified_iso": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(file_stats.st_mtime)),
+                "path": session["target_path"],
+                "relative_path": os.path.join(folder, subfolder, filename) if subfolder else os.path.join(folder, filename),
+                "sha256": actual,
+                "autov2": autov2_from_sha256(actual)
+            }
+        })
+
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to finalize upload: {str(e)}"
+        }, status=500)
+
+
+async def delete_upload_session(request):
+    """Abort an upload session and delete its data"""
+    session_id = request.match_info['session_id']
+    session = upload_sessions.get(session_id)
+    if not session:
+        return web.json_response({
+            "success": False,
+            "error": "Upload session not found"
+        }, status=404)
+    if session["active_writes"] or session["status"] != "uploading":
+        return web.json_response({
+            "success": False,
+            "error": "Upload session is busy"
+        }, status=409)
+
+    await run_io(upload_sessions.remove, session_id)
+    print(f"[UPLOAD] Aborted upload session {session_id} ({session['filename']})")
+    return web.json_response({
+        "success": True,
+        "message": f"Upload session cancelled: {session['filename']}"
+    })
+
+
+async def get_model_hash(request):
+    """Get SHA256/AutoV2 of one model file (?path=<folder>/<subfolder>/<filename>)"""
+    try:
+        rel_path = request.query.get('path', '').replace('\\', '/').strip('/')
+        if not rel_path or '..' in rel_path.split('/'):
+            return web.json_response({
+                "success": False,
+                "error": "Invalid or missing path"
+            }, status=400)
+
+        if not os.path.isfile(os.path.join(get_models_path(), *rel_path.split('/'))):
+            return web.json_response({
+                "success": False,
+                "error": f"Model file not found: {rel_path}"
+            }, status=404)
+
+        hashes = model_hasher.get_hash(rel_path)
+        if hashes is None:
+            # Not hashed yet (new or changed file); make sure a pass picks it up
+            model_hasher.wake()
+
+        return web.json_response({
+            "success": True,
+            "path": rel_path,
+            "hashed": hashes is not None,
+            "sha256": hashes["sha256"] if hashes else None,
+            "autov2": hashes["autov2"] if hashes else None
+        })
+
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to get model hash: {str(e)}"
+        }, status=500)
+
+
+async def find_models_by_hash(request):
+    """Find model files by SHA256 or AutoV2 hash"""
+    try:
+        file_hash = request.match_info['hash']
+        if len(file_hash) not in (10, 64):
+            return web.json_response({
+                "success": False,
+                "error": "Hash must be a SHA256 (64 hex digits) or AutoV2 (10 hex digits)"
+            }, status=400)
+
+        matches = model_hasher.find_by_hash(file_hash)
+        return web.json_response({
+            "success": True,
+            "hash": file_hash,
+            "matches": matches,
+            "count": len(matches)
+        })
+
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to find models by hash: {str(e)}"
+        }, status=500)
+
+
+async def get_model_hash_status(request):
+    """Get progress of the background model hashing service"""
+    return web.json_response({
+        "success": True,
+        "status": model_hasher.get_status()
+    })
+
+
+def start_dedupe_job(job_type, run):
+    """Register a duplicate scan or dedupe job and start it in the background"""
+    global dedupe_job_counter
+    prune_finished_jobs(dedupe_jobs)
+    dedupe_job_counter += 1
+    job_id = f"{job_type}_{dedupe_job_counter}_{int(time.time())}"
+    dedupe_jobs[job_id] = {
+        "id": job_id,
+        "type": job_type,
+        "status": "queued",
+        "created_at": time.time(),
+        "started_at": None,
+        "completed_at": None,
+        "error": None,
+        "error_status": None,
+        "result": None
+    }
+    task = asyncio.ensure_future(perform_dedupe_job(job_id, run))
+    return dedupe_jobs[job_id], task
+
+def get_active_dedupe_job():
+    for job in dedupe_jobs.values():
+        if job["status"] in ("queued", "running"):
+            return job
+    return None
+
+async def perform_dedupe_job(job_id, run):
+    """Run a scan or dedupe on the job pool; the lock is held by the job, not by a request"""
+    job = dedupe_jobs[job_id]
+    
+    def run_locked():
+        # Waits for a job whose request went away but whose worker is still busy
+        with dedupe_lock:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            return run()
+    
+    try:
+        job["result"] = await run_job(run_locked)
+        job["status"] = "completed"
+    except Exception as e:
+        job["status"] = "error"
+        job["error"] = str(e)
+        # A file that cannot be linked is a bad request, not a server failure
+        job["error_status"] = 400 if isinstance(e, DedupeError) else 500
+        print(f"❌ Model {job['type']} job failed: {str(e)}")
+    finally:
+        job["completed_at"] = time.time()
+    return job
+
+def dedupe_job_response(job):
+    """Response for a duplicate job: its result when completed, its status otherwise"""
+    if job["status"] == "error":
+        return web.json_response({
+            "success": False,
+            "job_id": job["id"],
+            "error": job["error"]
+        }, status=job["error_status"])
+    if job["status"] != "completed":
+        return web.json_response({
+            "success": True,
+            "job_id": job["id"],
+            "status": job["status"],
+            "message": f"Model {job['type']} job started"
+        }, status=202)
+    return web.json_response(dict(job["result"], success=True, job_id=job["id"], status=job["status"]))
+
+async def find_duplicate_models(request):
+    """
+    Start a scan for groups of identical model files (?min_size_mb= ignores smaller files).
+
+    Uncached files are hashed in full, which can take a long time on a large library,
+    so the scan runs as a background job; poll /models/duplicates/jobs/{job_id}.
+    ?wait=true answers once the scan is done.
+    """
+    try:
+        try:
+            min_size = int(float(request.query.get('min_size_mb', DEDUPE_MIN_SIZE / (1024 * 1024))) * 1024 * 1024)
+        except ValueError:
+            return web.json_response({
+                "success": False,
+                "error": "'min_size_mb' must be a number"
+            }, status=400)
+
+        active = get_active_dedupe_job()
+        if active:
+            return web.json_response({
+                "success": False,
+                "job_id": active["id"],
+                "error": "A duplicate scan or dedupe is already running"
+            }, status=409)
+
+        def run():
+            # Sizes and partial hashes are cheap; full hashes come from the hash cache where possible
+            groups = find_duplicate_groups(min_size)
+            return {
+                "groups": groups,
+                "group_count": len(groups),
+                "reclaimable_bytes": sum(group["reclaimable_bytes"] for group in groups)
+            }
+
+        job, task = start_dedupe_job("scan", run)
+        if request.query.get('wait', '').lower() in ('1', 'true'):
+            # Shielded: a dropped request leaves the job running
+            await asyncio.shield(task)
+        return dedupe_job_response(job)
+
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to find duplicate models: {str(e)}"
+        }, status=500)
+
+
+async def dedupe_models(request):
+    """
+    Replace duplicate model files with links to one copy, as a background job.
+
+    Body: {"files": [...], "keep": "<path>", "mode": "auto"|"reflink"|"hardlink"}
+       or {"all": true, "mode": ...} to dedupe every duplicate group.
+    Add "wait": true to answer once the dedupe is done.
+    """
+    try:
+        data = await request.json()
+        mode = data.get('mode', 'auto')
+        if mode not in DEDUPE_MODES:
+            return web.json_response({
+                "success": False,
+                "error": f"'mode' must be one of: {', '.join(DEDUPE_MODES)}"
+            }, status=400)
+
+        files = data.get('files') or []
+        keep = data.get('keep')
+        dedupe_all = data.get('all', False)
+        if not dedupe_all:
+            if not isinstance(files, list) or len(files) < 2:
+                return web.json_response({
+                    "success": False,
+                    "error": "Provide at least two 'files' or set 'all': true"
+                }, status=400)
+            if keep is not None and keep not in files:
+                return web.json_response({
+                    "success": False,
+                    "error": "'keep' must be one of 'files'"
+                }, status=400)
+            for rel_path in files:
+                if not isinstance(rel_path, str) or '..' in rel_path.replace('\\', '/').split('/') or os.path.isabs(rel_path):
+                    return web.json_response({
+                        "success": False,
+                        "error": f"Invalid file path: {rel_path}"
+                    }, status=400)
+
+        active = get_active_dedupe_job()
+        if active:
+            return web.json_response({
+                "success": False,
+                "job_id": active["id"],
+                "error": "A duplicate scan or dedupe is already running"
+            }, status=409)
+
+        def run():
+            if not dedupe_all:
+                results = [dedupe_files(files, keep, mode)]
+            else:
+                results = [
+                    dedupe_files([entry["path"] for entry in group["files"]], None, mode)
+                    for group in find_duplicate_groups()
+                ]
+            return {
+                "groups": results,
+                "freed_bytes": sum(result["freed_bytes"] for result in results)
+            }
+
+        job, task = start_dedupe_job("dedupe", run)
+        if data.get('wait', False):
+            # Shielded: a dropped request leaves the job running
+            await asyncio.shield(task)
+        return dedupe_job_response(job)
+
+    except json.JSONDecodeError:
+        return web.json_response({
+            "success": False,
+            "error": "Invalid JSON data"
+        }, status=400)
+    except Exception as e:
+        return web.json_response({
+            "success": False,
+            "error": f"Failed to dedupe models: {str(e)}"
+        }, status=500)
+
+def build_dedupe_job_entry(job):
+    """API view of a duplicate scan or dedupe job"""
+    return {
+        "id": job["id"],
+        "type": job["type"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "completed_at": job["completed_at"],
+        "error": job["error"]
+    }
+
+async def list_dedupe_jobs(request):
+    """Get status of all duplicate scan and dedupe jobs"""
+    prune_finished_jobs(dedupe_jobs)
+    jobs = sorted(dedupe_jobs.values(), key=lambda job: job["created_at"], reverse=True)
+    return web.json_response({
+        "success": True,
+        "jobs": [build_dedupe_job_entry(job) for job in jobs]
+    })
+
+async def get_dedupe_job(request):
+    """Get status of one duplicate scan or dedupe job, with its result once completed"""
+    job = dedupe_jobs.get(request.match_info['job_id'])
+    if job is None:
+        return web.json_response({
+            "success": False,
+            "error": f"Dedupe job not found: {request.match_info['job_id']}"
+        }, status=404)
+    return web.json_response({
+        "success": True,
+        "job": dict(build_dedupe_job_entry(job), result=job["result"])
+    })
@@ -9,6 +9,7 @@ from typing import Dict, List, Any, Optional
 from aiohttp import web
 import folder_paths
 from ..utils.file_utils import get_file_info
+from ..utils.io_executor import run_io, read_json, write_json
 
 def get_node_mappings_directory() -> str:
     """Get the node mappings directory path"""
@@ -86,29 +87,35 @@ def parse_scope_from_filename(filename: str) -> Dict[str, Any]:
     # Fallback to global if pattern doesn't match
     return {'type': 'global'}
 
+def load_node_mappings(node_mappings_dir: str) -> List[Dict[str, Any]]:
+    """Read every node mapping file (blocking; run through run_io)"""
+    node_mappings = []
+    
+    if os.path.exists(node_mappings_dir):
+        for file in os.listdir(node_mappings_dir):
+            if file.endswith('.json'):
+                file_path = os.path.join(node_mappings_dir, file)
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        node_mapping = json.load(f)
+                    
+                    # Ensure scope information is present
+                    if 'scope' not in node_mapping:
+                        # Parse scope from filename as fallback
+                        node_mapping['scope'] = parse_scope_from_filename(file)
+                    
+                    node_mappings.append(node_mapping)
+                except Exception as e:
+                    print(f"Error reading node mapping file {file}: {e}")
+                    continue
+    
+    return node_mappings
+
 async def get_all_node_mappings(request):
     """Get all custom node input mappings"""
     try:
         node_mappings_dir = get_node_mappings_directory()
-        node_mappings = []
-        
-        if os.path.exists(node_mappings_dir):
-            for file in os.listdir(node_mappings_dir):
-                if file.endswith('.json'):
-                    file_path = os.path.join(node_mappings_dir, file)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            node_mapping = json.load(f)
-                        
-                        # Ensure scope information is present
-                        if 'scope' not in node_mapping:
-                            # Parse scope from filename as fallback
-                            node_mapping['scope'] = parse_scope_from_filename(file)
-                        
-                        node_mappings.append(node_mapping)
-                    except Exception as e:
-                        print(f"Error reading node mapping file {file}: {e}")
-                        continue
+        node_mappings = await run_io(load_node_mappings, node_mappings_dir)
         
         print(f"DEBUG: Sending {len(node_mappings)} node_mappings to client")
         return web.json_response(node_mappings)
@@ -161,9 +168,8 @@ async def save_node_mapping(request):
         import datetime
         if os.path.exists(file_path):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    existing = json.load(f)
-                    mapping_data['createdAt'] = existing.get('createdAt', datetime.datetime.now().isoformat())
+                existing = await read_json(file_path)
+                mapping_data['createdAt'] = existing.get('createdAt', datetime.datetime.now().isoformat())
             except Exception:
                 mapping_data['createdAt'] = datetime.datetime.now().isoformat()
         else:
@@ -172,8 +178,7 @@ async def save_node_mapping(request):
         mapping_data['updatedAt'] = datetime.datetime.now().isoformat()
         
         # Save node mapping
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(mapping_data, f, indent=2, ensure_ascii=False)
+        await write_json(file_path, mapping_data)
         
         print(f"Saved node mapping for: {node_type}")
         print(f"Scope: {scope['type']}")
@@ -237,8 +242,7 @@ async def get_node_mapping(request):
             }, status=404)
         
         file_path = os.path.join(node_mappings_dir, matching_file)
-        with open(file_path, 'r', encoding='utf-8') as f:
-            node_mapping = json.load(f)
+        node_mapping = await read_json(file_path)
         
         # Ensure scope information is present
         if 'scope' not in node_mapping:
@@ -291,7 +295,7 @@ async def delete_node_mapping(request):
             }, status=404)
         
         # Delete the specific file
-        os.remove(file_path)
+        await run_io(os.remove, file_path)
         
         print(f"Deleted node mapping: {node_type}")
         print(f"Scope: {scope}")
@@ -5,6 +5,7 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional
 from aiohttp import web
 from .lora_handler import get_mobile_data_path
+from ..utils.io_executor import run_io, read_json, write_json
 
 def get_snapshots_directory_path():
     """Get the snapshots directory path"""
@@ -17,6 +18,46 @@ def ensure_snapshots_directory():
     os.makedirs(snapshots_path, exist_ok=True)
     return snapshots_path
 
+def scan_snapshots(snapshots_path: str, workflow_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Read snapshot summaries, newest first (blocking; run through run_io)"""
+    snapshots = []
+    
+    # Read all JSON files in snapshots directory, or those matching the workflow_id
+    for filename in os.listdir(snapshots_path):
+        if not filename.endswith('.json'):
+            continue
+        if workflow_id is not None and not filename.startswith(f"{workflow_id}_"):
+            continue
+        file_path = os.path.join(snapshots_path, filename)
+        try:
+            # Get file stats
+            file_stats = os.stat(file_path)
+            file_size = file_stats.st_size
+            
+            # Load and parse snapshot data
+            with open(file_path, 'r', encoding='utf-8') as f:
+                snapshot_data = json.load(f)
+            
+            # Double-check workflow_id matches
+            if workflow_id is not None and snapshot_data.get("workflow_id") != workflow_id:
+                continue
+            
+            snapshots.append({
+                "workflow_id": snapshot_data.get("workflow_id", ""),
+                "title": snapshot_data.get("title", "Untitled"),
+                "createdAt": snapshot_data.get("createdAt", ""),
+                "filename": filename,
+                "fileSize": file_size
+            })
+            
+        except Exception as e:
+            print(f"[SNAPSHOT] Error reading snapshot file {filename}: {e}")
+            continue
+    
+    # Sort by creation date (newest first)
+    snapshots.sort(key=lambda x: x['createdAt'], reverse=True)
+    return snapshots
+
 async def save_workflow_snapshot(request):
     """Save a workflow snapshot"""
     try:
@@ -61,8 +102,7 @@ async def save_workflow_snapshot(request):
         
         # Save to file
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(snapshot_data, f, indent=2, ensure_ascii=False)
+            await write_json(file_path, snapshot_data)
                 
             print(f"[SNAPSHOT] Saved workflow snapshot: {filename}")
             
@@ -107,8 +147,7 @@ async def load_workflow_snapshot(request):
         
         # Load snapshot data
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                snapshot_data = json.load(f)
+            snapshot_data = await read_json(file_path)
                 
             return web.json_response({
                 "success": True,
@@ -141,35 +180,7 @@ async def list_all_snapshots(request):
                 "total_count": 0
             })
         
-        snapshots = []
-        
-        # Read all JSON files in snapshots directory
-        for filename in os.listdir(snapshots_path):
-            if filename.endswith('.json'):
-                file_path = os.path.join(snapshots_path, filename)
-                try:
-                    # Get file stats
-                    file_stats = os.stat(file_path)
-                    file_size = file_stats.st_size
-                    
-                    # Load and parse snapshot data
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        snapshot_data = json.load(f)
-                    
-                    snapshots.append({
-                        "workflow_id": snapshot_data.get("workflow_id", ""),
-                        "title": snapshot_data.get("title", "Untitled"),
-                        "createdAt": snapshot_data.get("createdAt", ""),
-                        "filename": filename,
-                        "fileSize": file_size
-                    })
-                    
-                except Exception as e:
-                    print(f"[SNAPSHOT] Error reading snapshot file {filename}: {e}")
-                    continue
-        
-        # Sort by creation date (newest first)
-        snapshots.sort(key=lambda x: x['createdAt'], reverse=True)
+        snapshots = await run_io(scan_snapshots, snapshots_path)
         
         return web.json_response({
             "success": True,
@@ -202,37 +213,7 @@ async def list_snapshots_by_workflow(request):
                 "total_count": 0
             })
         
-        snapshots = []
-        
-        # Read all JSON files that match the workflow_id
-        for filename in os.listdir(snapshots_path):
-            if filename.endswith('.json') and filename.startswith(f"{workflow_id}_"):
-                file_path = os.path.join(snapshots_path, filename)
-                try:
-                    # Get file stats
-                    file_stats = os.stat(file_path)
-                    file_size = file_stats.st_size
-                    
-                    # Load and parse snapshot data
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        snapshot_data = json.load(f)
-                    
-                    # Double-check workflow_id matches
-                    if snapshot_data.get("workflow_id") == workflow_id:
-                        snapshots.append({
-                            "workflow_id": workflow_id,
-                            "title": snapshot_data.get("title", "Untitled"),
-                            "createdAt": snapshot_data.get("createdAt", ""),
-                            "filename": filename,
-                            "fileSize": file_size
-                        })
-                    
-                except Exception as e:
-                    print(f"[SNAPSHOT] Error reading snapshot file {filename}: {e}")
-                    continue
-        
-        # Sort by creation date (newest first)
-        snapshots.sort(key=lambda x: x['createdAt'], reverse=True)
+        snapshots = await run_io(scan_snapshots, snapshots_path, workflow_id)
         
         return web.json_response({
             "success": True,
@@ -269,15 +250,14 @@ async def delete_workflow_snapshot(request):
         # Get snapshot title for response
         snapshot_title = "Unknown"
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                snapshot_data = json.load(f)
-                snapshot_title = snapshot_data.get('title', filename)
+            snapshot_data = await read_json(file_path)
+            snapshot_title = snapshot_data.get('title', filename)
         except:
             pass
         
         # Delete the file
         try:
-            os.remove(file_path)
+            await run_io(os.remove, file_path)
             print(f"[SNAPSHOT] Deleted workflow snapshot: {filename}")
             
             return web.json_response({
@@ -332,8 +312,7 @@ async def rename_workflow_snapshot(request):
         
         # Load current snapshot data
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                snapshot_data = json.load(f)
+            snapshot_data = await read_json(file_path)
         except Exception as e:
             return web.json_response({
                 "success": False,
@@ -345,8 +324,7 @@ async def rename_workflow_snapshot(request):
         snapshot_data['title'] = new_title
         
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(snapshot_data, f, indent=2, ensure_ascii=False)
+            await write_json(file_path, snapshot_data)
             
             print(f"[SNAPSHOT] Renamed workflow snapshot: '{old_title}' -> '{new_title}' ({filename})")
             
@@ -3,6 +3,7 @@ import sys
 import asyncio
 from typing import Dict, List, Any, Optional
 from aiohttp import web
+from ..utils.io_executor import io_executor
 
 # Define route handlers as regular functions (to be registered dynamically)
 async def api_status(request):
@@ -33,6 +34,7 @@ async def api_status(request):
             # Core endpoints
             "GET /comfymobile/api/status",
             "POST /comfymobile/api/reboot",
+            "GET /comfymobile/api/system/io-stats",
             
             # Workflow endpoints
             "GET /comfymobile/api/workflows/list", 
@@ -56,6 +58,11 @@ async def api_status(request):
             "POST /comfymobile/api/models/copy",
             "POST /comfymobile/api/models/delete",
             "POST /comfymobile/api/models/rename",
+            "POST /comfymobile/api/models/uploads/sessions",
+            "GET /comfymobile/api/models/uploads/sessions/{session_id}",
+            "PUT /comfymobile/api/models/uploads/sessions/{session_id}",
+            "POST /comfymobile/api/models/uploads/sessions/{session_id}/finalize",
+            "DELETE /comfymobile/api/models/uploads/sessions/{session_id}",
             
             # Model download endpoints
             "POST /comfymobile/api/models/download",
@@ -137,3 +144,11 @@ async def reboot_server(request):
             "status": "error",
             "message": f"Failed to initiate reboot: {str(e)}"
         }, status=500)
+
+
+async def get_io_stats(request):
+    """Queue depth and latency of the shared I/O executor"""
+    return web.json_response({
+        "status": "success",
+        "io": io_executor.get_stats()
+    })
@@ -270,28 +270,29 @@ async def subscribe_to_logs(request):
         comfyui_port = detect_comfyui_port()
 
         import aiohttp
+        from ..utils.http_client import get_http_session
         url = f"http://127.0.0.1:{comfyui_port}/internal/logs/subscribe"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.patch(
-                url,
-                json={"enabled": True, "clientId": client_id},
-                headers={"Content-Type": "application/json"},
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                if response.status == 200:
-                    return web.json_response({
-                        "success": True,
-                        "message": "Successfully subscribed to logs",
-                        "clientId": client_id
-                    })
-                else:
-                    error_text = await response.text()
-                    return web.json_response({
-                        "success": False,
-                        "error": f"Failed to subscribe: HTTP {response.status}",
-                        "details": error_text
-                    }, status=response.status)
+        session = get_http_session()
+        async with session.patch(
+            url,
+            json={"enabled": True, "clientId": client_id},
+            headers={"Content-Type": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            if response.status == 200:
+                return web.json_response({
+                    "success": True,
+                    "message": "Successfully subscribed to logs",
+                    "clientId": client_id
+                })
+            else:
+                error_text = await response.text()
+                return web.json_response({
+                    "success": False,
+                    "error": f"Failed to subscribe: HTTP {response.status}",
+                    "details": error_text
+                }, status=response.status)
 
     except Exception as e:
         return web.json_response({
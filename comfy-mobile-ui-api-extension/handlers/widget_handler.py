@@ -9,6 +9,7 @@ from typing import Dict, List, Any, Optional
 from aiohttp import web
 import folder_paths
 from ..utils.file_utils import get_file_info
+from ..utils.io_executor import run_io, read_json, write_json, file_lock
 
 def get_widget_types_directory() -> str:
     """Get the widget types directory path"""
@@ -20,24 +21,30 @@ def ensure_widget_types_directory() -> str:
     os.makedirs(widget_types_dir, exist_ok=True)
     return widget_types_dir
 
+def load_widget_types(widget_types_dir: str) -> List[Dict[str, Any]]:
+    """Read every widget type definition (blocking; run through run_io)"""
+    widget_types = []
+    
+    if os.path.exists(widget_types_dir):
+        for file in os.listdir(widget_types_dir):
+            if file.endswith('.json'):
+                file_path = os.path.join(widget_types_dir, file)
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        widget_type = json.load(f)
+                    
+                    widget_types.append(widget_type)
+                except Exception as e:
+                    print(f"Error reading widget type file {file}: {e}")
+                    continue
+    
+    return widget_types
+
 async def get_all_widget_types(request):
     """Get all custom widget type definitions"""
     try:
         widget_types_dir = get_widget_types_directory()
-        widget_types = []
-        
-        if os.path.exists(widget_types_dir):
-            for file in os.listdir(widget_types_dir):
-                if file.endswith('.json'):
-                    file_path = os.path.join(widget_types_dir, file)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            widget_type = json.load(f)
-                        
-                        widget_types.append(widget_type)
-                    except Exception as e:
-                        print(f"Error reading widget type file {file}: {e}")
-                        continue
+        widget_types = await run_io(load_widget_types, widget_types_dir)
         
         return web.json_response({
             'success': True,
@@ -71,8 +78,7 @@ async def get_widget_type(request):
                 'error': 'Widget type not found'
             }, status=404)
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            widget_type = json.load(f)
+        widget_type = await read_json(file_path)
         
         return web.json_response(widget_type)
         
@@ -119,8 +125,7 @@ async def create_widget_type(request):
         data['version'] = data.get('version', 1)
         
         # Save widget type
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        await write_json(file_path, data)
         
         print(f"Created widget type: {data['id']}")
         return web.json_response(data)
@@ -160,31 +165,31 @@ async def update_widget_type(request):
         widget_types_dir = ensure_widget_types_directory()
         file_path = os.path.join(widget_types_dir, f"{widget_type_id}.json")
         
-        # Read existing widget type to preserve createdAt
-        created_at = None
-        version = 1
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    existing = json.load(f)
+        # Read, bump the version and save as one step; concurrent updates must not reuse a version
+        async with file_lock(file_path):
+            # Read existing widget type to preserve createdAt
+            created_at = None
+            version = 1
+            if os.path.exists(file_path):
+                try:
+                    existing = await read_json(file_path)
                     created_at = existing.get('createdAt')
                     version = existing.get('version', 1) + 1
-            except Exception:
-                pass
-        
-        # Update metadata
-        import datetime
-        data['id'] = widget_type_id  # Ensure ID matches
-        if created_at:
-            data['createdAt'] = created_at
-        else:
-            data['createdAt'] = datetime.datetime.now().isoformat()
-        data['updatedAt'] = datetime.datetime.now().isoformat()
-        data['version'] = version
-        
-        # Save updated widget type
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+                except Exception:
+                    pass
+        
+            # Update metadata
+            import datetime
+            data['id'] = widget_type_id  # Ensure ID matches
+            if created_at:
+                data['createdAt'] = created_at
+            else:
+                data['createdAt'] = datetime.datetime.now().isoformat()
+            data['updatedAt'] = datetime.datetime.now().isoformat()
+            data['version'] = version
+        
+            # Save updated widget type
+            await write_json(file_path, data)
         
         print(f"Updated widget type: {widget_type_id}")
         return web.json_response(data)
@@ -221,7 +226,7 @@ async def delete_widget_type(request):
             }, status=404)
         
         # Delete the file
-        os.remove(file_path)
+        await run_io(os.remove, file_path)
         
         print(f"Deleted widget type: {widget_type_id}")
         return web.json_response({
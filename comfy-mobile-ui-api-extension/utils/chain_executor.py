@@ -3,8 +3,8 @@ Chain Execution Logic
 
 Handles execution of workflow chains by:
 1. Resolving input bindings (static/dynamic)
-2. Submitting workflows to ComfyUI
-3. Monitoring execution via WebSocket
+2. Submitting workflows to ComfyUI (directly into its prompt queue when running in-process)
+3. Monitoring execution events (from the PromptServer hook, or a WebSocket as fallback)
 4. Caching output files for next workflow
 5. Managing execution state and progress
 """
@@ -15,6 +15,8 @@ import json
 import shutil
 import os
 import time
+import uuid
+import inspect
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
@@ -29,6 +31,16 @@ except:
 # This ensures that events are broadcasted to the mobile client via our global hook
 SERVER_CLIENT_ID = "comfy-mobile-ui-client-2025"
 
+# An output file counts as fully written once its size and mtime stay unchanged for one poll interval
+OUTPUT_STABLE_POLL_INTERVAL = 0.1
+# Give up waiting for an output file to settle after this many seconds and cache it as it is
+OUTPUT_STABLE_TIMEOUT = 30
+
+# A workflow may wait this long in ComfyUI's queue (behind parallel branches or other
+# users' prompts), then has PROMPT_EXECUTION_TIMEOUT seconds once it starts running
+PROMPT_QUEUE_TIMEOUT = 3600
+PROMPT_EXECUTION_TIMEOUT = 600
+
 # Import progress manager
 try:
     from .chain_progress_manager import chain_progress_manager
@@ -39,26 +51,126 @@ except ImportError:
         chain_progress_manager = None
         print("[ChainExecutor] Warning: ChainProgressManager not available")
 
-class ChainExecutor:
-    """Executes a workflow chain step by step"""
+from .http_client import get_http_session
+from .io_executor import run_io
+from .global_websocket_manager import global_websocket_manager
+
+# "inprocess" (default) enqueues prompts and follows events inside this ComfyUI process;
+# "http" uses the loopback /prompt endpoint and WebSocket instead
+CHAIN_BACKEND = os.environ.get("COMFY_MOBILE_CHAIN_BACKEND", "inprocess").lower()
 
-    # Class variable to track if interruption was requested
-    _interrupt_requested = False
+
+def get_prompt_server():
+    """The running PromptServer, or None outside ComfyUI"""
+    try:
+        import server
+        return server.PromptServer.instance
+    except (ImportError, AttributeError):
+        return None
+
+
+def in_process_available() -> bool:
+    """Whether prompts can be queued and followed without loopback sockets"""
+    prompt_server = get_prompt_server()
+    return (
+        CHAIN_BACKEND != "http"
+        and prompt_server is not None
+        and hasattr(prompt_server, 'prompt_queue')
+        and global_websocket_manager.is_hooked()
+    )
+
+def build_dependency_graph(nodes: List[Dict[str, Any]], parallel: bool = True) -> Optional[List[set]]:
+    """
+    For each workflow node, the indices of the nodes it must wait for: the sources of
+    its dynamic input bindings (or simply the previous node when not parallel).
+    Returns None if the bindings form a cycle.
+    """
+    dependencies = []
+    for index, node in enumerate(nodes):
+        if not parallel:
+            dependencies.append({index - 1} if index else set())
+            continue
+        sources = set()
+        for binding in (node.get('inputBindings') or {}).values():
+            if not isinstance(binding, dict) or binding.get('type') != 'dynamic':
+                continue
+            source_index = binding.get('sourceWorkflowIndex')
+            if isinstance(source_index, int) and 0 <= source_index < len(nodes) and source_index != index:
+                sources.add(source_index)
+        dependencies.append(sources)
+
+    # Kahn's algorithm: every node must become ready eventually
+    remaining = {index: set(sources) for index, sources in enumerate(dependencies)}
+    while remaining:
+        ready = [index for index, sources in remaining.items() if not sources]
+        if not ready:
+            return None
+        for index in ready:
+            del remaining[index]
+        for sources in remaining.values():
+            sources.difference_update(ready)
+    return dependencies
+
+
+def cache_output_file(source_path: str, dest_path: str):
+    """
+    Copy an output into chain_result under a temporary name, check its size and
+    rename it into place, so a cached path only exists once the file is complete.
+    """
+    directory, name = os.path.split(dest_path)
+    temp_path = os.path.join(directory, f".{name}.partial")
+    try:
+        shutil.copy2(source_path, temp_path)
+        expected_size = os.path.getsize(source_path)
+        copied_size = os.path.getsize(temp_path)
+        if copied_size != expected_size:
+            raise OSError(f"Cached copy is {copied_size} bytes, expected {expected_size}")
+        os.replace(temp_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ChainExecutor:
+    """Executes a workflow chain, running workflows as their input bindings allow"""
 
     def __init__(self, chain_data: Dict[str, Any], server_url: str = "http://127.0.0.1:8188"):
         self.chain_data = chain_data
         self.server_url = server_url.rstrip('/')
         self.ws_url = server_url.replace('http://', 'ws://').replace('https://', 'wss://').rstrip('/')
-        self.execution_id = f"exec-{int(time.time() * 1000)}"
+        # Suffix keeps ids unique when several chains start in the same millisecond
+        self.execution_id = f"exec-{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}"
         self.output_cache: Dict[str, str] = {}  # (nodeId, outputNodeId) -> cached_path
         self.status = "pending"
         self.current_node_index = 0
         self.node_results: List[Dict[str, Any]] = []
         self.chain_id = chain_data.get('id')
         self.chain_name = chain_data.get('name', 'Unnamed Chain')
+        self.in_process = in_process_available()
+        # Independent workflows run concurrently unless the chain opts out with "parallel": false.
+        # Loopback WebSockets share one client id, so the HTTP fallback stays sequential.
+        self.parallel = bool(chain_data.get('parallel', True)) and self.in_process
+        # prompt_id -> event subscription opened at submission, consumed by the monitor
+        self.subscriptions: Dict[str, Any] = {}
+        # Cancel token of this execution only; see cancel()
+        self.cancel_event = asyncio.Event()
+        # Prompts of this execution queued or running in ComfyUI
+        self.prompt_ids: set = set()
+        # Running workflow node tasks -> chain index
+        self.node_tasks: Dict[asyncio.Task, int] = {}
+        # prompt_id -> monotonic time ComfyUI started executing it
+        self.execution_started: Dict[str, float] = {}
 
     async def execute(self) -> Dict[str, Any]:
-        """Execute the entire chain"""
+        """
+        Execute the entire chain.
+
+        Workflow nodes run as soon as the nodes their dynamic bindings read from
+        have completed, so independent branches are queued in ComfyUI together.
+        """
         try:
             self.status = "running"
             nodes = self.chain_data.get('nodes', [])
@@ -69,91 +181,122 @@ class ChainExecutor:
                     "error": "No workflow nodes in chain"
                 }
 
+            dependencies = build_dependency_graph(nodes, parallel=self.parallel)
+            if dependencies is None:
+                return {
+                    "success": False,
+                    "error": "Input bindings form a cycle between workflow nodes"
+                }
+
             # Broadcast chain execution start
             if chain_progress_manager:
                 await chain_progress_manager.start_chain_execution(
                     self.chain_id,
                     self.chain_name,
                     self.execution_id,
-                    nodes
+                    nodes,
+                    dependencies
                 )
 
             # Ensure chain_result folder exists
             await self._ensure_chain_result_folder()
 
-            # Execute each workflow node in sequence
-            for index, node in enumerate(nodes):
-                # Check for interrupt before starting each workflow
-                if self._interrupt_requested:
+            pending = set(range(len(nodes)))
+            completed = set()
+            running = self.node_tasks
+            # chain index -> (wall clock, monotonic) time the workflow node started
+            launched: Dict[int, tuple] = {}
+            failure = None
+
+            while pending or running:
+                # Check for interrupt before starting more workflows
+                if self.cancel_event.is_set() and failure is None:
                     print(f"[ChainExecutor] Interrupt detected, stopping chain execution")
+                    failure = "Chain execution interrupted by user"
                     self.status = "interrupted"
 
-                    if chain_progress_manager:
-                        await chain_progress_manager.complete_chain_execution(
-                            False,
-                            "Chain execution interrupted by user"
-                        )
-
-                    return {
-                        "success": False,
-                        "executionId": self.execution_id,
-                        "error": "Chain execution interrupted by user",
-                        "nodeResults": self.node_results
-                    }
-
-                self.current_node_index = index
-
-                print(f"\n[ChainExecutor] Executing workflow node {index + 1}/{len(nodes)}: {node.get('name', 'Unnamed')}")
-
-                # Broadcast workflow start
-                if chain_progress_manager:
-                    await chain_progress_manager.update_workflow_status(index, 'running')
-
-                node_result = await self._execute_workflow_node(node, index)
-                self.node_results.append(node_result)
-
-                if not node_result.get('success'):
-                    self.status = "failed"
+                # Start every workflow whose sources are done
+                if failure is None:
+                    for index in sorted(pending):
+                        if dependencies[index] <= completed:
+                            pending.discard(index)
+                            self.current_node_index = index
+                            node = nodes[index]
+                            print(f"\n[ChainExecutor] Executing workflow node {index + 1}/{len(nodes)}: {node.get('name', 'Unnamed')}")
+
+                            # Broadcast workflow start
+                            if chain_progress_manager:
+                                await chain_progress_manager.update_workflow_status(self.execution_id, index, 'running')
+
+                            task = asyncio.ensure_future(self._execute_workflow_node(node, index))
+                            running[task] = index
+                            launched[index] = (time.time(), time.monotonic())
+
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = running.pop(task)
+                    if task.cancelled():
+                        node_result = {
+                            "success": False,
+                            "nodeId": nodes[index].get('id'),
+                            "error": "Interrupted"
+                        }
+                    else:
+                        node_result = task.result()
+                    node_result["index"] = index
+                    node_result["startedAt"] = launched[index][0]
+                    node_result["durationMs"] = round((time.monotonic() - launched[index][1]) * 1000, 1)
+                    self.node_results.append(node_result)
+
+                    if node_result.get('success'):
+                        completed.add(index)
+
+                        # Broadcast workflow completion; its outputs are already cached and verified,
+                        # so workflows that depend on it start right away
+                        if chain_progress_manager:
+                            await chain_progress_manager.update_workflow_status(
+                                self.execution_id, index, 'completed', handoff_ms=node_result.get('handoffMs')
+                            )
+                        continue
 
-                    # Broadcast workflow failure
+                    # Broadcast workflow failure; running siblings finish, nothing new starts
                     if chain_progress_manager:
                         await chain_progress_manager.update_workflow_status(
+                            self.execution_id,
                             index,
                             'failed',
                             node_result.get('error')
                         )
-                        await chain_progress_manager.complete_chain_execution(
-                            False,
-                            f"Workflow node {index + 1} failed: {node_result.get('error')}"
-                        )
+                    if failure is None:
+                        if self.cancel_event.is_set():
+                            self.status = "interrupted"
+                            failure = "Chain execution interrupted by user"
+                        else:
+                            self.status = "failed"
+                            failure = f"Workflow node {index + 1} failed: {node_result.get('error')}"
 
-                    return {
-                        "success": False,
-                        "executionId": self.execution_id,
-                        "error": f"Workflow node {index + 1} failed: {node_result.get('error')}",
-                        "nodeResults": self.node_results
-                    }
+            self.node_results.sort(key=lambda result: result["index"])
 
-                # Broadcast workflow completion
+            if failure is not None:
                 if chain_progress_manager:
-                    await chain_progress_manager.update_workflow_status(index, 'completed')
+                    await chain_progress_manager.complete_chain_execution(self.execution_id, False, failure)
 
-                # Wait 10 seconds after each workflow to ensure file copy completes
-                # This prevents timing issues with large files
-                if index < len(nodes) - 1:  # Don't wait after last workflow
-                    # Set next workflow to 'waiting' status
-                    next_index = index + 1
-                    if chain_progress_manager:
-                        await chain_progress_manager.update_workflow_status(next_index, 'waiting')
-
-                    print(f"[ChainExecutor] Waiting 10 seconds for file operations to complete...")
-                    await asyncio.sleep(10)
+                return {
+                    "success": False,
+                    "executionId": self.execution_id,
+                    "status": self.status,
+                    "error": failure,
+                    "nodeResults": self.node_results
+                }
 
             self.status = "completed"
 
             # Broadcast chain completion
             if chain_progress_manager:
-                await chain_progress_manager.complete_chain_execution(True)
+                await chain_progress_manager.complete_chain_execution(self.execution_id, True)
 
             return {
                 "success": True,
@@ -168,7 +311,7 @@ class ChainExecutor:
 
             # Broadcast chain failure
             if chain_progress_manager:
-                await chain_progress_manager.complete_chain_execution(False, str(e))
+                await chain_progress_manager.complete_chain_execution(self.execution_id, False, str(e))
 
             return {
                 "success": False,
@@ -199,6 +342,7 @@ class ChainExecutor:
             # Step 2: Submit workflow to ComfyUI
             print(f"[ChainExecutor] Submitting workflow to ComfyUI...")
             prompt_id = await self._submit_workflow(resolved_workflow)
+            submitted = time.monotonic()
 
             if not prompt_id:
                 return {
@@ -208,22 +352,34 @@ class ChainExecutor:
                 }
 
             print(f"[ChainExecutor] Workflow submitted with prompt_id: {prompt_id}")
+            self.prompt_ids.add(prompt_id)
 
-            # Step 3: Monitor execution via WebSocket
-            print(f"[ChainExecutor] Monitoring execution via WebSocket...")
+            # Step 3: Monitor execution events
+            print(f"[ChainExecutor] Monitoring execution via {'PromptServer events' if self.in_process else 'WebSocket'}...")
             outputs = await self._monitor_workflow_execution(prompt_id, resolved_workflow)
+            self.prompt_ids.discard(prompt_id)
+
+            # Time spent waiting in ComfyUI's queue, then executing
+            execution_start = self.execution_started.pop(prompt_id, submitted)
+            queue_ms = round((execution_start - submitted) * 1000, 1)
+            execution_ms = round((time.monotonic() - execution_start) * 1000, 1)
 
             if not outputs:
                 return {
                     "success": False,
                     "nodeId": node_id,
                     "promptId": prompt_id,
+                    "queueMs": queue_ms,
+                    "executionMs": execution_ms,
                     "error": "No outputs detected or execution failed"
                 }
 
-            # Step 4: Cache output files
+            # Step 4: Cache output files (the handoff: until these are in place the next workflow cannot start)
             print(f"[ChainExecutor] Caching {len(outputs)} output files...")
+            handoff_start = time.monotonic()
             cached_outputs = await self._cache_output_files(outputs, node_id)
+            handoff_ms = round((time.monotonic() - handoff_start) * 1000, 1)
+            print(f"[ChainExecutor] Handoff ready in {handoff_ms} ms")
 
             # Step 5: Update output cache for next workflow
             for output in cached_outputs:
@@ -236,7 +392,10 @@ class ChainExecutor:
                 "nodeId": node_id,
                 "nodeName": node_name,
                 "promptId": prompt_id,
-                "outputs": cached_outputs
+                "outputs": cached_outputs,
+                "queueMs": queue_ms,
+                "executionMs": execution_ms,
+                "handoffMs": handoff_ms
             }
 
         except Exception as e:
@@ -308,6 +467,62 @@ class ChainExecutor:
         return resolved_workflow
 
     async def _submit_workflow(self, api_workflow: Dict[str, Any]) -> Optional[str]:
+        """Submit workflow to ComfyUI (in-process queue when available, else the /prompt endpoint)"""
+        if self.in_process:
+            return await self._submit_workflow_in_process(api_workflow)
+        return await self._submit_workflow_http(api_workflow)
+
+    async def _submit_workflow_in_process(self, api_workflow: Dict[str, Any]) -> Optional[str]:
+        """
+        Validate and enqueue a workflow directly into PromptServer.prompt_queue, the way
+        ComfyUI's POST /prompt handler does, and subscribe to its events before it can run.
+        """
+        import execution
+
+        prompt_server = get_prompt_server()
+        prompt_id = str(uuid.uuid4())
+        json_data = {"prompt": api_workflow, "client_id": SERVER_CLIENT_ID}
+
+        try:
+            # Let other extensions rewrite the prompt, as they would over HTTP
+            if hasattr(prompt_server, 'trigger_on_prompt'):
+                json_data = prompt_server.trigger_on_prompt(json_data)
+            prompt = json_data["prompt"]
+
+            # validate_prompt signatures vary across ComfyUI versions (and it became async)
+            arguments = {"prompt_id": prompt_id, "prompt": prompt}
+            parameters = inspect.signature(execution.validate_prompt).parameters
+            valid = execution.validate_prompt(*[arguments.get(name) for name in parameters])
+            if inspect.isawaitable(valid):
+                valid = await valid
+
+            if not valid[0]:
+                print(f"[ChainExecutor] Failed to submit workflow: {valid[1]} {valid[3]}")
+                return None
+
+            extra_data = {"client_id": json_data.get("client_id", SERVER_CLIENT_ID)}
+            extra_data["create_time"] = int(time.time() * 1000)
+            outputs_to_execute = valid[2]
+
+            self.subscriptions[prompt_id] = global_websocket_manager.subscribe([prompt_id])
+
+            number = prompt_server.number
+            prompt_server.number += 1
+            item = (number, prompt_id, prompt, extra_data, outputs_to_execute)
+            if hasattr(execution, 'SENSITIVE_EXTRA_DATA_KEYS'):
+                # Newer queues carry a dict of sensitive extra data as a sixth element
+                item = item + ({},)
+            prompt_server.prompt_queue.put(item)
+            return prompt_id
+
+        except Exception as e:
+            print(f"[ChainExecutor] Error submitting workflow: {e}")
+            subscription = self.subscriptions.pop(prompt_id, None)
+            if subscription:
+                global_websocket_manager.unsubscribe(subscription)
+            return None
+
+    async def _submit_workflow_http(self, api_workflow: Dict[str, Any]) -> Optional[str]:
         """Submit workflow to ComfyUI /prompt endpoint"""
         import aiohttp
 
@@ -317,29 +532,70 @@ class ChainExecutor:
                 "client_id": SERVER_CLIENT_ID
             }
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.server_url}/prompt",
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get('prompt_id')
-                    else:
-                        error_text = await response.text()
-                        print(f"[ChainExecutor] Failed to submit workflow: {response.status} - {error_text}")
-                        return None
+            session = get_http_session()
+            async with session.post(
+                f"{self.server_url}/prompt",
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data.get('prompt_id')
+                else:
+                    error_text = await response.text()
+                    print(f"[ChainExecutor] Failed to submit workflow: {response.status} - {error_text}")
+                    return None
         except Exception as e:
             print(f"[ChainExecutor] Error submitting workflow: {e}")
             return None
 
+    async def _in_process_events(self, prompt_id: str, timing: Dict[str, float]):
+        """(type, data) of ComfyUI events for prompt_id, straight from the send_sync hook"""
+        subscription = self.subscriptions.pop(prompt_id)
+        try:
+            while True:
+                remaining = timing["deadline"] - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    yield await subscription.get(remaining)
+                except asyncio.TimeoutError:
+                    return
+        finally:
+            global_websocket_manager.unsubscribe(subscription)
+
+    async def _websocket_events(self, prompt_id: str, timing: Dict[str, float]):
+        """(type, data) of ComfyUI events read from a loopback WebSocket connection"""
+        ws_uri = f"{self.ws_url}/ws?clientId={SERVER_CLIENT_ID}"
+        print(f"[ChainExecutor] Connecting to WebSocket: {ws_uri}")
+
+        async with websockets.connect(ws_uri, ping_interval=20, ping_timeout=10) as websocket:
+            print(f"[ChainExecutor] WebSocket connected, waiting for execution...")
+
+            while time.monotonic() < timing["deadline"]:
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), timeout=5.0)
+                except asyncio.TimeoutError:
+                    # No message in 5 seconds, continue waiting
+                    continue
+
+                # Handle potential encoding issues
+                try:
+                    if isinstance(message, bytes):
+                        message = message.decode('utf-8', errors='replace')
+                    data = json.loads(message)
+                except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                    print(f"[ChainExecutor] Warning: Failed to decode message: {e}")
+                    continue
+
+                yield data.get('type'), data.get('data', {})
+
     async def _monitor_workflow_execution(
         self,
         prompt_id: str,
         api_workflow: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
-        """Monitor workflow execution via WebSocket and extract outputs"""
+        """Follow workflow execution events and extract outputs"""
 
         # Detect output nodes from workflow
         output_node_ids = self._detect_output_nodes(api_workflow)
@@ -347,182 +603,187 @@ class ChainExecutor:
 
         if not output_node_ids:
             print(f"[ChainExecutor] Warning: No output nodes detected in workflow")
+            subscription = self.subscriptions.pop(prompt_id, None)
+            if subscription:
+                global_websocket_manager.unsubscribe(subscription)
             return []
 
         outputs: List[Dict[str, Any]] = []
         completed_nodes = set()
         execution_failed = False
         execution_cached = False  # Track if workflow was fully cached
+        finished = False
 
-        try:
-            ws_uri = f"{self.ws_url}/ws?clientId={SERVER_CLIENT_ID}"
-            print(f"[ChainExecutor] Connecting to WebSocket: {ws_uri}")
-
-            async with websockets.connect(ws_uri, ping_interval=20, ping_timeout=10) as websocket:
-                print(f"[ChainExecutor] WebSocket connected, waiting for execution...")
-
-                # Set a timeout for the entire execution (10 minutes)
-                timeout = 600
-                start_time = time.time()
-
-                while time.time() - start_time < timeout:
-                    try:
-                        message = await asyncio.wait_for(websocket.recv(), timeout=5.0)
-
-                        # Handle potential encoding issues
-                        try:
-                            if isinstance(message, bytes):
-                                message = message.decode('utf-8', errors='replace')
-                            data = json.loads(message)
-                        except (UnicodeDecodeError, json.JSONDecodeError) as e:
-                            print(f"[ChainExecutor] Warning: Failed to decode message: {e}")
-                            continue
-
-                        msg_type = data.get('type')
-                        msg_data = data.get('data', {})
-
-                        # Check for execution errors
-                        if msg_type == 'execution_error':
-                            if msg_data.get('prompt_id') == prompt_id:
-                                print(f"[ChainExecutor] Execution error detected: {msg_data}")
-                                execution_failed = True
-                                break
-
-                        # Check for executed messages (node completed with output)
-                        elif msg_type == 'executed':
-                            node_id = msg_data.get('node')
-                            node_prompt_id = msg_data.get('prompt_id')
-
-                            if node_prompt_id == prompt_id and node_id in output_node_ids:
-                                output_data = msg_data.get('output', {})
-
-                                # Extract file info from output
-                                # Check for gifs/videos first (VHS nodes), then images
-                                files = output_data.get('gifs') or output_data.get('images', [])
-
-                                if files and len(files) > 0:
-                                    # Use first file (index 0)
-                                    file_info = files[0]
-                                    outputs.append({
-                                        'nodeId': node_id,
-                                        'filename': file_info.get('filename'),
-                                        'subfolder': file_info.get('subfolder', ''),
-                                        'type': file_info.get('type', 'output')
-                                    })
-                                    print(f"[ChainExecutor] Captured output from node {node_id}: {file_info.get('filename')}")
-
-                                completed_nodes.add(node_id)
-
-                                # Check if all output nodes completed
-                                if len(completed_nodes) >= len(output_node_ids):
-                                    print(f"[ChainExecutor] All output nodes completed")
-                                    break
-
-                        # Check for execution_cached (all nodes cached - no execution_success will come)
-                        elif msg_type == 'execution_cached':
-                            cached_prompt_id = msg_data.get('prompt_id')
-                            if cached_prompt_id == prompt_id:
-                                print(f"[ChainExecutor] Execution cached (all nodes cached): {msg_data}")
-                                execution_cached = True
-                                # When fully cached, 'executed' messages may still come for output nodes
-                                # Wait a bit longer for any 'executed' messages, then check 'executing' null
-
-                        # Check for execution_success (workflow completed successfully)
-                        elif msg_type == 'execution_success':
-                            success_prompt_id = msg_data.get('prompt_id')
-                            if success_prompt_id == prompt_id:
-                                print(f"[ChainExecutor] Execution success signal received")
-                                # If we already have all outputs, we can break
-                                if len(completed_nodes) >= len(output_node_ids):
-                                    break
-                                # Otherwise continue waiting for outputs
-
-                        # Check for executing with null node (execution finished signal)
-                        elif msg_type == 'executing':
-                            executing_node = msg_data.get('node')
-                            if executing_node is None and msg_data.get('prompt_id') == prompt_id:
-                                # Execution finished (node is null)
-                                print(f"[ChainExecutor] Execution finished signal (executing null)")
-
-                                # If execution was cached and we got executing:null, it means completion
-                                if execution_cached:
-                                    print(f"[ChainExecutor] Cached execution completed with {len(completed_nodes)}/{len(output_node_ids)} outputs captured")
-                                    # For cached execution, we may not get all 'executed' messages
-                                    # Break here to proceed with whatever outputs we have
-                                    break
-
-                                # For normal execution, only break if we have all outputs
-                                if len(completed_nodes) >= len(output_node_ids):
-                                    break
-
-                    except asyncio.TimeoutError:
-                        # No message in 5 seconds, continue waiting
-                        continue
-
-                if execution_failed:
-                    print(f"[ChainExecutor] Workflow execution failed")
-                    return []
+        # The deadline moves from queue wait to execution time once the prompt starts
+        timing = {"deadline": time.monotonic() + PROMPT_QUEUE_TIMEOUT}
 
-                if time.time() - start_time >= timeout:
-                    print(f"[ChainExecutor] Workflow execution timed out after {timeout} seconds")
-                    return []
+        if self.in_process:
+            events = self._in_process_events(prompt_id, timing)
+        else:
+            events = self._websocket_events(prompt_id, timing)
 
-                # If execution was cached but we didn't get all 'executed' messages,
-                # try to fetch output info from history
-                if execution_cached and len(outputs) < len(output_node_ids):
-                    print(f"[ChainExecutor] Attempting to fetch cached outputs from history for prompt_id: {prompt_id}")
-                    history_outputs = await self._fetch_outputs_from_history(prompt_id, output_node_ids)
-                    if history_outputs:
-                        outputs.extend(history_outputs)
-                        print(f"[ChainExecutor] Retrieved {len(history_outputs)} outputs from history")
+        try:
+            async for msg_type, msg_data in events:
+                if not isinstance(msg_data, dict):
+                    continue
 
-                return outputs
+                if msg_type == 'execution_start':
+                    if msg_data.get('prompt_id') == prompt_id:
+                        timing["deadline"] = time.monotonic() + PROMPT_EXECUTION_TIMEOUT
+                        self.execution_started[prompt_id] = time.monotonic()
+
+                # Check for execution errors
+                elif msg_type in ('execution_error', 'execution_interrupted'):
+                    if msg_data.get('prompt_id') == prompt_id:
+                        print(f"[ChainExecutor] Execution stopped ({msg_type}): {msg_data}")
+                        execution_failed = True
+                        break
+
+                # Check for executed messages (node completed with output)
+                elif msg_type == 'executed':
+                    node_id = msg_data.get('node')
+                    node_prompt_id = msg_data.get('prompt_id')
+
+                    if node_prompt_id == prompt_id and node_id in output_node_ids:
+                        output_data = msg_data.get('output', {})
+
+                        # Extract file info from output
+                        # Check for gifs/videos first (VHS nodes), then images
+                        files = output_data.get('gifs') or output_data.get('images', [])
+
+                        if files and len(files) > 0:
+                            # Use first file (index 0)
+                            file_info = files[0]
+                            outputs.append({
+                                'nodeId': node_id,
+                                'filename': file_info.get('filename'),
+                                'subfolder': file_info.get('subfolder', ''),
+                                'type': file_info.get('type', 'output')
+                            })
+                            print(f"[ChainExecutor] Captured output from node {node_id}: {file_info.get('filename')}")
+
+                        completed_nodes.add(node_id)
+
+                        # Check if all output nodes completed
+                        if len(completed_nodes) >= len(output_node_ids):
+                            print(f"[ChainExecutor] All output nodes completed")
+                            finished = True
+                            break
+
+                # Check for execution_cached (all nodes cached - no execution_success will come)
+                elif msg_type == 'execution_cached':
+                    cached_prompt_id = msg_data.get('prompt_id')
+                    if cached_prompt_id == prompt_id:
+                        print(f"[ChainExecutor] Execution cached (all nodes cached): {msg_data}")
+                        execution_cached = True
+                        # When fully cached, 'executed' messages may still come for output nodes
+                        # Wait a bit longer for any 'executed' messages, then check 'executing' null
+
+                # Check for execution_success (workflow completed successfully)
+                elif msg_type == 'execution_success':
+                    success_prompt_id = msg_data.get('prompt_id')
+                    if success_prompt_id == prompt_id:
+                        print(f"[ChainExecutor] Execution success signal received")
+                        # If we already have all outputs, we can break
+                        if len(completed_nodes) >= len(output_node_ids):
+                            finished = True
+                            break
+                        # Otherwise continue waiting for outputs
+
+                # Check for executing with null node (execution finished signal)
+                elif msg_type == 'executing':
+                    executing_node = msg_data.get('node')
+                    if executing_node is None and msg_data.get('prompt_id') == prompt_id:
+                        # Execution finished (node is null)
+                        print(f"[ChainExecutor] Execution finished signal (executing null)")
+
+                        # If execution was cached and we got executing:null, it means completion
+                        if execution_cached:
+                            print(f"[ChainExecutor] Cached execution completed with {len(completed_nodes)}/{len(output_node_ids)} outputs captured")
+                            # For cached execution, we may not get all 'executed' messages
+                            # Break here to proceed with whatever outputs we have
+                            finished = True
+                            break
+
+                        # For normal execution, only break if we have all outputs
+                        if len(completed_nodes) >= len(output_node_ids):
+                            finished = True
+                            break
 
         except Exception as e:
             print(f"[ChainExecutor] Error monitoring workflow: {e}")
             return []
+        finally:
+            await events.aclose()
+
+        if execution_failed:
+            print(f"[ChainExecutor] Workflow execution failed")
+            return []
+
+        if not finished:
+            print(f"[ChainExecutor] Workflow execution timed out")
+            return []
+
+        # If execution was cached but we didn't get all 'executed' messages,
+        # try to fetch output info from history
+        if execution_cached and len(outputs) < len(output_node_ids):
+            print(f"[ChainExecutor] Attempting to fetch cached outputs from history for prompt_id: {prompt_id}")
+            history_outputs = await self._fetch_outputs_from_history(prompt_id, output_node_ids)
+            if history_outputs:
+                outputs.extend(history_outputs)
+                print(f"[ChainExecutor] Retrieved {len(history_outputs)} outputs from history")
+
+        return outputs
+
+    async def _get_history_entry(self, prompt_id: str) -> Dict[str, Any]:
+        """History entry of a prompt, read from the prompt queue directly when in-process"""
+        if self.in_process:
+            history = get_prompt_server().prompt_queue.get_history(prompt_id=prompt_id)
+            return history.get(prompt_id, {})
+
+        import aiohttp
+
+        session = get_http_session()
+        async with session.get(
+            f"{self.server_url}/history/{prompt_id}",
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            if response.status != 200:
+                print(f"[ChainExecutor] Failed to fetch history: {response.status}")
+                return {}
+
+            data = await response.json()
+            return data.get(prompt_id, {})
 
     async def _fetch_outputs_from_history(
         self,
         prompt_id: str,
         output_node_ids: List[str]
     ) -> List[Dict[str, Any]]:
-        """Fetch output information from ComfyUI history API (for cached executions)"""
-        import aiohttp
-
+        """Fetch output information from ComfyUI history (for cached executions)"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.server_url}/history/{prompt_id}",
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    if response.status != 200:
-                        print(f"[ChainExecutor] Failed to fetch history: {response.status}")
-                        return []
-
-                    data = await response.json()
-                    history_entry = data.get(prompt_id, {})
-                    outputs_data = history_entry.get('outputs', {})
+            history_entry = await self._get_history_entry(prompt_id)
+            outputs_data = history_entry.get('outputs', {})
 
-                    outputs = []
-                    for node_id in output_node_ids:
-                        if node_id in outputs_data:
-                            output_info = outputs_data[node_id]
+            outputs = []
+            for node_id in output_node_ids:
+                if node_id in outputs_data:
+                    output_info = outputs_data[node_id]
 
-                            # Check for gifs/videos first (VHS nodes), then images
-                            files = output_info.get('gifs') or output_info.get('images', [])
+                    # Check for gifs/videos first (VHS nodes), then images
+                    files = output_info.get('gifs') or output_info.get('images', [])
 
-                            if files and len(files) > 0:
-                                file_info = files[0]
-                                outputs.append({
-                                    'nodeId': node_id,
-                                    'filename': file_info.get('filename'),
-                                    'subfolder': file_info.get('subfolder', ''),
-                                    'type': file_info.get('type', 'output')
-                                })
-                                print(f"[ChainExecutor] Found cached output for node {node_id}: {file_info.get('filename')}")
+                    if files and len(files) > 0:
+                        file_info = files[0]
+                        outputs.append({
+                            'nodeId': node_id,
+                            'filename': file_info.get('filename'),
+                            'subfolder': file_info.get('subfolder', ''),
+                            'type': file_info.get('type', 'output')
+                        })
+                        print(f"[ChainExecutor] Found cached output for node {node_id}: {file_info.get('filename')}")
 
-                    return outputs
+            return outputs
 
         except Exception as e:
             print(f"[ChainExecutor] Error fetching history: {e}")
@@ -577,7 +838,8 @@ class ChainExecutor:
 
             try:
                 if os.path.exists(source_path):
-                    shutil.copy2(source_path, dest_path)
+                    await self._wait_for_stable_file(source_path)
+                    await run_io(cache_output_file, source_path, dest_path)
                     print(f"[ChainExecutor] Cached file: {source_path} -> {dest_path}")
 
                     # Check if this is a video file - copy thumbnail PNG as well
@@ -598,7 +860,8 @@ class ChainExecutor:
                         thumbnail_dest = os.path.join(chain_result_dir, thumbnail_cached_filename)
 
                         if os.path.exists(thumbnail_source):
-                            shutil.copy2(thumbnail_source, thumbnail_dest)
+                            await self._wait_for_stable_file(thumbnail_source)
+                            await run_io(cache_output_file, thumbnail_source, thumbnail_dest)
 
                     cached_outputs.append({
                         'nodeId': node_id,
@@ -614,21 +877,35 @@ class ChainExecutor:
 
         return cached_outputs
 
+    async def _wait_for_stable_file(self, file_path: str):
+        """Wait until a file's size and mtime stop changing (a writer may still be flushing it)"""
+        deadline = time.monotonic() + OUTPUT_STABLE_TIMEOUT
+        previous = None
+        while time.monotonic() < deadline:
+            stat_info = os.stat(file_path)
+            current = (stat_info.st_size, stat_info.st_mtime_ns)
+            if current == previous:
+                return
+            previous = current
+            await asyncio.sleep(OUTPUT_STABLE_POLL_INTERVAL)
+        print(f"[ChainExecutor] Warning: {file_path} still changing after {OUTPUT_STABLE_TIMEOUT}s, caching it anyway")
+
     async def _ensure_chain_result_folder(self):
         """Ensure inputs/chain_result/ folder exists"""
         chain_result_dir = os.path.join(COMFY_BASE_PATH, 'input', 'chain_result')
         os.makedirs(chain_result_dir, exist_ok=True)
         print(f"[ChainExecutor] Ensured chain_result folder: {chain_result_dir}")
 
-    @classmethod
-    async def interrupt_execution(cls, server_url: str = "http://127.0.0.1:8188") -> Dict[str, Any]:
+    async def cancel(self) -> Dict[str, Any]:
         """
-        Interrupt currently executing chain
+        Interrupt this chain execution only
 
         Steps:
-        1. Send /interrupt POST to ComfyUI to stop current prompt
-        2. Set interrupt flag to stop chain execution loop
-        3. Broadcast interrupted state via progress manager
+        1. Set this execution's cancel token so no further workflow starts
+        2. Remove its prompts still waiting in ComfyUI's queue and interrupt its
+           prompt if that is the one running (other users' prompts are left alone)
+        3. Cancel its running workflow node tasks; execute() then reports the
+           interruption via the progress manager
 
         Returns:
             Dict with success status and message
@@ -636,32 +913,44 @@ class ChainExecutor:
         import aiohttp
 
         try:
-            print("[ChainExecutor] Interrupt requested")
-
-            # Set interrupt flag
-            cls._interrupt_requested = True
-
-            # Send interrupt to ComfyUI
-            server_url = server_url.rstrip('/')
-            async with aiohttp.ClientSession() as session:
+            print(f"[ChainExecutor] Interrupt requested for {self.execution_id}")
+            self.cancel_event.set()
+
+            prompt_ids = set(self.prompt_ids)
+            if prompt_ids and self.in_process:
+                prompt_queue = get_prompt_server().prompt_queue
+                # Drop queued prompts first so the next one of ours cannot start
+                for prompt_id in prompt_ids:
+                    prompt_queue.delete_queue_item(lambda item, prompt_id=prompt_id: item[1] == prompt_id)
+                running, _ = prompt_queue.get_current_queue()
+                if any(item[1] in prompt_ids for item in running):
+                    # Same call ComfyUI's /interrupt endpoint makes
+                    import nodes
+                    nodes.interrupt_processing()
+                    print("[ChainExecutor] Interrupt signal sent to ComfyUI")
+            elif prompt_ids:
+                session = get_http_session()
                 async with session.post(
-                    f"{server_url}/interrupt",
+                    f"{self.server_url}/queue",
+                    json={"delete": list(prompt_ids)},
                     timeout=aiohttp.ClientTimeout(total=10)
                 ) as response:
-                    if response.status == 200:
-                        print("[ChainExecutor] Interrupt signal sent to ComfyUI")
-                    else:
-                        error_text = await response.text()
-                        print(f"[ChainExecutor] Failed to send interrupt: {response.status} - {error_text}")
-
-            # Broadcast interrupted state via progress manager
-            if chain_progress_manager:
-                await chain_progress_manager.complete_chain_execution(
-                    False,
-                    "Chain execution interrupted by user"
-                )
-
-            print("[ChainExecutor] Chain execution interrupted")
+                    await response.read()
+                for prompt_id in prompt_ids:
+                    # Recent ComfyUI versions only interrupt if this prompt is the running one
+                    async with session.post(
+                        f"{self.server_url}/interrupt",
+                        json={"prompt_id": prompt_id},
+                        timeout=aiohttp.ClientTimeout(total=10)
+                    ) as response:
+                        if response.status != 200:
+                            error_text = await response.text()
+                            print(f"[ChainExecutor] Failed to send interrupt: {response.status} - {error_text}")
+
+            for task in list(self.node_tasks):
+                task.cancel()
+
+            print(f"[ChainExecutor] Chain execution {self.execution_id} interrupted")
 
             return {
                 "success": True,
@@ -674,7 +963,3 @@ class ChainExecutor:
                 "success": False,
                 "error": str(e)
             }
-        finally:
-            # Reset interrupt flag after a delay to allow for cleanup
-            await asyncio.sleep(2)
-            cls._interrupt_requested = False
\ No newline at end of file
@@ -3,6 +3,10 @@ Chain Progress Manager
 
 Manages chain execution state and broadcasts progress to connected WebSocket clients.
 Provides real-time updates about chain execution progress.
+
+Several chains can run at once; each execution has its own progress state keyed
+by execution_id. A client either follows every execution or, when it connects
+with an execution id, only that one.
 """
 
 import asyncio
@@ -11,6 +15,19 @@ from datetime import datetime
 import json
 
 
+def idle_state() -> Dict[str, Any]:
+    """Progress data sent when no chain is executing"""
+    return {
+        'isExecuting': False,
+        'chainId': None,
+        'chainName': None,
+        'executionId': None,
+        'currentWorkflowIndex': None,
+        'workflows': [],
+        'timestamp': datetime.now().isoformat()
+    }
+
+
 class ChainProgressManager:
     """Singleton manager for chain execution progress"""
 
@@ -27,59 +44,52 @@ class ChainProgressManager:
             return
 
         self._initialized = True
-        self.clients: Set = set()  # WebSocket connections
-        self.current_execution: Optional[Dict[str, Any]] = None
+        # WebSocket connection -> execution_id it follows (None: all executions)
+        self.clients: Dict[Any, Optional[str]] = {}
+        # execution_id -> progress message of each running execution
+        self.executions: Dict[str, Dict[str, Any]] = {}
         self.lock = asyncio.Lock()
 
-    async def add_client(self, websocket):
+    @property
+    def current_execution(self) -> Optional[Dict[str, Any]]:
+        """Most recently started running execution (for single-chain callers)"""
+        if not self.executions:
+            return None
+        return list(self.executions.values())[-1]
+
+    async def add_client(self, websocket, execution_id: Optional[str] = None):
         """Add a WebSocket client and send current state"""
         async with self.lock:
-            self.clients.add(websocket)
-
-            # Send initial state
-            if self.current_execution:
-                await self._send_to_client(websocket, self.current_execution)
-            else:
-                await self._send_to_client(websocket, {
-                    'type': 'chain_progress',
-                    'data': {
-                        'isExecuting': False,
-                        'chainId': None,
-                        'chainName': None,
-                        'executionId': None,
-                        'currentWorkflowIndex': None,
-                        'workflows': [],
-                        'timestamp': datetime.now().isoformat()
-                    }
-                })
+            self.clients[websocket] = execution_id
+            await self._send_state(websocket)
 
     async def remove_client(self, websocket):
         """Remove a WebSocket client"""
         async with self.lock:
-            self.clients.discard(websocket)
+            self.clients.pop(websocket, None)
 
     async def start_chain_execution(
         self,
         chain_id: str,
         chain_name: str,
         execution_id: str,
-        workflow_nodes: List[Dict[str, Any]]
+        workflow_nodes: List[Dict[str, Any]],
+        dependencies: Optional[List[Set[int]]] = None
     ):
-        """Start a new chain execution"""
+        """Start a new chain execution (dependencies: indices each workflow waits for)"""
         async with self.lock:
-            # Clear any previous completed execution state
-            # New execution will replace it
             workflows = [
                 {
                     'index': idx,
                     'id': node.get('id'),
                     'name': node.get('name', 'Unnamed'),
-                    'status': 'pending'  # pending, waiting, running, completed, failed
+                    'status': 'pending',  # pending, waiting, running, completed, failed
+                    'dependsOn': sorted(dependencies[idx]) if dependencies else ([idx - 1] if idx else [])
                 }
                 for idx, node in enumerate(workflow_nodes)
             ]
 
-            self.current_execution = {
+            self.executions[execution_id] = {
                 'type': 'chain_progress',
                 'data': {
                     'isExecuting': True,
@@ -87,55 +97,64 @@ class ChainProgressManager:
                     'chainName': chain_name,
                     'executionId': execution_id,
                     'currentWorkflowIndex': 0,
+                    'runningWorkflowIndices': [],
                     'workflows': workflows,
                     'timestamp': datetime.now().isoformat()
                 }
             }
 
-            await self._broadcast(self.current_execution)
+            await self._broadcast(execution_id, self.executions[execution_id])
 
     async def update_workflow_status(
         self,
+        execution_id: str,
         workflow_index: int,
         status: str,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        handoff_ms: Optional[float] = None
     ):
-        """Update the status of a specific workflow"""
+        """Update the status of a specific workflow (handoff_ms: time to cache its outputs for the next one)"""
         async with self.lock:
-            if not self.current_execution:
+            execution = self.executions.get(execution_id)
+            if not execution:
                 return
 
-            workflows = self.current_execution['data']['workflows']
+            workflows = execution['data']['workflows']
             if 0 <= workflow_index < len(workflows):
                 workflows[workflow_index]['status'] = status
                 if error:
                     workflows[workflow_index]['error'] = error
-
-            # Update current workflow index
-            if status == 'running':
-                self.current_execution['data']['currentWorkflowIndex'] = workflow_index
+                if handoff_ms is not None:
+                    workflows[workflow_index]['handoffMs'] = handoff_ms
+
+            # Several workflows can run at once; the current index is the lowest running one
+            running = [workflow['index'] for workflow in workflows if workflow['status'] == 'running']
+            execution['data']['runningWorkflowIndices'] = running
+            if running:
+                execution['data']['currentWorkflowIndex'] = min(running)
             elif status == 'completed' and workflow_index < len(workflows) - 1:
-                self.current_execution['data']['currentWorkflowIndex'] = workflow_index + 1
+                execution['data']['currentWorkflowIndex'] = workflow_index + 1
 
-            self.current_execution['data']['timestamp'] = datetime.now().isoformat()
+            execution['data']['timestamp'] = datetime.now().isoformat()
 
-            await self._broadcast(self.current_execution)
+            await self._broadcast(execution_id, execution)
 
-    async def complete_chain_execution(self, success: bool, error: Optional[str] = None):
+    async def complete_chain_execution(self, execution_id: str, success: bool, error: Optional[str] = None):
         """Mark chain execution as completed"""
         async with self.lock:
-            if not self.current_execution:
+            execution = self.executions.get(execution_id)
+            if not execution:
                 return
 
             final_message = {
                 'type': 'chain_progress',
                 'data': {
                     'isExecuting': False,
-                    'chainId': self.current_execution['data']['chainId'],
-                    'chainName': self.current_execution['data']['chainName'],
-                    'executionId': self.current_execution['data']['executionId'],
+                    'chainId': execution['data']['chainId'],
+                    'chainName': execution['data']['chainName'],
+                    'executionId': execution_id,
                     'currentWorkflowIndex': None,
-                    'workflows': self.current_execution['data']['workflows'],
+                    'workflows': execution['data']['workflows'],
                     'completed': True,
                     'success': success,
                     'error': error,
@@ -143,21 +162,23 @@ class ChainProgressManager:
                 }
             }
 
-            await self._broadcast(final_message)
+            await self._broadcast(execution_id, final_message)
 
-            # Clear current execution after broadcasting completion
-            self.current_execution = None
+            # Clear the execution after broadcasting completion
+            del self.executions[execution_id]
 
-    async def _broadcast(self, message: Dict[str, Any]):
-        """Broadcast message to all connected clients"""
+    async def _broadcast(self, execution_id: str, message: Dict[str, Any]):
+        """Broadcast message to clients following all executions or this one"""
         if not self.clients:
             return
 
         message_json = json.dumps(message)
 
-        # Send to all clients, remove disconnected ones
+        # Send to matching clients, remove disconnected ones
         disconnected = set()
-        for client in self.clients:
+        for client, followed in self.clients.items():
+            if followed is not None and followed != execution_id:
+                continue
             try:
                 await client.send_str(message_json)
             except Exception as e:
@@ -166,7 +187,7 @@ class ChainProgressManager:
 
         # Remove disconnected clients
         for client in disconnected:
-            self.clients.discard(client)
+            self.clients.pop(client, None)
 
     async def _send_to_client(self, client, message: Dict[str, Any]):
         """Send message to a specific client"""
@@ -176,39 +197,33 @@ class ChainProgressManager:
         except Exception as e:
             print(f"[ChainProgressManager] Failed to send to client: {e}")
 
+    async def _send_state(self, websocket):
+        """Send every execution the client follows, or an idle state if there is none"""
+        followed = self.clients.get(websocket)
+        executions = [
+            execution for execution_id, execution in self.executions.items()
+            if followed is None or followed == execution_id
+        ]
+        if not executions:
+            await self._send_to_client(websocket, {'type': 'chain_progress', 'data': idle_state()})
+        for execution in executions:
+            await self._send_to_client(websocket, execution)
+
     async def send_current_state(self, websocket):
         """Send current execution state to a specific client"""
         async with self.lock:
-            if self.current_execution:
-                await self._send_to_client(websocket, self.current_execution)
-            else:
-                await self._send_to_client(websocket, {
-                    'type': 'chain_progress',
-                    'data': {
-                        'isExecuting': False,
-                        'chainId': None,
-                        'chainName': None,
-                        'executionId': None,
-                        'currentWorkflowIndex': None,
-                        'workflows': [],
-                        'timestamp': datetime.now().isoformat()
-                    }
-                })
-
-    def get_current_state(self) -> Dict[str, Any]:
-        """Get current execution state"""
-        if self.current_execution:
-            return self.current_execution['data']
-        else:
-            return {
-                'isExecuting': False,
-                'chainId': None,
-                'chainName': None,
-                'executionId': None,
-                'currentWorkflowIndex': None,
-                'workflows': [],
-                'timestamp': datetime.now().isoformat()
-            }
+            await self._send_state(websocket)
+
+    def get_current_state(self, execution_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get the state of one execution (default: the most recently started one)"""
+        execution = self.executions.get(execution_id) if execution_id else self.current_execution
+        if execution:
+            return execution['data']
+        return idle_state()
+
+    def get_all_states(self) -> List[Dict[str, Any]]:
+        """Get the state of every running execution"""
+        return [execution['data'] for execution in self.executions.values()]
 
 
 # Global singleton instance
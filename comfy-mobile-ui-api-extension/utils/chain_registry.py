@@ -0,0 +1,307 @@
+"""
+Chain Execution Registry
+
+Keeps every chain execution that is queued or running, keyed by execution_id,
+so several users can run chains on one ComfyUI at the same time and an
+interrupt only stops the execution it names.
+
+At most COMFY_MOBILE_CHAIN_CONCURRENCY (default 2) chains execute at once;
+further runs wait in FIFO order until a slot frees up. A queued run that is
+cancelled leaves the queue at once and is recorded as interrupted.
+
+Runs submitted as background jobs are looked up by execution_id while they
+are active and afterwards in the run history: the last
+COMFY_MOBILE_CHAIN_HISTORY (default 50) finished runs with their per-step
+timings, persisted to mobile_data/chain_executions/history.json.
+
+Usage:
+    execution_id = chain_registry.submit(executor)
+    result = await chain_registry.run(executor)
+    await chain_registry.cancel(execution_id)
+"""
+
+import os
+import time
+import asyncio
+from typing import Dict, List, Any, Optional, Set
+
+from .chain_storage import get_mobile_data_path
+from .io_executor import run_io, load_json_file, save_json_file
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+CHAIN_CONCURRENCY = max(1, _env_int("COMFY_MOBILE_CHAIN_CONCURRENCY", 2))
+CHAIN_HISTORY_SIZE = max(1, _env_int("COMFY_MOBILE_CHAIN_HISTORY", 50))
+
+# Per-step fields kept in history summaries (outputs are only in the full result)
+STEP_SUMMARY_FIELDS = (
+    "index", "nodeId", "nodeName", "success", "error",
+    "startedAt", "durationMs", "queueMs", "executionMs", "handoffMs"
+)
+
+
+def get_chain_history_path() -> str:
+    return os.path.join(get_mobile_data_path(), "chain_executions", "history.json")
+
+
+def save_chain_history(history: List[Dict[str, Any]]):
+    history_path = get_chain_history_path()
+    os.makedirs(os.path.dirname(history_path), exist_ok=True)
+    save_json_file(history_path, history)
+
+
+def interrupted_result(execution_id: str) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "executionId": execution_id,
+        "status": "interrupted",
+        "error": "Chain execution interrupted by user",
+        "nodeResults": []
+    }
+
+
+def summarize_run(record: Dict[str, Any]) -> Dict[str, Any]:
+    """History record without workflow outputs"""
+    summary = {key: value for key, value in record.items() if key != "nodeResults"}
+    summary["steps"] = [
+        {key: result[key] for key in STEP_SUMMARY_FIELDS if key in result}
+        for result in record.get("nodeResults", [])
+    ]
+    return summary
+
+
+class ChainRegistry:
+    """Singleton registry of queued and running chain executions"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        # execution_id -> {"executor", "status", "queued_at", "started_at"}, in submission order
+        self.executions: Dict[str, Dict[str, Any]] = {}
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Background jobs, referenced until they finish
+        self.jobs: Set[asyncio.Task] = set()
+        # Finished runs, newest first
+        self.history: List[Dict[str, Any]] = []
+        self.history_lock: Optional[asyncio.Lock] = None
+
+    def load_history(self):
+        """Restore the run history from the last session (blocking)"""
+        try:
+            history = load_json_file(get_chain_history_path())
+        except (OSError, ValueError):
+            return
+        if isinstance(history, list):
+            self.history = history[:CHAIN_HISTORY_SIZE]
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self.slots is None or self.slots_loop is not loop:
+            self.slots = asyncio.Semaphore(CHAIN_CONCURRENCY)
+            self.slots_loop = loop
+        return self.slots
+
+    async def run(self, executor) -> Dict[str, Any]:
+        """Queue a chain executor, run it once a slot is free and return its result"""
+        execution_id = executor.execution_id
+        entry = self.executions.setdefault(execution_id, {
+            "executor": executor,
+            "status": "queued",
+            "queued_at": time.time(),
+            "started_at": None
+        })
+
+        try:
+            slots = self._get_slots()
+            if not await self._acquire_slot(slots, executor.cancel_event):
+                # cancel() already removed and recorded it
+                return interrupted_result(execution_id)
+
+            try:
+                entry["status"] = "running"
+                entry["started_at"] = time.time()
+                print(f"[ChainRegistry] Starting {execution_id} ({self.running_count()}/{CHAIN_CONCURRENCY} running)")
+                result = await executor.execute()
+                await self._record(entry, result)
+            finally:
+                slots.release()
+            return result
+        finally:
+            self.executions.pop(execution_id, None)
+
+    async def _acquire_slot(self, slots: asyncio.Semaphore, cancel_event: asyncio.Event) -> bool:
+        """Wait for a free slot; False if the run was cancelled first"""
+        if cancel_event.is_set():
+            return False
+        acquire = asyncio.ensure_future(slots.acquire())
+        cancelled = asyncio.ensure_future(cancel_event.wait())
+        try:
+            await asyncio.wait({acquire, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            cancelled.cancel()
+            if acquire.done() and not acquire.cancelled():
+                slots.release()
+            else:
+                acquire.cancel()
+            raise
+        cancelled.cancel()
+
+        if not acquire.done():
+            acquire.cancel()
+            return False
+        if cancel_event.is_set():
+            slots.release()
+            return False
+        return True
+
+    def submit(self, executor) -> str:
+        """Start a chain executor as a background job and return its execution_id"""
+        # Registered right away so the id can be polled before the job first runs
+        self.executions[executor.execution_id] = {
+            "executor": executor,
+            "status": "queued",
+            "queued_at": time.time(),
+            "started_at": None
+        }
+        job = asyncio.ensure_future(self._run_job(executor))
+        self.jobs.add(job)
+        job.add_done_callback(self.jobs.discard)
+        return executor.execution_id
+
+    async def _run_job(self, executor):
+        try:
+            await self.run(executor)
+        except Exception as e:
+            print(f"[ChainRegistry] Background chain {executor.execution_id} failed: {e}")
+
+    async def _record(self, entry: Dict[str, Any], result: Dict[str, Any]):
+        """Add a finished run to the history and persist it"""
+        executor = entry["executor"]
+        finished_at = time.time()
+        started_at = entry["started_at"] or finished_at
+        record = {
+            "executionId": executor.execution_id,
+            "chainId": executor.chain_id,
+            "chainName": executor.chain_name,
+            "status": result.get("status") or ("completed" if result.get("success") else "failed"),
+            "success": bool(result.get("success")),
+            "error": result.get("error"),
+            "queuedAt": entry["queued_at"],
+            "startedAt": entry["started_at"],
+            "finishedAt": finished_at,
+            "queueMs": round((started_at - entry["queued_at"]) * 1000, 1),
+            "durationMs": round((finished_at - started_at) * 1000, 1),
+            "nodeResults": result.get("nodeResults", [])
+        }
+
+        if self.history_lock is None:
+            self.history_lock = asyncio.Lock()
+        async with self.history_lock:
+            self.history = [record] + self.history[:CHAIN_HISTORY_SIZE - 1]
+            try:
+                await run_io(save_chain_history, list(self.history))
+            except Exception as e:
+                print(f"[ChainRegistry] Failed to save chain history: {e}")
+
+    def get(self, execution_id: str):
+        """Executor of a queued or running execution"""
+        entry = self.executions.get(execution_id)
+        return entry["executor"] if entry else None
+
+    def get_finished(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """History record of a finished run"""
+        for record in self.history:
+            if record.get("executionId") == execution_id:
+                return record
+        return None
+
+    def get_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Summaries of finished runs, newest first"""
+        return [summarize_run(record) for record in self.history[:limit]]
+
+    def active_ids(self) -> List[str]:
+        return list(self.executions.keys())
+
+    def running_count(self) -> int:
+        return sum(1 for entry in self.executions.values() if entry["status"] == "running")
+
+    async def cancel(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel one execution; None if it is not queued or running"""
+        entry = self.executions.get(execution_id)
+        if not entry:
+            return None
+
+        executor = entry["executor"]
+        if entry["status"] == "queued":
+            # Leaves the queue right away, without touching ComfyUI
+            executor.cancel_event.set()
+            executor.status = "interrupted"
+            self.executions.pop(execution_id, None)
+            print(f"[ChainRegistry] {execution_id} cancelled before it started")
+            await self._record(entry, interrupted_result(execution_id))
+            return {
+                "success": True,
+                "message": "Queued chain execution cancelled"
+            }
+        return await executor.cancel()
+
+    def list_executions(self) -> List[Dict[str, Any]]:
+        """Queued and running executions in submission order"""
+        executions = []
+        queue_position = 0
+        for execution_id, entry in list(self.executions.items()):
+            item = self._describe(execution_id, entry)
+            if entry["status"] == "queued":
+                item["queuePosition"] = queue_position
+                queue_position += 1
+            executions.append(item)
+        return executions
+
+    def _describe(self, execution_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        executor = entry["executor"]
+        return {
+            "executionId": execution_id,
+            "chainId": executor.chain_id,
+            "chainName": executor.chain_name,
+            "status": entry["status"],
+            "queuedAt": entry["queued_at"],
+            "startedAt": entry["started_at"]
+        }
+
+    def get_status(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """Status of a queued, running or finished execution; None if unknown"""
+        entry = self.executions.get(execution_id)
+        if entry:
+            status = self._describe(execution_id, entry)
+            if entry["status"] == "queued":
+                status["queuePosition"] = [
+                    item_id for item_id, item in self.executions.items() if item["status"] == "queued"
+                ].index(execution_id)
+            else:
+                status["completedSteps"] = sum(1 for result in entry["executor"].node_results if result.get("success"))
+                status["totalSteps"] = len(entry["executor"].chain_data.get("nodes", []))
+            return status
+
+        record = self.get_finished(execution_id)
+        return summarize_run(record) if record else None
+
+
+# Global singleton instance
+chain_registry = ChainRegistry()
@@ -0,0 +1,127 @@
+"""
+Download Journal
+
+Append-only record of model download tasks, so the task list survives a
+ComfyUI restart.
+
+Every state change of a task appends one JSON line to
+mobile_data/download_journal.jsonl; removing tasks appends a "remove" line.
+On startup the lines are replayed (last record wins) and the file is
+compacted to one line per live task. Transient fields (speed, ETA) are not
+journaled.
+"""
+
+import os
+import json
+import threading
+from typing import Dict, List, Any, Iterable
+
+import folder_paths
+
+# Task fields that are written to the journal
+JOURNAL_FIELDS = (
+    "id", "url", "filename", "target_folder", "target_path", "status", "priority",
+    "progress", "total_size", "downloaded_size", "created_at", "started_at",
+    "completed_at", "error", "supports_resume", "segments", "segmented",
+    "retry_count", "max_retries"
+)
+
+# Compact once the journal holds this many lines and at least COMPACT_RATIO lines per live task
+COMPACT_MIN_RECORDS = 500
+COMPACT_RATIO = 4
+
+
+def get_download_journal_path() -> str:
+    return os.path.join(folder_paths.base_path, "mobile_data", "download_journal.jsonl")
+
+
+class DownloadJournal:
+    """Singleton append-only journal of download task metadata"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.lock = threading.Lock()
+        # task_id -> last journaled record
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.line_count = 0
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Replay the journal, compact it and return the surviving task records"""
+        journal_path = get_download_journal_path()
+        records: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn last line from a crash mid-write
+                        continue
+                    if entry.get("op") == "task":
+                        records[entry["task"]["id"]] = entry["task"]
+                    elif entry.get("op") == "remove":
+                        records.pop(entry.get("id"), None)
+        except OSError:
+            pass
+
+        with self.lock:
+            self.records = records
+            self._compact()
+        return list(records.values())
+
+    def record(self, task: Dict[str, Any]):
+        """Append the current state of a task"""
+        snapshot = {field: task.get(field) for field in JOURNAL_FIELDS}
+        with self.lock:
+            self.records[snapshot["id"]] = snapshot
+            self._append({"op": "task", "task": snapshot})
+
+    def remove(self, task_ids: Iterable[str]):
+        """Append removals for tasks dropped from the history"""
+        with self.lock:
+            for task_id in task_ids:
+                if self.records.pop(task_id, None) is not None:
+                    self._append({"op": "remove", "id": task_id})
+
+    def _append(self, entry: Dict[str, Any]):
+        journal_path = get_download_journal_path()
+        try:
+            os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+            with open(journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+            self.line_count += 1
+        except OSError as e:
+            print(f"[DownloadJournal] Failed to write journal: {e}")
+            return
+
+        if self.line_count >= COMPACT_MIN_RECORDS and self.line_count >= COMPACT_RATIO * len(self.records):
+            self._compact()
+
+    def _compact(self):
+        """Atomically rewrite the journal with one line per live task"""
+        journal_path = get_download_journal_path()
+        tmp_path = journal_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for snapshot in self.records.values():
+                    f.write(json.dumps({"op": "task", "task": snapshot}) + "\n")
+            os.replace(tmp_path, journal_path)
+            self.line_count = len(self.records)
+        except OSError as e:
+            print(f"[DownloadJournal] Failed to compact journal: {e}")
+
+
+# Global singleton instance
+download_journal = DownloadJournal()
@@ -0,0 +1,202 @@
+"""
+Download Scheduler
+
+Admission control for model downloads.
+
+Downloads are queued by priority (higher first, then submission order) and
+started only while fewer than max_concurrent downloads run in total and
+fewer than per_host_limit run against the same host. A host at its limit
+does not block lower-priority downloads from other hosts.
+
+All running downloads also share a token-bucket bandwidth cap
+(bandwidth_limit bytes/second, 0 = unlimited) enforced through throttle().
+
+Settings are persisted in mobile_data/download_scheduler.json.
+"""
+
+import os
+import json
+import time
+import heapq
+import asyncio
+import itertools
+import urllib.parse
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+
+import folder_paths
+
+DEFAULT_MAX_CONCURRENT = 3
+DEFAULT_PER_HOST_LIMIT = 2
+
+# Seconds of traffic the token bucket may accumulate as a burst
+BANDWIDTH_BURST_SECONDS = 1.0
+
+
+def get_scheduler_settings_path() -> str:
+    return os.path.join(folder_paths.base_path, "mobile_data", "download_scheduler.json")
+
+
+def get_url_host(url: str) -> str:
+    return urllib.parse.urlparse(url).netloc.lower()
+
+
+class DownloadScheduler:
+    """Singleton priority queue and bandwidth limiter for download tasks"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.max_concurrent = DEFAULT_MAX_CONCURRENT
+        self.per_host_limit = DEFAULT_PER_HOST_LIMIT
+        self.bandwidth_limit = 0
+
+        # Heap of (-priority, sequence, task_id); entries for removed tasks are skipped lazily
+        self.queue: List[tuple] = []
+        self.waiting: Dict[str, Dict[str, Any]] = {}
+        self.running: Dict[str, asyncio.Task] = {}
+        self.running_hosts: Dict[str, int] = {}
+        self.sequence = itertools.count()
+
+        # Token bucket state
+        self.tokens = 0.0
+        self.last_refill = time.monotonic()
+
+        self._load_settings()
+
+    def _load_settings(self):
+        try:
+            with open(get_scheduler_settings_path(), 'r', encoding='utf-8') as f:
+                settings = json.load(f)
+            self.configure(
+                settings.get("max_concurrent"), settings.get("per_host_limit"),
+                settings.get("bandwidth_limit"), persist=False
+            )
+        except (OSError, ValueError, TypeError):
+            pass
+
+    def submit(self, task_id: str, url: str, run: Callable[[], Awaitable[Any]], priority: int = 0):
+        """Queue a download; run() is awaited once a slot is free"""
+        self.remove(task_id)
+        self.waiting[task_id] = {"host": get_url_host(url), "run": run}
+        self._enqueue(task_id, priority)
+        self._pump()
+
+    def _enqueue(self, task_id: str, priority: int):
+        entry = self.waiting[task_id]
+        entry["priority"] = priority
+        entry["seq"] = next(self.sequence)
+        heapq.heappush(self.queue, (-priority, entry["seq"], task_id))
+
+    def remove(self, task_id: str) -> bool:
+        """Drop a queued download; returns False if it was not waiting"""
+        return self.waiting.pop(task_id, None) is not None
+
+    def set_priority(self, task_id: str, priority: int) -> bool:
+        if task_id not in self.waiting:
+            return False
+        self._enqueue(task_id, priority)
+        self._pump()
+        return True
+
+    def is_running(self, task_id: str) -> bool:
+        """Whether a run of this download has not returned yet (even if it was cancelled)"""
+        return task_id in self.running
+
+    def queue_position(self, task_id: str) -> Optional[int]:
+        """1-based position among waiting downloads, None if not waiting"""
+        if task_id not in self.waiting:
+            return None
+        order = sorted(self.waiting, key=lambda waiting_id: (
+            -self.waiting[waiting_id]["priority"], self.waiting[waiting_id]["seq"]
+        ))
+        return order.index(task_id) + 1
+
+    def _pump(self):
+        """Start queued downloads while limits allow"""
+        skipped = []
+        while self.queue and len(self.running) < self.max_concurrent:
+            neg_priority, seq, task_id = heapq.heappop(self.queue)
+            entry = self.waiting.get(task_id)
+            if entry is None or seq != entry["seq"]:
+                # Removed, or superseded by a set_priority() entry
+                continue
+            if task_id in self.running or self.running_hosts.get(entry["host"], 0) >= self.per_host_limit:
+                # A cancelled earlier run must return before the task starts again
+                skipped.append((neg_priority, seq, task_id))
+                continue
+
+            del self.waiting[task_id]
+            self.running_hosts[entry["host"]] = self.running_hosts.get(entry["host"], 0) + 1
+            task = asyncio.ensure_future(entry["run"]())
+            self.running[task_id] = task
+            task.add_done_callback(lambda task, task_id=task_id, host=entry["host"]: self._finished(task_id, host, task))
+
+        for item in skipped:
+            heapq.heappush(self.queue, item)
+
+    def _finished(self, task_id: str, host: str, task: asyncio.Task):
+        if self.running.get(task_id) is task:
+            del self.running[task_id]
+        self.running_hosts[host] -= 1
+        if self.running_hosts[host] <= 0:
+            del self.running_hosts[host]
+        self._pump()
+
+    async def throttle(self, nbytes: int):
+        """Wait until nbytes may pass under the global bandwidth cap"""
+        if self.bandwidth_limit <= 0:
+            return
+
+        now = time.monotonic()
+        capacity = self.bandwidth_limit * BANDWIDTH_BURST_SECONDS
+        self.tokens = min(capacity, self.tokens + (now - self.last_refill) * self.bandwidth_limit)
+        self.last_refill = now
+
+        # Go into debt and sleep it off, so large chunks are not starved by a small bucket
+        self.tokens -= nbytes
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.bandwidth_limit)
+
+    def configure(self, max_concurrent: Optional[int] = None, per_host_limit: Optional[int] = None,
+                  bandwidth_limit: Optional[int] = None, persist: bool = True):
+        if max_concurrent is not None:
+            self.max_concurrent = max(1, int(max_concurrent))
+        if per_host_limit is not None:
+            self.per_host_limit = max(1, int(per_host_limit))
+        if bandwidth_limit is not None:
+            self.bandwidth_limit = max(0, int(bandwidth_limit))
+
+        if persist:
+            settings_path = get_scheduler_settings_path()
+            os.makedirs(os.path.dirname(settings_path), exist_ok=True)
+            with open(settings_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "max_concurrent": self.max_concurrent,
+                    "per_host_limit": self.per_host_limit,
+                    "bandwidth_limit": self.bandwidth_limit
+                }, f, indent=2)
+        if self.queue:
+            self._pump()
+
+    def get_settings(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "per_host_limit": self.per_host_limit,
+            "bandwidth_limit": self.bandwidth_limit,
+            "running": len(self.running),
+            "queued": len(self.waiting)
+        }
+
+
+# Global singleton instance
+download_scheduler = DownloadScheduler()
@@ -7,6 +7,7 @@ from typing import Dict, List, Any, Optional
 from aiohttp import web
 import aiohttp
 import folder_paths
+from .http_client import get_http_session
 
 def extract_filename_from_content_disposition(content_disposition: str) -> str:
     """
@@ -119,47 +120,45 @@ async def get_final_filename_from_server(url: str, fallback_filename: str = None
     Get the final filename by checking server's Content-Disposition header
     Returns (filename, response_headers)
     """
-    import aiohttp
-    
     try:
         timeout = aiohttp.ClientTimeout(total=30, connect=10)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            # Make HEAD request to get headers without downloading content
-            async with session.head(url, allow_redirects=True) as response:
-                if response.status != 200:
-                    # If HEAD fails, try GET with Range header to get minimal data
-                    headers = {'Range': 'bytes=0-0'}
-                    async with session.get(url, headers=headers) as response:
-                        if response.status not in [200, 206]:
-                            raise aiohttp.ClientError(f"HTTP {response.status}: {response.reason}")
-                
-                # Get content type for extension detection
-                content_type = response.headers.get('Content-Type', '')
-                
-                # Extract filename from Content-Disposition header if available
-                content_disposition = response.headers.get('Content-Disposition', '')
-                if content_disposition:
-                    filename_from_header = extract_filename_from_content_disposition(content_disposition)
-                    if filename_from_header:
-                        # Clean up filename - remove any unsafe characters
-                        import re
-                        filename_from_header = re.sub(r'[<>:"/\\|?*]', '_', filename_from_header)
-                        # Ensure proper extension
-                        filename_from_header = ensure_proper_extension(filename_from_header, content_type, url)
-                        print(f"📄 Server provided filename: {filename_from_header}")
-                        return filename_from_header, dict(response.headers)
-                
-                # If no Content-Disposition, fall back to URL-based extraction
-                if fallback_filename:
-                    final_filename = fallback_filename
-                else:
-                    final_filename = extract_filename_from_url(url)
-                
-                # Ensure proper extension for fallback filename
-                final_filename = ensure_proper_extension(final_filename, content_type, url)
-                print(f"📄 Using fallback filename: {final_filename}")
-                return final_filename, dict(response.headers)
-                
+        session = get_http_session()
+        # Make HEAD request to get headers without downloading content
+        async with session.head(url, allow_redirects=True, timeout=timeout) as response:
+            if response.status != 200:
+                # If HEAD fails, try GET with Range header to get minimal data
+                headers = {'Range': 'bytes=0-0'}
+                async with session.get(url, headers=headers, timeout=timeout) as response:
+                    if response.status not in [200, 206]:
+                        raise aiohttp.ClientError(f"HTTP {response.status}: {response.reason}")
+            
+            # Get content type for extension detection
+            content_type = response.headers.get('Content-Type', '')
+            
+            # Extract filename from Content-Disposition header if available
+            content_disposition = response.headers.get('Content-Disposition', '')
+            if content_disposition:
+                filename_from_header = extract_filename_from_content_disposition(content_disposition)
+                if filename_from_header:
+                    # Clean up filename - remove any unsafe characters
+                    import re
+                    filename_from_header = re.sub(r'[<>:"/\\|?*]', '_', filename_from_header)
+                    # Ensure proper extension
+                    filename_from_header = ensure_proper_extension(filename_from_header, content_type, url)
+                    print(f"📄 Server provided filename: {filename_from_header}")
+                    return filename_from_header, dict(response.headers)
+            
+            # If no Content-Disposition, fall back to URL-based extraction
+            if fallback_filename:
+                final_filename = fallback_filename
+            else:
+                final_filename = extract_filename_from_url(url)
+            
+            # Ensure proper extension for fallback filename
+            final_filename = ensure_proper_extension(final_filename, content_type, url)
+            print(f"📄 Using fallback filename: {final_filename}")
+            return final_filename, dict(response.headers)
+            
     except Exception as e:
         print(f"Error getting filename from server: {e}")
         # Use fallback filename
@@ -259,15 +258,51 @@ def get_file_info(file_path: str) -> Dict[str, Any]:
         }
 
 
-def scan_directory_recursive(base_path: str, folder_type: str) -> List[Dict[str, Any]]:
-    """Recursively scan directory for files with subfolder information"""
+def is_listable_file(filename: str) -> bool:
+    """Check whether a file should appear in file listings"""
+    # Skip hidden files and system files
+    if filename.startswith('.') or filename.startswith('__'):
+        return False
+    
+    # Skip .json files (ComfyUI auto-generated files)
+    if filename.lower().endswith('.json'):
+        return False
+    
+    return True
+
+
+def build_file_entry(file_path: str, filename: str, subfolder: str, folder_type: str) -> Dict[str, Any]:
+    """Build the listing entry for a single file"""
+    file_info = get_file_info(file_path)
+    
+    # Determine file extension and category
+    ext = filename.split('.')[-1].lower() if '.' in filename else ''
+    
+    return {
+        "filename": filename,
+        "subfolder": subfolder,
+        "type": folder_type,
+        "extension": ext,
+        "size": file_info["size"],
+        "modified": file_info["modified"],
+        "modified_iso": file_info["modified_iso"],
+        "path": file_path
+    }
+
+
+def scan_directory_recursive(base_path: str, folder_type: str, start_subfolder: str = "") -> List[Dict[str, Any]]:
+    """Recursively scan directory for files with subfolder information
+    
+    start_subfolder limits the scan to one subtree while keeping subfolders relative to base_path.
+    """
     files = []
+    scan_path = os.path.join(base_path, start_subfolder) if start_subfolder else base_path
     
-    if not os.path.exists(base_path):
+    if not os.path.exists(scan_path):
         return files
     
     try:
-        for root, dirs, filenames in os.walk(base_path):
+        for root, dirs, filenames in os.walk(scan_path):
             # Filter hidden directories to prevent scanning cache folders like .mobile_thumbnails
             dirs[:] = [d for d in dirs if not d.startswith('.')]
             
@@ -276,39 +311,32 @@ def scan_directory_recursive(base_path: str, folder_type: str) -> List[Dict[str,
             subfolder = "" if rel_path == "." else rel_path.replace(os.sep, "/")
             
             for filename in filenames:
-                # Skip hidden files and system files
-                if filename.startswith('.') or filename.startswith('__'):
-                    continue
-                
-                # Skip .json files (ComfyUI auto-generated files)
-                if filename.lower().endswith('.json'):
+                if not is_listable_file(filename):
                     continue
                     
                 file_path = os.path.join(root, filename)
-                file_info = get_file_info(file_path)
-                
-                # Determine file extension and category
-                ext = filename.split('.')[-1].lower() if '.' in filename else ''
-                
-                file_data = {
-                    "filename": filename,
-                    "subfolder": subfolder,
-                    "type": folder_type,
-                    "extension": ext,
-                    "size": file_info["size"],
-                    "modified": file_info["modified"],
-                    "modified_iso": file_info["modified_iso"],
-                    "path": file_path
-                }
-                
-                files.append(file_data)
+                files.append(build_file_entry(file_path, filename, subfolder, folder_type))
                 
     except Exception as e:
-        print(f"Error scanning directory {base_path}: {e}")
+        print(f"Error scanning directory {scan_path}: {e}")
     
     return files
 
 
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'tiff', 'tga'}
+VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm', 'flv', 'm4v', 'wmv'}
+
+
+def get_file_category(extension: str) -> str:
+    """Get the listing category (images, videos, files) for a file extension"""
+    ext = extension.lower()
+    if ext in IMAGE_EXTENSIONS:
+        return "images"
+    elif ext in VIDEO_EXTENSIONS:
+        return "videos"
+    return "files"
+
+
 def categorize_files(files: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
     """Categorize files by type (images, videos, other)"""
     categorized = {
@@ -317,21 +345,10 @@ def categorize_files(files: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, An
         "files": []
     }
     
-    image_extensions = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'tiff', 'tga'}
-    video_extensions = {'mp4', 'avi', 'mov', 'mkv', 'webm', 'flv', 'm4v', 'wmv'}
-    
     for file_data in files:
-        ext = file_data.get('extension', '').lower()
-        
         # Remove path from response for security
         file_response = {k: v for k, v in file_data.items() if k != 'path'}
-        
-        if ext in image_extensions:
-            categorized["images"].append(file_response)
-        elif ext in video_extensions:
-            categorized["videos"].append(file_response)
-        else:
-            categorized["files"].append(file_response)
+        categorized[get_file_category(file_data.get('extension', ''))].append(file_response)
     
     return categorized
 
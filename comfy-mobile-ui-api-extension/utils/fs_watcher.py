@@ -0,0 +1,503 @@
+"""
+Filesystem Watcher
+
+Watches the models/ directory and the input/output/temp directories and pushes
+create/delete/modify/move events to:
+1. The model index and the media index, so listings never rescan the tree
+2. Mobile clients connected to /comfymobile/ws (event type "mobile_fs_change")
+
+Uses inotify on Linux (via ctypes, no extra dependency) and falls back to a
+periodic directory-mtime diff poller elsewhere or when inotify is unavailable.
+"""
+
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+# Poll interval (seconds) for the mtime-diff fallback
+POLL_INTERVAL = 5.0
+
+# How long (seconds) the poller keeps re-checking file sizes in a recently changed directory
+POLL_HOT_WINDOW = 60.0
+
+# Events arriving within this window (seconds) are delivered as one batch
+BATCH_WINDOW = 0.2
+
+# inotify constants (from <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+# Change callback: (root_name, changes) where each change is
+# {"action": "created"|"modified"|"deleted"|"moved", "path": str, "is_dir": bool, "dest_path": str (moved only)}
+# Paths are relative to the root and use "/" separators. A single {"action": "overflow"}
+# change means events were lost and the subscriber should resynchronise.
+ChangeCallback = Callable[[str, List[Dict[str, Any]]], None]
+
+
+def is_ignored_path(rel_path: str) -> bool:
+    """Hidden files and anything inside hidden folders (e.g. .mobile_thumbnails) are not watched"""
+    return any(part.startswith('.') for part in rel_path.split('/') if part)
+
+
+def coalesce_changes(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop redundant events in a batch (e.g. created followed by modified for the same file)"""
+    result: List[Dict[str, Any]] = []
+    last_action: Dict[str, str] = {}
+    for change in changes:
+        path = change.get("path")
+        if change["action"] == "modified" and last_action.get(path) in ("created", "modified"):
+            continue
+        last_action[path] = change["action"]
+        if change["action"] == "moved":
+            last_action[change["dest_path"]] = "created"
+        result.append(change)
+    return result
+
+
+class InotifyBackend:
+    """Recursive inotify watches over one or more root directories (Linux only)"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+
+        # wd -> (root_name, rel_dir)
+        self.watches: Dict[int, Tuple[str, str]] = {}
+        self.roots: Dict[str, str] = {}
+        # Unpaired IN_MOVED_FROM events waiting for their IN_MOVED_TO: cookie -> (root, rel_path, is_dir)
+        self.pending_moves: Dict[int, Tuple[str, str, bool]] = {}
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def add_root(self, root_name: str, root_path: str):
+        self.roots[root_name] = root_path
+        self._add_tree(root_name, "")
+
+    def _add_watch(self, root_name: str, rel_dir: str) -> bool:
+        abs_dir = os.path.join(self.roots[root_name], rel_dir) if rel_dir else self.roots[root_name]
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(abs_dir), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            return False
+        if wd in self.watches:
+            # Same inode reached twice (symlink loop or duplicate root) - don't descend again
+            return False
+        self.watches[wd] = (root_name, rel_dir)
+        return True
+
+    def _add_tree(self, root_name: str, rel_dir: str):
+        """Watch a directory and all its non-hidden subdirectories"""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            if not self._add_watch(root_name, current):
+                continue
+            abs_dir = os.path.join(self.roots[root_name], current) if current else self.roots[root_name]
+            try:
+                with os.scandir(abs_dir) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir():
+                            stack.append(f"{current}/{entry.name}" if current else entry.name)
+            except OSError:
+                continue
+
+    def _remove_tree(self, root_name: str, rel_dir: str):
+        """Stop watching a directory that was moved out of the watched tree"""
+        prefix = rel_dir + "/"
+        for wd, (name, path) in list(self.watches.items()):
+            if name == root_name and (path == rel_dir or path.startswith(prefix)):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                self.watches.pop(wd, None)
+
+    def _rename_tree(self, root_name: str, old_dir: str, new_dir: str):
+        """Keep watch paths correct after a directory is renamed inside the tree"""
+        prefix = old_dir + "/"
+        for wd, (name, path) in list(self.watches.items()):
+            if name != root_name:
+                continue
+            if path == old_dir:
+                self.watches[wd] = (name, new_dir)
+            elif path.startswith(prefix):
+                self.watches[wd] = (name, new_dir + path[len(old_dir):])
+
+    def read_changes(self, timeout: float) -> Dict[str, List[Dict[str, Any]]]:
+        """Wait up to `timeout` seconds and return changes grouped by root name"""
+        changes: Dict[str, List[Dict[str, Any]]] = {}
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return self._flush_pending_moves(changes)
+
+        deadline = time.time() + BATCH_WINDOW
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                data = b""
+            if data:
+                self._parse(data, changes)
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                break
+
+        return self._flush_pending_moves(changes)
+
+    def _flush_pending_moves(self, changes):
+        # A move whose destination is outside the watched tree looks like a delete
+        for root_name, rel_path, is_dir in self.pending_moves.values():
+            if is_dir:
+                self._remove_tree(root_name, rel_path)
+            changes.setdefault(root_name, []).append(
+                {"action": "deleted", "path": rel_path, "is_dir": is_dir}
+            )
+        self.pending_moves.clear()
+        return changes
+
+    def _parse(self, data: bytes, changes: Dict[str, List[Dict[str, Any]]]):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                for root_name in self.roots:
+                    changes.setdefault(root_name, []).append({"action": "overflow"})
+                continue
+
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            if wd not in self.watches or not name:
+                continue
+
+            root_name, rel_dir = self.watches[wd]
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            if is_ignored_path(rel_path):
+                continue
+
+            is_dir = bool(mask & IN_ISDIR)
+            root_changes = changes.setdefault(root_name, [])
+
+            if mask & IN_CREATE:
+                if is_dir:
+                    self._add_tree(root_name, rel_path)
+                root_changes.append({"action": "created", "path": rel_path, "is_dir": is_dir})
+            elif mask & IN_CLOSE_WRITE:
+                root_changes.append({"action": "modified", "path": rel_path, "is_dir": False})
+            elif mask & IN_DELETE:
+                root_changes.append({"action": "deleted", "path": rel_path, "is_dir": is_dir})
+            elif mask & IN_MOVED_FROM:
+                self.pending_moves[cookie] = (root_name, rel_path, is_dir)
+            elif mask & IN_MOVED_TO:
+                source = self.pending_moves.pop(cookie, None)
+                if source and source[0] == root_name:
+                    if is_dir:
+                        self._rename_tree(root_name, source[1], rel_path)
+                    root_changes.append({
+                        "action": "moved", "path": source[1], "dest_path": rel_path, "is_dir": is_dir
+                    })
+                else:
+                    if source:
+                        if source[2]:
+                            self._remove_tree(source[0], source[1])
+                        changes.setdefault(source[0], []).append(
+                            {"action": "deleted", "path": source[1], "is_dir": source[2]}
+                        )
+                    if is_dir:
+                        self._add_tree(root_name, rel_path)
+                    root_changes.append({"action": "created", "path": rel_path, "is_dir": is_dir})
+
+
+class PollingBackend:
+    """Periodic directory-mtime diff for platforms without inotify"""
+
+    def __init__(self):
+        self.roots: Dict[str, str] = {}
+        # root_name -> rel_dir -> (mtime_ns, {name: (is_dir, size, mtime_ns)})
+        self.snapshots: Dict[str, Dict[str, Tuple[int, Dict[str, Tuple[bool, int, int]]]]] = {}
+        # (root_name, rel_dir) -> time the directory last changed
+        self.hot_dirs: Dict[Tuple[str, str], float] = {}
+
+    def close(self):
+        pass
+
+    def add_root(self, root_name: str, root_path: str):
+        self.roots[root_name] = root_path
+        self.snapshots[root_name] = {}
+        self._poll_root(root_name, emit=False)
+
+    def read_changes(self, timeout: float) -> Dict[str, List[Dict[str, Any]]]:
+        time.sleep(max(timeout, POLL_INTERVAL))
+        changes = {}
+        for root_name in self.roots:
+            root_changes = self._poll_root(root_name, emit=True)
+            if root_changes:
+                changes[root_name] = root_changes
+        return changes
+
+    def _list_dir(self, abs_dir: str) -> Dict[str, Tuple[bool, int, int]]:
+        entries = {}
+        with os.scandir(abs_dir) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                    stat_info = entry.stat()
+                    entries[entry.name] = (is_dir, 0 if is_dir else stat_info.st_size, stat_info.st_mtime_ns)
+                except OSError:
+                    continue
+        return entries
+
+    def _poll_root(self, root_name: str, emit: bool) -> List[Dict[str, Any]]:
+        root_path = self.roots[root_name]
+        old_snapshot = self.snapshots[root_name]
+        new_snapshot = {}
+        changes: List[Dict[str, Any]] = []
+        now = time.time()
+        visited_inodes = set()
+        stack = [""]
+
+        while stack:
+            rel_dir = stack.pop()
+            abs_dir = os.path.join(root_path, rel_dir) if rel_dir else root_path
+            try:
+                dir_stat = os.stat(abs_dir)
+            except OSError:
+                continue
+
+            # Guard against symlink loops
+            inode_key = (dir_stat.st_dev, dir_stat.st_ino)
+            if inode_key in visited_inodes:
+                continue
+            visited_inodes.add(inode_key)
+            dir_mtime = dir_stat.st_mtime_ns
+
+            previous = old_snapshot.get(rel_dir)
+            hot = now - self.hot_dirs.get((root_name, rel_dir), 0) < POLL_HOT_WINDOW
+            if previous is not None and previous[0] == dir_mtime and not hot:
+                entries = previous[1]
+            else:
+                try:
+                    entries = self._list_dir(abs_dir)
+                except OSError:
+                    continue
+                if previous is not None and previous[0] != dir_mtime:
+                    self.hot_dirs[(root_name, rel_dir)] = now
+                if emit:
+                    changes.extend(self._diff_entries(rel_dir, previous[1] if previous else {}, entries))
+
+            new_snapshot[rel_dir] = (dir_mtime, entries)
+            for name, (is_dir, _, _) in entries.items():
+                if is_dir:
+                    stack.append(f"{rel_dir}/{name}" if rel_dir else name)
+
+        self.snapshots[root_name] = new_snapshot
+        self.hot_dirs = {key: ts for key, ts in self.hot_dirs.items() if now - ts < POLL_HOT_WINDOW}
+        return changes
+
+    def _diff_entries(self, rel_dir: str, old: Dict, new: Dict) -> List[Dict[str, Any]]:
+        changes = []
+        for name, (is_dir, size, mtime_ns) in new.items():
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            if name not in old:
+                changes.append({"action": "created", "path": rel_path, "is_dir": is_dir})
+            elif not is_dir and old[name][1:] != (size, mtime_ns):
+                changes.append({"action": "modified", "path": rel_path, "is_dir": False})
+        for name, (is_dir, _, _) in old.items():
+            if name not in new:
+                rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                changes.append({"action": "deleted", "path": rel_path, "is_dir": is_dir})
+        return changes
+
+
+class FileSystemWatcher:
+    """Singleton background watcher that fans out change batches to subscribers"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.roots: Dict[str, str] = {}
+        self.subscribers: List[ChangeCallback] = []
+        self.backend = None
+        self.backend_name: Optional[str] = None
+        self.thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+
+    def add_root(self, root_name: str, root_path: str):
+        """Register a directory to watch; must be called before start()"""
+        if root_path and os.path.isdir(root_path):
+            self.roots[root_name] = root_path
+
+    def subscribe(self, callback: ChangeCallback):
+        """Register a callback invoked (on the watcher thread) with each change batch"""
+        self.subscribers.append(callback)
+
+    @property
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def is_watching(self, root_name: str) -> bool:
+        return self.is_running and root_name in self.roots
+
+    def _create_backend(self):
+        if hasattr(select, "select") and os.name == "posix" and os.uname().sysname == "Linux":
+            backend = None
+            try:
+                backend = InotifyBackend()
+                for root_name, root_path in self.roots.items():
+                    backend.add_root(root_name, root_path)
+                return backend, "inotify"
+            except (OSError, AttributeError) as e:
+                print(f"[FsWatcher] inotify unavailable ({e}), falling back to polling")
+                if backend is not None:
+                    backend.close()
+
+        backend = PollingBackend()
+        for root_name, root_path in self.roots.items():
+            backend.add_root(root_name, root_path)
+        return backend, "polling"
+
+    def start(self) -> bool:
+        """Start watching in a daemon thread"""
+        if self.is_running:
+            return True
+        if not self.roots:
+            print("[FsWatcher] No directories to watch")
+            return False
+
+        try:
+            self.backend, self.backend_name = self._create_backend()
+        except Exception as e:
+            print(f"[FsWatcher] Failed to start watcher: {e}")
+            return False
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="FsWatcher", daemon=True)
+        self.thread.start()
+        print(f"[FsWatcher] Watching {', '.join(self.roots)} using {self.backend_name}")
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=POLL_INTERVAL + 1)
+        if self.backend:
+            self.backend.close()
+        self.thread = None
+        self.backend = None
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                changes = self.backend.read_changes(timeout=1.0)
+            except Exception as e:
+                print(f"[FsWatcher] Error reading changes: {e}")
+                time.sleep(1.0)
+                continue
+
+            for root_name, root_changes in changes.items():
+                root_changes = coalesce_changes(root_changes)
+                if not root_changes:
+                    continue
+                for callback in self.subscribers:
+                    try:
+                        callback(root_name, root_changes)
+                    except Exception as e:
+                        print(f"[FsWatcher] Subscriber error for {root_name}: {e}")
+
+
+# Global singleton instance
+fs_watcher = FileSystemWatcher()
+
+
+def broadcast_fs_changes(root_name: str, changes: List[Dict[str, Any]]):
+    """Relay change batches to mobile clients on /comfymobile/ws"""
+    from .global_websocket_manager import global_websocket_manager
+    global_websocket_manager.broadcast_event_threadsafe("mobile_fs_change", {
+        "root": root_name,
+        "changes": changes,
+        "timestamp": time.time()
+    })
+
+
+def setup_fs_watcher() -> bool:
+    """Watch models/ and input/output/temp, feeding the model index, media index and clients"""
+    from .model_index import model_index, get_models_path
+    from .media_index import media_index, MEDIA_FOLDER_TYPES
+    from .thumbnail_service import thumbnail_service
+    from .model_hashes import model_hasher
+
+    fs_watcher.add_root("models", get_models_path())
+    for folder_type in MEDIA_FOLDER_TYPES:
+        fs_watcher.add_root(folder_type, media_index.get_base_path(folder_type))
+
+    def dispatch(root_name: str, changes: List[Dict[str, Any]]):
+        if root_name == "models":
+            model_index.apply_changes(changes)
+            model_hasher.wake()
+        else:
+            media_index.apply_changes(root_name, changes)
+            # Drop thumbnails of files that were deleted or moved outside the API
+            base_path = media_index.get_base_path(root_name)
+            for change in changes:
+                if change["action"] in ("deleted", "moved") and not change.get("is_dir"):
+                    thumbnail_service.cache.purge_source(os.path.join(base_path, *change["path"].split("/")))
+
+    fs_watcher.subscribe(dispatch)
+    fs_watcher.subscribe(broadcast_fs_changes)
+
+    if not fs_watcher.start():
+        return False
+
+    model_index.watched = fs_watcher.is_watching("models")
+    media_index.watched = {
+        folder_type for folder_type in MEDIA_FOLDER_TYPES if fs_watcher.is_watching(folder_type)
+    }
+    return True
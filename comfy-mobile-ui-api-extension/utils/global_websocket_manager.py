@@ -5,11 +5,12 @@ Responsible for:
 1. Managing WebSocket connections from mobile clients
 2. Hooking into ComfyUI's PromptServer to capture all events
 3. Relaying captured events to all connected mobile clients
+4. Feeding captured events to in-process subscribers (e.g. the chain executor)
 """
 
 import json
 import asyncio
-from typing import Set, Dict, Any, Optional
+from typing import Set, Dict, Any, Optional, Iterable
 from aiohttp import web
 
 try:
@@ -38,6 +39,24 @@ class DummyWebSocket:
     async def prepare(self, *args, **kwargs):
         pass
 
+class EventSubscription:
+    """
+    Queue of (event, data) tuples captured from PromptServer.send_sync for one
+    in-process listener. With prompt_ids, only events for those prompts are queued.
+    """
+    def __init__(self, prompt_ids: Optional[Iterable[str]] = None):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.prompt_ids = set(prompt_ids) if prompt_ids is not None else None
+
+    def matches(self, data: Any) -> bool:
+        if self.prompt_ids is None:
+            return True
+        return isinstance(data, dict) and data.get('prompt_id') in self.prompt_ids
+
+    async def get(self, timeout: Optional[float] = None):
+        """Next (event, data); raises asyncio.TimeoutError after timeout seconds"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
 class GlobalWebSocketManager:
     _instance = None
     _initialized = False
@@ -66,6 +85,8 @@ class GlobalWebSocketManager:
         }
         
         self.lock = asyncio.Lock()
+        # In-process listeners, fed on the event loop thread
+        self.subscriptions: Set[EventSubscription] = set()
         self.original_send_sync = None
         self.original_send_bytes = None
         
@@ -119,6 +140,8 @@ class GlobalWebSocketManager:
                 if self.loop and not self.loop.is_closed():
                     # Thread-safe scheduling to ensure it runs on the main loop
                     asyncio.run_coroutine_threadsafe(self.broadcast_event(event, data), self.loop)
+                    if self.subscriptions:
+                        self.loop.call_soon_threadsafe(self._publish, event, data)
                 else:
                     # Fallback attempt if loop wasn't captured or is closed
                     try:
@@ -160,6 +183,24 @@ class GlobalWebSocketManager:
         
         print("[GlobalWS] Successfully hooked into PromptServer.send_sync")
 
+    def is_hooked(self) -> bool:
+        """True once PromptServer.send_sync is hooked, i.e. subscriptions receive events"""
+        return self.original_send_sync is not None
+
+    def subscribe(self, prompt_ids: Optional[Iterable[str]] = None) -> EventSubscription:
+        """Receive ComfyUI events in-process; call unsubscribe() when done"""
+        subscription = EventSubscription(prompt_ids)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription):
+        self.subscriptions.discard(subscription)
+
+    def _publish(self, event: str, data: Any):
+        for subscription in list(self.subscriptions):
+            if subscription.matches(data):
+                subscription.queue.put_nowait((event, data))
+
     async def register_proxy_client(self, client_id: str):
         """
         Register a dummy socket for the given client_id so ComfyUI thinks it's connected.
@@ -258,6 +299,16 @@ class GlobalWebSocketManager:
                 for ws in disconnected:
                     self.clients.discard(ws)
 
+    def broadcast_event_threadsafe(self, event: str, data: Any):
+        """Schedule a broadcast from a non-event-loop thread (e.g. the filesystem watcher)"""
+        loop = getattr(self, 'loop', None)
+        if not self.clients or loop is None or loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.broadcast_event(event, data), loop)
+        except Exception as e:
+            print(f"[GlobalWS] Failed to schedule broadcast for {event}: {e}")
+
     async def broadcast_bytes(self, number: int, data: bytes):
         """Broadcast binary data to all connected clients"""
         if not self.clients:
@@ -0,0 +1,97 @@
+"""
+Shared HTTP Client
+
+One pooled aiohttp.ClientSession for all outbound HTTP (model downloads,
+Manager proxy, chain prompt submission, ...), so repeated calls reuse
+keep-alive connections and cached DNS instead of paying TCP/TLS setup on
+every request.
+
+The session is created lazily on the server's event loop and closed by the
+aiohttp app's on_cleanup hook (close_http_session). Callers must not close
+it; pass a per-request timeout where the default does not fit.
+
+Pool limits can be tuned through environment variables:
+    COMFY_MOBILE_HTTP_LIMIT            total connections (default 100)
+    COMFY_MOBILE_HTTP_LIMIT_PER_HOST   connections per host (default 32)
+    COMFY_MOBILE_HTTP_DNS_TTL          DNS cache seconds (default 300)
+    COMFY_MOBILE_HTTP_KEEPALIVE        idle keep-alive seconds (default 30)
+"""
+
+import os
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+HTTP_LIMIT = _env_int("COMFY_MOBILE_HTTP_LIMIT", 100)
+# Must leave room for a segmented download's parallel ranges against one host
+HTTP_LIMIT_PER_HOST = _env_int("COMFY_MOBILE_HTTP_LIMIT_PER_HOST", 32)
+HTTP_DNS_TTL = _env_int("COMFY_MOBILE_HTTP_DNS_TTL", 300)
+HTTP_KEEPALIVE = _env_int("COMFY_MOBILE_HTTP_KEEPALIVE", 30)
+
+# Default for requests that pass no timeout: no overall cap (large downloads),
+# but fail on a dead connect or a stalled read. Waiting for a pooled connection does not count.
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+
+
+class HttpClient:
+    """Singleton owner of the shared ClientSession"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on first use (must be called on the event loop)"""
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self.loop is not loop:
+            if self.session is not None and not self.session.closed:
+                print("[HttpClient] Event loop changed, opening a new connection pool")
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_LIMIT,
+                limit_per_host=HTTP_LIMIT_PER_HOST,
+                ttl_dns_cache=HTTP_DNS_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE
+            )
+            self.session = aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT)
+            self.loop = loop
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self.loop = None
+
+
+# Global singleton instance
+http_client = HttpClient()
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    return http_client.get_session()
+
+
+async def close_http_session(app=None):
+    """Close the shared pool (aiohttp on_cleanup hook)"""
+    await http_client.close()
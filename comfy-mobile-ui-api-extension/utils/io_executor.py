@@ -0,0 +1,241 @@
+"""
+I/O Executor
+
+Shared, bounded thread pool for blocking filesystem work done by request
+handlers (deletes, moves, copies, JSON reads/writes), so disk latency never
+stalls the event loop that also serves ComfyUI's own websocket.
+
+At most COMFY_MOBILE_IO_WORKERS (default 8) calls run at once; beyond
+COMFY_MOBILE_IO_MAX_PENDING (default 256) waiting calls, callers wait on the
+event loop before their work is even queued. Queue depth and per-call wait
+and run times are tracked for get_stats().
+
+Jobs that run for minutes (multi-GB copies and moves, full-file hashing,
+duplicate scans) go through run_job() onto a separate pool of
+COMFY_MOBILE_JOB_WORKERS (default 2) threads, so they never hold the
+workers short handler calls wait for.
+
+Usage:
+    result = await run_io(shutil.move, source, target)
+    data = await read_json(path)
+
+    # Read-modify-write of one file
+    async with file_lock(path):
+        data = await read_json(path)
+        await write_json(path, data)
+"""
+
+import os
+import json
+import time
+import uuid
+import weakref
+import asyncio
+import functools
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional, Deque, Tuple
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+IO_WORKERS = max(1, _env_int("COMFY_MOBILE_IO_WORKERS", 8))
+IO_MAX_PENDING = max(IO_WORKERS, _env_int("COMFY_MOBILE_IO_MAX_PENDING", 256))
+JOB_WORKERS = max(1, _env_int("COMFY_MOBILE_JOB_WORKERS", 2))
+
+# Number of recent calls kept for latency percentiles
+LATENCY_WINDOW = 512
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class IOExecutor:
+    """Singleton bounded executor with queue and latency metrics"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="MobileIO")
+        self.job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="MobileJob")
+        self.lock = threading.Lock()
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.peak_queued = 0
+        self.jobs_queued = 0
+        self.jobs_running = 0
+        # (wait seconds, run seconds) of recent calls
+        self.latencies: Deque[Tuple[float, float]] = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self.slots is None or self.slots_loop is not loop:
+            self.slots = asyncio.Semaphore(IO_MAX_PENDING)
+            self.slots_loop = loop
+        return self.slots
+
+    def _call(self, func: Callable, submitted: float) -> Any:
+        started = time.monotonic()
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+        failed = False
+        try:
+            return func()
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            finished = time.monotonic()
+            with self.lock:
+                self.running -= 1
+                self.completed += 1
+                if failed:
+                    self.failed += 1
+                self.latencies.append((started - submitted, finished - started))
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) on the I/O pool and return its result"""
+        call = functools.partial(func, *args, **kwargs)
+        async with self._get_slots():
+            submitted = time.monotonic()
+            with self.lock:
+                self.queued += 1
+                self.peak_queued = max(self.peak_queued, self.queued)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._call, call, submitted)
+
+    def _call_job(self, func: Callable) -> Any:
+        with self.lock:
+            self.jobs_queued -= 1
+            self.jobs_running += 1
+        try:
+            return func()
+        finally:
+            with self.lock:
+                self.jobs_running -= 1
+
+    async def run_job(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a long blocking func(*args, **kwargs) on the job pool and return its result"""
+        call = functools.partial(func, *args, **kwargs)
+        with self.lock:
+            self.jobs_queued += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.job_executor, self._call_job, call)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            waits = [wait for wait, _ in self.latencies]
+            runs = [run for _, run in self.latencies]
+            return {
+                "workers": IO_WORKERS,
+                "max_pending": IO_MAX_PENDING,
+                "queued": self.queued,
+                "running": self.running,
+                "peak_queued": self.peak_queued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "wait_ms": {
+                    "avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                    "p95": round(_percentile(waits, 0.95) * 1000, 2),
+                    "max": round(max(waits) * 1000, 2) if waits else 0.0
+                },
+                "run_ms": {
+                    "avg": round(sum(runs) / len(runs) * 1000, 2) if runs else 0.0,
+                    "p95": round(_percentile(runs, 0.95) * 1000, 2),
+                    "max": round(max(runs) * 1000, 2) if runs else 0.0
+                },
+                "jobs": {
+                    "workers": JOB_WORKERS,
+                    "queued": self.jobs_queued,
+                    "running": self.jobs_running
+                }
+            }
+
+
+# Global singleton instance
+io_executor = IOExecutor()
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking filesystem call on the shared I/O executor"""
+    return await io_executor.run(func, *args, **kwargs)
+
+
+async def run_job(func: Callable, *args, **kwargs) -> Any:
+    """Run a long blocking job (large copies, hashing) on the job pool"""
+    return await io_executor.run_job(func, *args, **kwargs)
+
+
+def load_json_file(file_path: str) -> Any:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json_file(file_path: str, data: Any):
+    """
+    Write JSON through a temporary file so readers never see a partial document.
+
+    Every save has its own temporary file, so concurrent saves of one file never
+    mix their data; the last rename wins.
+    """
+    temp_path = f"{file_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(temp_path, 'x', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Per-file locks, dropped once no caller holds them
+_file_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def file_lock(file_path: str) -> asyncio.Lock:
+    """Lock serializing read-modify-write sequences on one file"""
+    key = os.path.abspath(file_path)
+    lock = _file_locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _file_locks[key] = lock
+    return lock
+
+
+async def read_json(file_path: str) -> Any:
+    """Load a JSON file on the shared I/O executor"""
+    return await run_io(load_json_file, file_path)
+
+
+async def write_json(file_path: str, data: Any):
+    """Save a JSON file (indented, UTF-8) on the shared I/O executor"""
+    await run_io(save_json_file, file_path, data)
@@ -0,0 +1,333 @@
+"""
+Media Index
+
+In-memory index of the files in ComfyUI's input/output/temp directories.
+
+A folder is scanned once on first use and then kept current by change events
+from the filesystem watcher (fs_watcher.py). Folders the watcher does not
+cover are rescanned only when the mtime of one of their directories changed,
+i.e. when a file was added, removed or renamed.
+
+Each folder keeps its files in a list sorted newest first, so keyset
+pagination (page()) seeks straight to the cursor with bisect and a page
+costs the same no matter how deep into the gallery it is.
+"""
+
+import os
+import json
+import base64
+import heapq
+import bisect
+import threading
+from collections import Counter
+from typing import Dict, List, Any, Optional, Set, Tuple, Iterable
+
+import folder_paths
+from .file_utils import scan_directory_recursive, build_file_entry, is_listable_file, get_file_category
+from .media_placeholders import placeholder_store
+
+MEDIA_FOLDER_TYPES = ("input", "output", "temp")
+
+# Pagination limits
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class _MaxString:
+    """Sorts after every string, used to bisect past all keys with a given mtime"""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+MAX_STRING = _MaxString()
+
+
+def encode_cursor(modified: float, folder_type: str, rel_path: str) -> str:
+    """Encode the sort key of the last item of a page as an opaque cursor"""
+    raw = json.dumps([modified, folder_type, rel_path], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str, str]:
+    """Decode a cursor produced by encode_cursor; raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        modified, folder_type, rel_path = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return float(modified), str(folder_type), str(rel_path)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class FolderIndex:
+    """Files of one folder type, kept sorted by (newest first, relative path)"""
+
+    def __init__(self, folder_type: str, files: Iterable[Dict[str, Any]] = ()):
+        self.folder_type = folder_type
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.order: List[Tuple[float, str]] = []
+        self.counts: Counter = Counter()
+        for file_data in files:
+            key = MediaIndex.key(file_data["subfolder"], file_data["filename"])
+            self.entries[key] = file_data
+            self.counts[get_file_category(file_data["extension"])] += 1
+        self.order = sorted((-f["modified"], key) for key, f in self.entries.items())
+
+    def put(self, key: str, file_data: Dict[str, Any]):
+        self.remove(key)
+        self.entries[key] = file_data
+        self.counts[get_file_category(file_data["extension"])] += 1
+        bisect.insort(self.order, (-file_data["modified"], key))
+
+    def remove(self, key: str):
+        file_data = self.entries.pop(key, None)
+        if file_data is None:
+            return
+        self.counts[get_file_category(file_data["extension"])] -= 1
+        sort_key = (-file_data["modified"], key)
+        index = bisect.bisect_left(self.order, sort_key)
+        if index < len(self.order) and self.order[index] == sort_key:
+            del self.order[index]
+
+    def remove_prefix(self, prefix: str):
+        for key in [k for k in self.entries if k.startswith(prefix)]:
+            self.remove(key)
+
+    def sorted_files(self) -> List[Dict[str, Any]]:
+        return [self.entries[key] for _, key in self.order]
+
+    def iter_from(self, after: Optional[Tuple[float, str, str]], until: Optional[float]):
+        """Yield (sort key, entry) for files after the cursor, newest first"""
+        start = 0
+        if after is not None:
+            after_modified, after_type, after_path = after
+            if self.folder_type == after_type:
+                start = bisect.bisect_right(self.order, (-after_modified, after_path))
+            elif self.folder_type > after_type:
+                start = bisect.bisect_left(self.order, (-after_modified, ""))
+            else:
+                start = bisect.bisect_right(self.order, (-after_modified, MAX_STRING))
+        if until is not None:
+            start = max(start, bisect.bisect_left(self.order, (-until, "")))
+
+        for index in range(start, len(self.order)):
+            neg_modified, key = self.order[index]
+            yield (neg_modified, self.folder_type, key), self.entries[key]
+
+
+class MediaIndex:
+    """Singleton index of input/output/temp files keyed by relative path"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.lock = threading.RLock()
+        self.folders: Dict[str, FolderIndex] = {}
+        # Unwatched folder type -> (directory mtimes at scan time, index)
+        self.scanned: Dict[str, Tuple[Dict[str, int], FolderIndex]] = {}
+        # Folder types currently kept up to date by the filesystem watcher
+        self.watched: Set[str] = set()
+
+    def get_base_path(self, folder_type: str) -> str:
+        """Get the absolute path for a folder type"""
+        if folder_type == "input":
+            return folder_paths.get_input_directory()
+        elif folder_type == "output":
+            return folder_paths.get_output_directory()
+        elif folder_type == "temp":
+            return folder_paths.get_temp_directory()
+        else:
+            raise ValueError(f"Invalid folder type: {folder_type}")
+
+    @staticmethod
+    def key(subfolder: str, filename: str) -> str:
+        return f"{subfolder}/{filename}" if subfolder else filename
+
+    def _scan(self, folder_type: str, start_subfolder: str = "") -> List[Dict[str, Any]]:
+        return scan_directory_recursive(self.get_base_path(folder_type), folder_type, start_subfolder)
+
+    def _build_folder(self, folder_type: str) -> FolderIndex:
+        files = self._scan(folder_type)
+        placeholder_store.schedule(folder_type, files)
+        return FolderIndex(folder_type, files)
+
+    def _directory_mtimes(self, folder_type: str) -> Dict[str, int]:
+        """mtime of every directory a scan visits"""
+        mtimes = {}
+        for root, dirs, _ in os.walk(self.get_base_path(folder_type)):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            try:
+                mtimes[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                pass
+        return mtimes
+
+    def _get_folder(self, folder_type: str) -> FolderIndex:
+        """Cached index, rescanning unwatched folders whose directories changed (call with lock held)"""
+        if folder_type not in self.watched:
+            mtimes = self._directory_mtimes(folder_type)
+            cached = self.scanned.get(folder_type)
+            if cached is not None and cached[0] == mtimes:
+                return cached[1]
+            folder = self._build_folder(folder_type)
+            self.scanned[folder_type] = (mtimes, folder)
+            return folder
+        if folder_type not in self.folders:
+            self.folders[folder_type] = self._build_folder(folder_type)
+        return self.folders[folder_type]
+
+    def get_placeholder(self, file_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Precomputed dimensions and dominant color of an image entry, if available"""
+        return placeholder_store.get(
+            file_data["type"], self.key(file_data["subfolder"], file_data["filename"]),
+            file_data["modified"], file_data["size"]
+        )
+
+    def get_files(self, folder_type: str) -> List[Dict[str, Any]]:
+        """List all files of a folder type, newest first"""
+        with self.lock:
+            return self._get_folder(folder_type).sorted_files()
+
+    def page(
+        self,
+        folder_types: Iterable[str],
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        categories: Optional[Set[str]] = None,
+        extensions: Optional[Set[str]] = None,
+        subfolder: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Return one page of files (newest first) across the given folder types.
+
+        Args:
+            folder_types: Folder types to merge (input, output, temp)
+            limit: Page size, clamped to MAX_PAGE_SIZE
+            after: Cursor returned as next_cursor by the previous page
+            categories: Keep only these categories (images, videos, files)
+            extensions: Keep only these extensions (lowercase, no dot)
+            subfolder: Keep only files directly in this subfolder ("" for the folder root)
+            since: Keep only files modified at or after this epoch time
+            until: Keep only files modified at or before this epoch time
+
+        Returns:
+            Dict with "items" (entries without absolute paths), "next_cursor", "has_more"
+            and "counts" (unfiltered category counts per folder type)
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        after_key = decode_cursor(after) if after else None
+
+        items = []
+        next_cursor = None
+        has_more = False
+
+        with self.lock:
+            folders = [self._get_folder(folder_type) for folder_type in sorted(set(folder_types))]
+            counts = {
+                folder.folder_type: {
+                    category: folder.counts.get(category, 0) for category in ("images", "videos", "files")
+                }
+                for folder in folders
+            }
+            streams = [folder.iter_from(after_key, until) for folder in folders]
+            for sort_key, file_data in heapq.merge(*streams, key=lambda item: item[0]):
+                if since is not None and file_data["modified"] < since:
+                    # Everything after this point is older
+                    break
+                if categories and get_file_category(file_data["extension"]) not in categories:
+                    continue
+                if extensions and file_data["extension"] not in extensions:
+                    continue
+                if subfolder is not None and file_data["subfolder"] != subfolder:
+                    continue
+
+                if len(items) == limit:
+                    has_more = True
+                    break
+
+                item = {k: v for k, v in file_data.items() if k != 'path'}
+                item["category"] = get_file_category(file_data["extension"])
+                items.append(item)
+                next_cursor = encode_cursor(file_data["modified"], sort_key[1], sort_key[2])
+
+        return {
+            "items": items,
+            "next_cursor": next_cursor if has_more else None,
+            "has_more": has_more,
+            "counts": counts
+        }
+
+    def invalidate(self, folder_type: str = None):
+        """Drop cached entries so the next read rescans"""
+        with self.lock:
+            if folder_type is None:
+                self.folders.clear()
+                self.scanned.clear()
+            else:
+                self.folders.pop(folder_type, None)
+                self.scanned.pop(folder_type, None)
+
+    def apply_changes(self, folder_type: str, changes: List[Dict[str, Any]]):
+        """Apply a batch of filesystem watcher events (paths relative to the folder)"""
+        with self.lock:
+            folder = self.folders.get(folder_type)
+            if folder is None:
+                # Not built yet - the first read will scan
+                return
+
+            if any(change["action"] == "overflow" for change in changes):
+                self.folders.pop(folder_type, None)
+                return
+
+            base_path = self.get_base_path(folder_type)
+            for change in changes:
+                action = change["action"]
+                path = change["path"]
+
+                if action in ("deleted", "moved"):
+                    if change.get("is_dir"):
+                        folder.remove_prefix(path + "/")
+                    else:
+                        folder.remove(path)
+                    placeholder_store.forget(folder_type, path, change.get("is_dir", False))
+
+                if action not in ("created", "modified", "moved"):
+                    continue
+                target = change["dest_path"] if action == "moved" else path
+
+                if change.get("is_dir"):
+                    files = self._scan(folder_type, target)
+                    for file_data in files:
+                        folder.put(self.key(file_data["subfolder"], file_data["filename"]), file_data)
+                    placeholder_store.schedule(folder_type, files)
+                    continue
+
+                subfolder, _, filename = target.rpartition("/")
+                if not is_listable_file(filename):
+                    continue
+                file_path = os.path.join(base_path, *target.split("/"))
+                if os.path.isfile(file_path):
+                    file_data = build_file_entry(file_path, filename, subfolder, folder_type)
+                    folder.put(target, file_data)
+                    placeholder_store.schedule(folder_type, [file_data])
+                else:
+                    folder.remove(target)
+
+
+# Global singleton instance
+media_index = MediaIndex()
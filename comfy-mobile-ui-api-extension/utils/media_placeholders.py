@@ -0,0 +1,208 @@
+"""
+Media Placeholders
+
+Tiny per-image placeholders - pixel dimensions and a dominant color - that
+let the gallery lay out its grid and paint tiles before thumbnails arrive.
+
+Placeholders are computed by a background thread as files enter the media
+index (media_index.py), never at request time, and persisted in
+mobile_data/media_placeholders.db keyed by folder type and relative path.
+A stored placeholder is reused as long as the file's mtime and size match.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+import folder_paths
+from .file_utils import get_file_category
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS placeholders (
+    folder_type TEXT NOT NULL,
+    rel_path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    color TEXT,
+    PRIMARY KEY (folder_type, rel_path)
+);
+"""
+
+# Images are shrunk to at most this many pixels per side before picking the color
+SAMPLE_SIZE = 32
+
+# Palette size used to find the dominant color
+SAMPLE_COLORS = 4
+
+# Rows written per SQLite transaction by the background worker
+WRITE_BATCH = 50
+
+
+def get_placeholder_db_path() -> str:
+    """Get the placeholder database path"""
+    return os.path.join(folder_paths.base_path, "mobile_data", "media_placeholders.db")
+
+
+def compute_placeholder(file_path: str) -> Tuple[int, int, str]:
+    """Return (width, height, "#rrggbb") for an image, decoding as little as possible"""
+    from PIL import Image
+
+    with Image.open(file_path) as img:
+        width, height = img.size
+        if img.format == "JPEG":
+            # Reduced-scale DCT decode, the sample is tiny anyway
+            img.draft("RGB", (SAMPLE_SIZE, SAMPLE_SIZE))
+        img.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+        sample = img.convert("RGB")
+
+    quantized = sample.quantize(colors=SAMPLE_COLORS)
+    _, index = max(quantized.getcolors())
+    palette = quantized.getpalette()
+    red, green, blue = palette[index * 3:index * 3 + 3]
+    return width, height, f"#{red:02x}{green:02x}{blue:02x}"
+
+
+class PlaceholderStore:
+    """Singleton cache of image placeholders with a background compute thread"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.lock = threading.RLock()
+        self.conn: Optional[sqlite3.Connection] = None
+        # (folder_type, rel_path) -> (mtime, size, width, height, color)
+        self.entries: Dict[Tuple[str, str], tuple] = {}
+        self.queue: "queue.Queue[Tuple[str, str, str, float, int]]" = queue.Queue()
+        self.queued = set()
+        self.worker: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database lazily and load every stored placeholder into memory"""
+        if self.conn is not None:
+            return self.conn
+
+        db_path = get_placeholder_db_path()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        for row in conn.execute("SELECT folder_type, rel_path, mtime, size, width, height, color FROM placeholders"):
+            self.entries[(row[0], row[1])] = tuple(row[2:])
+
+        self.conn = conn
+        return conn
+
+    def _is_current(self, folder_type: str, rel_path: str, mtime: float, size: int) -> bool:
+        entry = self.entries.get((folder_type, rel_path))
+        return entry is not None and entry[0] == mtime and entry[1] == size
+
+    def schedule(self, folder_type: str, files: Iterable[Dict[str, Any]]):
+        """Queue placeholder computation for images that have none or an outdated one"""
+        with self.lock:
+            self._connect()
+            added = False
+            for file_data in files:
+                if get_file_category(file_data["extension"]) != "images":
+                    continue
+                rel_path = f"{file_data['subfolder']}/{file_data['filename']}" if file_data["subfolder"] else file_data["filename"]
+                job_key = (folder_type, rel_path)
+                if job_key in self.queued or self._is_current(folder_type, rel_path, file_data["modified"], file_data["size"]):
+                    continue
+                self.queued.add(job_key)
+                self.queue.put((folder_type, rel_path, file_data["path"], file_data["modified"], file_data["size"]))
+                added = True
+
+            if added and self.worker is None:
+                self.worker = threading.Thread(target=self._work, name="MediaPlaceholders", daemon=True)
+                self.worker.start()
+
+    def _work(self):
+        pending: List[tuple] = []
+        while True:
+            try:
+                job = self.queue.get(timeout=1.0 if pending else 30.0)
+            except queue.Empty:
+                if pending:
+                    self._write(pending)
+                    pending = []
+                    continue
+                with self.lock:
+                    # schedule() starts a new worker once this one is gone
+                    if self.queue.empty():
+                        self.worker = None
+                        return
+                continue
+
+            folder_type, rel_path, file_path, mtime, size = job
+            try:
+                width, height, color = compute_placeholder(file_path)
+            except Exception:
+                # Unreadable or not really an image - remember that so it is not retried
+                width = height = color = None
+            pending.append((folder_type, rel_path, mtime, size, width, height, color))
+
+            if len(pending) >= WRITE_BATCH or self.queue.empty():
+                self._write(pending)
+                pending = []
+
+    def _write(self, rows: List[tuple]):
+        with self.lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO placeholders (folder_type, rel_path, mtime, size, width, height, color) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+            for folder_type, rel_path, mtime, size, width, height, color in rows:
+                self.entries[(folder_type, rel_path)] = (mtime, size, width, height, color)
+                self.queued.discard((folder_type, rel_path))
+
+    def get(self, folder_type: str, rel_path: str, mtime: float, size: int) -> Optional[Dict[str, Any]]:
+        """Placeholder for a file, or None if not computed yet (or not an image)"""
+        with self.lock:
+            self._connect()
+            entry = self.entries.get((folder_type, rel_path))
+        if entry is None or entry[0] != mtime or entry[1] != size or entry[4] is None:
+            return None
+        return {"width": entry[2], "height": entry[3], "color": entry[4]}
+
+    def forget(self, folder_type: str, rel_path: str, is_dir: bool = False):
+        """Drop the placeholder of a removed file (or of everything under a removed folder)"""
+        with self.lock:
+            conn = self._connect()
+            if is_dir:
+                prefix = rel_path + "/"
+                for key in [k for k in self.entries if k[0] == folder_type and k[1].startswith(prefix)]:
+                    del self.entries[key]
+                conn.execute(
+                    "DELETE FROM placeholders WHERE folder_type = ? AND substr(rel_path, 1, ?) = ?",
+                    (folder_type, len(prefix), prefix)
+                )
+            else:
+                self.entries.pop((folder_type, rel_path), None)
+                conn.execute(
+                    "DELETE FROM placeholders WHERE folder_type = ? AND rel_path = ?",
+                    (folder_type, rel_path)
+                )
+            conn.commit()
+
+
+# Global singleton instance
+placeholder_store = PlaceholderStore()
@@ -0,0 +1,92 @@
+"""
+Thumbnail Worker
+
+Image decoding and encoding for thumbnail_service, run in its worker processes.
+
+The pool spawns its workers rather than forking the multi-threaded ComfyUI
+process. Those workers cannot import this extension's package, so this module
+depends on the standard library and Pillow only. thumbnail_service loads it
+under its own top-level name and the workers import it from this directory.
+"""
+
+import os
+from typing import List, Tuple
+
+# Passed to Image.resize: reduce by an integer factor first while the image is
+# at least this many times larger than the target
+REDUCING_GAP = 2.0
+
+# Output formats: name -> (file extension, content type, Pillow format, save options)
+THUMBNAIL_FORMATS = {
+    "jpeg": ("jpg", "image/jpeg", "JPEG", {"quality": 80, "optimize": True}),
+    "webp": ("webp", "image/webp", "WEBP", {"quality": 75, "method": 4}),
+    "avif": ("avif", "image/avif", "AVIF", {"quality": 60, "speed": 8}),
+}
+FORMAT_BY_EXTENSION = {ext: name for name, (ext, _, _, _) in THUMBNAIL_FORMATS.items()}
+
+
+def load_avif_plugin():
+    try:
+        # Optional plugin adding AVIF to Pillow < 11.2
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+
+
+def _resize_to_width(img, width: int, resample_filter):
+    """Downscale to the given width keeping the aspect ratio (never upscales)"""
+    if img.width <= width:
+        return img
+    height = max(1, round(width * img.height / img.width))
+    try:
+        # reducing_gap shrinks by an integer factor first (cheap box reduce),
+        # then runs the real filter on the much smaller image
+        return img.resize((width, height), resample_filter, reducing_gap=REDUCING_GAP)
+    except TypeError:
+        # Pillow < 7.0
+        return img.resize((width, height), resample_filter)
+
+
+def render_thumbnails(file_path: str, targets: List[Tuple[int, str]]):
+    """
+    Decode an image once and write one thumbnail per (width, cache_path) target.
+
+    Runs inside a pool worker, so it only touches the filesystem and PIL.
+    JPEG sources are decoded at a reduced DCT scale (draft mode) just large
+    enough for the widest target. Targets are produced widest first, each one
+    downscaled from the previous, so extra tiers cost little. Files are
+    written to a temporary name and renamed into place so readers never see
+    a partial thumbnail. The output format follows the cache_path extension.
+    """
+    from PIL import Image
+
+    # PILLOW 10.0+ uses Resampling.LANCZOS, older uses Image.LANCZOS
+    resample_filter = getattr(Image, 'Resampling', Image).LANCZOS
+    targets = sorted(targets, reverse=True)
+
+    with Image.open(file_path) as img:
+        max_width = targets[0][0]
+        if img.format == "JPEG" and img.width > max_width:
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale, staying >= the target size
+            img.draft("RGB", (max_width, max(1, round(max_width * img.height / img.width))))
+
+        current = img
+        for width, cache_path in targets:
+            current = _resize_to_width(current, width, resample_filter)
+
+            # Convert to RGB if necessary (e.g. for PNG with alpha to JPG)
+            if current.mode not in ('RGB', 'L'):
+                current = current.convert('RGB')
+
+            extension = os.path.splitext(cache_path)[1][1:]
+            fmt = FORMAT_BY_EXTENSION[extension]
+            if fmt == "avif":
+                load_avif_plugin()
+            _, _, pil_format, save_options = THUMBNAIL_FORMATS[fmt]
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            try:
+                current.save(tmp_path, pil_format, **save_options)
+                os.replace(tmp_path, cache_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
@@ -0,0 +1,137 @@
+"""
+Model Copy
+
+Fast file copies for multi-GB model files, meant to run off the event loop.
+
+The cheapest available method is used:
+    reflink          copy-on-write clone (btrfs/XFS), instant and no extra space
+    copy_file_range  in-kernel copy, no data through user space (Linux)
+    sendfile         in-kernel copy for kernels without copy_file_range
+    read/write       portable fallback with a large reused buffer
+
+Data is written to a hidden temporary name next to the target and renamed
+into place once complete, so a half-copied model never shows up. Each copy
+creates its own temporary file exclusively, so two copies to the same
+target never write into each other's data.
+"""
+
+import os
+import uuid
+import shutil
+from typing import Callable, Optional
+
+# Linux FICLONE ioctl request number
+FICLONE = 0x40049409
+
+# Bytes per in-kernel copy call; also the progress/cancellation granularity
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Buffer for the read/write fallback
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+class CopyCancelled(Exception):
+    """Raised when a copy is cancelled between chunks"""
+
+
+def reflink_file(source_path: str, target_path: str):
+    """Clone source_path into target_path (raises OSError or ImportError if unsupported)"""
+    import fcntl
+    with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    stat_info = os.stat(source_path)
+    os.utime(target_path, ns=(stat_info.st_atime_ns, stat_info.st_mtime_ns))
+
+
+def get_copy_temp_path(target_path: str, token: str) -> str:
+    directory, name = os.path.split(target_path)
+    # Hidden, so the model index never lists a partial copy
+    return os.path.join(directory, f".{name}.copying-{token}")
+
+
+def _copy_in_kernel(src_fd: int, dst_fd: int, offset: int, total: int, method: str,
+                    on_progress: Callable[[int], None], is_cancelled: Callable[[], bool]) -> int:
+    """Copy from offset to total with copy_file_range or sendfile; returns the new offset"""
+    while offset < total:
+        if is_cancelled():
+            raise CopyCancelled()
+        count = min(COPY_CHUNK_SIZE, total - offset)
+        if method == "copy_file_range":
+            copied = os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+        else:
+            os.lseek(dst_fd, offset, os.SEEK_SET)
+            copied = os.sendfile(dst_fd, src_fd, offset, count)
+        if copied == 0:
+            break
+        offset += copied
+        on_progress(offset)
+    return offset
+
+
+def copy_model_data(source_path: str, target_path: str,
+                    on_progress: Optional[Callable[[int], None]] = None,
+                    is_cancelled: Optional[Callable[[], bool]] = None,
+                    token: Optional[str] = None) -> str:
+    """
+    Copy a file with the fastest available method and preserve its metadata (like shutil.copy2).
+
+    Blocking; run it in an executor. Returns the method used. token names the
+    temporary file (e.g. the copy job id); a random one is used by default.
+    Raises CopyCancelled or OSError; the temporary file is removed on failure.
+    """
+    on_progress = on_progress or (lambda copied: None)
+    is_cancelled = is_cancelled or (lambda: False)
+    total = os.path.getsize(source_path)
+    temp_path = get_copy_temp_path(target_path, token or uuid.uuid4().hex)
+
+    # Fails if the name is taken, so a temporary file of another copy is never reused or removed
+    os.close(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)))
+
+    try:
+        try:
+            reflink_file(source_path, temp_path)
+            method = "reflink"
+            on_progress(total)
+        except (OSError, ImportError):
+            method = None
+            offset = 0
+            with open(source_path, 'rb') as src, open(temp_path, 'wb') as dst:
+                src_fd, dst_fd = src.fileno(), dst.fileno()
+                for candidate in ("copy_file_range", "sendfile"):
+                    if not hasattr(os, candidate):
+                        continue
+                    try:
+                        offset = _copy_in_kernel(src_fd, dst_fd, offset, total, candidate, on_progress, is_cancelled)
+                        method = candidate
+                        break
+                    except OSError:
+                        # Unsupported for this pair of files (e.g. cross-device on old kernels);
+                        # the next method continues after whatever was written
+                        offset = os.fstat(dst_fd).st_size
+                        continue
+
+                if offset < total:
+                    method = "read_write"
+                    src.seek(offset)
+                    dst.seek(offset)
+                    buffer = bytearray(COPY_BUFFER_SIZE)
+                    view = memoryview(buffer)
+                    while True:
+                        if is_cancelled():
+                            raise CopyCancelled()
+                        read = src.readinto(buffer)
+                        if not read:
+                            break
+                        dst.write(view[:read])
+                        offset += read
+                        on_progress(offset)
+
+        shutil.copystat(source_path, temp_path)
+        os.replace(temp_path, target_path)
+        return method
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
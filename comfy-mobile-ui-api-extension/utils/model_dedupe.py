@@ -0,0 +1,206 @@
+"""
+Model Deduplication
+
+Finds identical model files across models/ subfolders and replaces extra
+copies with links to one file.
+
+Detection narrows candidates in three steps so most files are never read in
+full: equal size, then a partial hash of a few sampled blocks, then the full
+SHA256 (served from the model hash cache when available, see
+model_hashes.py). Names that already share an inode count as one copy.
+
+Deduplication links each duplicate to the kept file through a temporary
+name and an atomic rename, so a model is never missing. A reflink (copy on
+write clone, Linux btrfs/XFS) keeps the files independent; a hardlink makes
+them one file. "auto" tries a reflink and falls back to a hardlink.
+"""
+
+import os
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+from .model_index import model_index, get_models_path
+from .model_hashes import model_hasher
+from .model_copy import reflink_file
+
+# Smaller files are not worth deduplicating
+DEDUPE_MIN_SIZE = 1024 * 1024
+
+# Bytes read at each sampled offset for the partial hash
+PARTIAL_HASH_BLOCK = 1024 * 1024
+
+DEDUPE_MODES = ("auto", "reflink", "hardlink")
+
+# Only one scan or dedupe runs at a time
+dedupe_lock = threading.Lock()
+
+
+class DedupeError(Exception):
+    """A duplicate could not be replaced by a link"""
+
+
+def partial_hash(file_path: str, size: int) -> str:
+    """Hash of the first, middle and last blocks of a file"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for offset in sorted({0, max(0, size // 2 - PARTIAL_HASH_BLOCK // 2), max(0, size - PARTIAL_HASH_BLOCK)}):
+            f.seek(offset)
+            digest.update(f.read(PARTIAL_HASH_BLOCK))
+    return digest.hexdigest()
+
+
+def _group(items: List[Dict[str, Any]], key) -> List[List[Dict[str, Any]]]:
+    """Group items by key(item), keeping groups that hold more than one distinct inode"""
+    groups: Dict[Any, List[Dict[str, Any]]] = {}
+    for item in items:
+        value = key(item)
+        if value is not None:
+            groups.setdefault(value, []).append(item)
+    return [group for group in groups.values() if len({item["inode"] for item in group}) > 1]
+
+
+def find_duplicate_groups(min_size: int = DEDUPE_MIN_SIZE) -> List[Dict[str, Any]]:
+    """
+    Groups of model files with identical content, largest reclaimable space first.
+
+    Each group lists every path with its inode; "copies" counts distinct inodes and
+    "reclaimable_bytes" is what linking them all to one file would free.
+    """
+    model_index.refresh(max_age=0)
+    models_path = get_models_path()
+
+    files = []
+    for row in model_index.get_files():
+        if row["size"] < min_size or row["rel_path"].endswith(".downloading"):
+            continue
+        file_path = os.path.join(models_path, *row["rel_path"].split("/"))
+        try:
+            stat_info = os.stat(file_path)
+        except OSError:
+            continue
+        files.append({
+            "path": row["rel_path"],
+            "abs_path": file_path,
+            "size": stat_info.st_size,
+            "device": stat_info.st_dev,
+            "inode": (stat_info.st_dev, stat_info.st_ino)
+        })
+
+    # One partial/full hash per inode, shared by all of its names
+    partial_hashes: Dict[Tuple[int, int], Optional[str]] = {}
+    full_hashes: Dict[Tuple[int, int], Optional[str]] = {}
+
+    def partial_key(item):
+        if item["inode"] not in partial_hashes:
+            try:
+                partial_hashes[item["inode"]] = partial_hash(item["abs_path"], item["size"])
+            except OSError:
+                partial_hashes[item["inode"]] = None
+        return partial_hashes[item["inode"]]
+
+    def full_key(item):
+        if item["inode"] not in full_hashes:
+            full_hashes[item["inode"]] = model_hasher.hash_now(item["abs_path"])
+        return full_hashes[item["inode"]]
+
+    groups = []
+    for size_group in _group(files, lambda item: item["size"]):
+        for partial_group in _group(size_group, partial_key):
+            for group in _group(partial_group, full_key):
+                copies = len({item["inode"] for item in group})
+                groups.append({
+                    "sha256": full_hashes[group[0]["inode"]],
+                    "size": group[0]["size"],
+                    "copies": copies,
+                    "reclaimable_bytes": group[0]["size"] * (copies - 1),
+                    "files": sorted(
+                        ({"path": item["path"], "inode": item["inode"][1], "device": item["device"]} for item in group),
+                        key=lambda entry: entry["path"]
+                    )
+                })
+
+    groups.sort(key=lambda group: group["reclaimable_bytes"], reverse=True)
+    return groups
+
+
+def link_duplicate(source_path: str, duplicate_path: str, mode: str = "auto") -> str:
+    """
+    Atomically replace duplicate_path with a link to source_path.
+
+    Returns the link type used ("reflink" or "hardlink"). Raises DedupeError.
+    """
+    directory, name = os.path.split(duplicate_path)
+    # Hidden name, so the model index never lists the temporary link
+    temp_path = os.path.join(directory, f".{name}.dedupe")
+
+    if mode in ("auto", "reflink"):
+        try:
+            reflink_file(source_path, temp_path)
+            os.replace(temp_path, duplicate_path)
+            return "reflink"
+        except (OSError, ImportError) as e:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            if mode == "reflink":
+                raise DedupeError(f"Reflink not supported here: {e}")
+
+    try:
+        os.link(source_path, temp_path)
+        os.replace(temp_path, duplicate_path)
+        return "hardlink"
+    except OSError as e:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise DedupeError(f"Hardlink failed: {e}")
+
+
+def dedupe_files(paths: List[str], keep: Optional[str] = None, mode: str = "auto") -> Dict[str, Any]:
+    """
+    Link every file in paths (relative to models/) to the kept one after verifying
+    that their SHA256 matches it.
+    """
+    models_path = get_models_path()
+    keep = keep or paths[0]
+    keep_path = os.path.join(models_path, *keep.split("/"))
+    keep_hash = model_hasher.hash_now(keep_path)
+    if keep_hash is None:
+        raise DedupeError(f"Cannot read kept file: {keep}")
+    keep_stat = os.stat(keep_path)
+
+    results = []
+    freed_bytes = 0
+    for rel_path in paths:
+        if rel_path == keep:
+            continue
+        duplicate_path = os.path.join(models_path, *rel_path.split("/"))
+        result = {"path": rel_path}
+        try:
+            stat_info = os.stat(duplicate_path)
+            if (stat_info.st_dev, stat_info.st_ino) == (keep_stat.st_dev, keep_stat.st_ino):
+                result["status"] = "already_linked"
+            elif stat_info.st_dev != keep_stat.st_dev:
+                result["status"] = "skipped"
+                result["error"] = "On a different filesystem than the kept file"
+            elif model_hasher.hash_now(duplicate_path) != keep_hash:
+                result["status"] = "skipped"
+                result["error"] = "Content differs from the kept file"
+            else:
+                result["link"] = link_duplicate(keep_path, duplicate_path, mode)
+                result["status"] = "linked"
+                # Only the last name of an inode frees its blocks
+                if stat_info.st_nlink == 1:
+                    freed_bytes += stat_info.st_size
+                if result["link"] == "reflink":
+                    model_hasher.remember(duplicate_path, keep_hash)
+                model_index.mark_dirty(duplicate_path)
+        except (OSError, DedupeError) as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+        results.append(result)
+
+    return {"kept": keep, "sha256": keep_hash, "freed_bytes": freed_bytes, "results": results}
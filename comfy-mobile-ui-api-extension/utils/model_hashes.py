@@ -0,0 +1,385 @@
+"""
+Model Hashes
+
+Background content hashing of every file in the model index: SHA256 plus the
+AutoV2 short hash used by Civitai (the first 10 hex digits of the SHA256).
+
+Hashes are cached in mobile_data/model_hashes.db keyed by (device, inode),
+together with the size and mtime they were computed for, so a file is
+hashed once and renames or hardlinks never trigger a rehash.
+
+Hashing runs on a small thread pool with large unbuffered reads and is
+rate-limited (tighter while ComfyUI has prompts queued) so it does not
+compete with generation for disk bandwidth.
+
+Tunable through environment variables:
+    COMFY_MOBILE_HASH_WORKERS        parallel files (default 1)
+    COMFY_MOBILE_HASH_RATE_MB        MB/s while idle (default 200, 0 = unlimited)
+    COMFY_MOBILE_HASH_BUSY_RATE_MB   MB/s while prompts are queued (default 25)
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+import folder_paths
+from .model_index import model_index, get_models_path
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+HASH_WORKERS = max(1, _env_int("COMFY_MOBILE_HASH_WORKERS", 1))
+HASH_RATE = _env_int("COMFY_MOBILE_HASH_RATE_MB", 200) * 1024 * 1024
+HASH_BUSY_RATE = _env_int("COMFY_MOBILE_HASH_BUSY_RATE_MB", 25) * 1024 * 1024
+
+# Read size per hashing step
+HASH_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Files modified more recently than this are still being written; hash them later
+HASH_SETTLE_SECONDS = 30.0
+
+# Seconds between full passes when no change wakes the worker
+RESCAN_INTERVAL = 300.0
+
+# Partial downloads are hashed once they are renamed into place
+SKIPPED_SUFFIXES = (".downloading", ".tmp")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    dev INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    hashed_at REAL NOT NULL,
+    PRIMARY KEY (dev, inode)
+);
+CREATE INDEX IF NOT EXISTS idx_hashes_sha256 ON hashes(sha256);
+"""
+
+
+def get_model_hash_db_path() -> str:
+    return os.path.join(folder_paths.base_path, "mobile_data", "model_hashes.db")
+
+
+def autov2_from_sha256(sha256: str) -> str:
+    """Civitai's AutoV2 short hash"""
+    return sha256[:10].upper()
+
+
+def is_generation_busy() -> bool:
+    """True while ComfyUI has prompts running or queued"""
+    try:
+        import server
+        prompt_server = server.PromptServer.instance
+        return prompt_server.prompt_queue.get_tasks_remaining() > 0
+    except Exception:
+        return False
+
+
+class HashRateLimiter:
+    """Token bucket shared by all hashing threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.allowance = 0.0
+        self.last = time.monotonic()
+
+    def consume(self, nbytes: int):
+        rate = HASH_BUSY_RATE if is_generation_busy() else HASH_RATE
+        if rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(rate, self.allowance + (now - self.last) * rate) - nbytes
+            self.last = now
+            delay = -self.allowance / rate if self.allowance < 0 else 0
+        if delay > 0:
+            time.sleep(delay)
+
+
+def compute_sha256(file_path: str, limiter: Optional[HashRateLimiter] = None) -> str:
+    """SHA256 of a file using large unbuffered reads into a reused buffer"""
+    digest = hashlib.sha256()
+    buffer = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as f:
+        fd = f.fileno()
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            if limiter is not None:
+                limiter.consume(read)
+            # hashlib releases the GIL for large updates
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+class ModelHashService:
+    """Singleton background hasher for the models directory"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.lock = threading.RLock()
+        self.conn: Optional[sqlite3.Connection] = None
+        # (dev, inode) -> (size, mtime_ns, sha256)
+        self.hashes: Dict[Tuple[int, int], Tuple[int, int, str]] = {}
+        # rel_path -> (dev, inode), refreshed by every pass
+        self.paths: Dict[str, Tuple[int, int]] = {}
+        self.limiter = HashRateLimiter()
+        self.wake_event = threading.Event()
+        self.worker: Optional[threading.Thread] = None
+        self.pending = 0
+        self.pending_bytes = 0
+        self.current: Optional[str] = None
+        self.last_pass: Optional[float] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database lazily and load every cached hash into memory"""
+        if self.conn is not None:
+            return self.conn
+
+        db_path = get_model_hash_db_path()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        for dev, inode, size, mtime_ns, sha256 in conn.execute(
+                "SELECT dev, inode, size, mtime_ns, sha256 FROM hashes"):
+            self.hashes[(dev, inode)] = (size, mtime_ns, sha256)
+
+        self.conn = conn
+        return conn
+
+    def start(self):
+        """Start the background worker (idempotent)"""
+        with self.lock:
+            self._connect()
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name="ModelHashes", daemon=True)
+                self.worker.start()
+
+    def wake(self):
+        """Request a pass soon, e.g. after model files changed"""
+        self.wake_event.set()
+
+    def _run(self):
+        executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="ModelHashWorker")
+        while True:
+            try:
+                retry_after = self._pass(executor)
+            except Exception as e:
+                print(f"[ModelHashes] Hash pass failed: {e}")
+                retry_after = RESCAN_INTERVAL
+
+            self.wake_event.wait(retry_after)
+            if self.wake_event.is_set():
+                self.wake_event.clear()
+                # Let a burst of changes (copies, extractions) finish before rescanning
+                time.sleep(5.0)
+                self.wake_event.clear()
+
+    def _pass(self, executor: ThreadPoolExecutor) -> float:
+        """Stat every indexed file and hash the ones without a current hash"""
+        model_index.refresh(max_age=0)
+        models_path = get_models_path()
+        now = time.time()
+        seen = set()
+        stat_failures = 0
+        paths: Dict[str, Tuple[int, int]] = {}
+        jobs: Dict[Tuple[int, int], Tuple[str, str, int]] = {}
+        retry_after = RESCAN_INTERVAL
+
+        for row in model_index.get_files():
+            rel_path = row["rel_path"]
+            if rel_path.endswith(SKIPPED_SUFFIXES):
+                continue
+            file_path = os.path.join(models_path, *rel_path.split("/"))
+            try:
+                stat_info = os.stat(file_path)
+            except OSError:
+                stat_failures += 1
+                continue
+            key = (stat_info.st_dev, stat_info.st_ino)
+            seen.add(key)
+            paths[rel_path] = key
+
+            cached = self.hashes.get(key)
+            if cached is not None and cached[0] == stat_info.st_size and cached[1] == stat_info.st_mtime_ns:
+                continue
+            if now - stat_info.st_mtime < HASH_SETTLE_SECONDS:
+                retry_after = min(retry_after, HASH_SETTLE_SECONDS)
+                continue
+            # Hardlinked names share one job
+            jobs.setdefault(key, (rel_path, file_path, stat_info.st_size))
+
+        with self.lock:
+            self.paths = paths
+            # Forget files that no longer exist under any name, unless the models
+            # volume looks unavailable (an unmount must not cost a full rehash)
+            if not seen or stat_failures > len(seen):
+                gone = []
+            else:
+                gone = [key for key in self.hashes if key not in seen]
+            if gone:
+                conn = self._connect()
+                conn.executemany("DELETE FROM hashes WHERE dev = ? AND inode = ?", gone)
+                conn.commit()
+                for key in gone:
+                    del self.hashes[key]
+
+        if not jobs:
+            self.last_pass = time.time()
+            return retry_after
+
+        # Small files first, so most of the library is identified quickly
+        ordered = sorted(jobs.items(), key=lambda item: item[1][2])
+        self.pending = len(ordered)
+        self.pending_bytes = sum(job[2] for _, job in ordered)
+        print(f"[ModelHashes] Hashing {len(ordered)} model files ({self.pending_bytes / (1024 ** 3):.1f} GB)")
+
+        started = time.time()
+        for _ in executor.map(lambda item: self._hash_file(item[1][0], item[1][1], item[0]), ordered):
+            pass
+        print(f"[ModelHashes] Hashed {len(jobs)} files in {time.time() - started:.0f}s")
+        self.last_pass = time.time()
+        return retry_after
+
+    def _hash_file(self, rel_path: str, file_path: str, key: Tuple[int, int]):
+        self.current = rel_path
+        try:
+            before = os.stat(file_path)
+            sha256 = compute_sha256(file_path, self.limiter)
+            after = os.stat(file_path)
+        except OSError as e:
+            print(f"[ModelHashes] Could not hash {rel_path}: {e}")
+            return
+        finally:
+            with self.lock:
+                self.pending -= 1
+                self.current = None
+
+        with self.lock:
+            self.pending_bytes = max(0, self.pending_bytes - before.st_size)
+        if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+            # Changed while hashing; the next pass picks it up again
+            return
+
+        self._store(after, sha256)
+
+    def _store(self, stat_info: os.stat_result, sha256: str):
+        key = (stat_info.st_dev, stat_info.st_ino)
+        with self.lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO hashes (dev, inode, size, mtime_ns, sha256, hashed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key[0], key[1], stat_info.st_size, stat_info.st_mtime_ns, sha256, time.time())
+            )
+            conn.commit()
+            self.hashes[key] = (stat_info.st_size, stat_info.st_mtime_ns, sha256)
+
+    def hash_now(self, file_path: str) -> Optional[str]:
+        """SHA256 of a file, from the cache or computed in the calling thread (None if unreadable)"""
+        try:
+            before = os.stat(file_path)
+            with self.lock:
+                self._connect()
+                cached = self.hashes.get((before.st_dev, before.st_ino))
+            if cached is not None and cached[0] == before.st_size and cached[1] == before.st_mtime_ns:
+                return cached[2]
+            sha256 = compute_sha256(file_path, self.limiter)
+            after = os.stat(file_path)
+        except OSError:
+            return None
+        if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+            return None
+        self._store(after, sha256)
+        return sha256
+
+    def remember(self, file_path: str, sha256: str):
+        """Record a known hash for a file, e.g. a fresh copy or reflink of a hashed file"""
+        try:
+            self._store(os.stat(file_path), sha256)
+        except OSError:
+            pass
+
+    def get_hash(self, rel_path: str) -> Optional[Dict[str, str]]:
+        """Hashes of a model file (path relative to models/), or None if not hashed yet"""
+        file_path = os.path.join(get_models_path(), *rel_path.split("/"))
+        try:
+            stat_info = os.stat(file_path)
+        except OSError:
+            return None
+        with self.lock:
+            self._connect()
+            cached = self.hashes.get((stat_info.st_dev, stat_info.st_ino))
+        if cached is None or cached[0] != stat_info.st_size or cached[1] != stat_info.st_mtime_ns:
+            return None
+        return {"sha256": cached[2], "autov2": autov2_from_sha256(cached[2])}
+
+    def get_known_hash(self, rel_path: str, size: int, mtime: float) -> Optional[str]:
+        """SHA256 of a file as of the last pass, without touching the disk (for listings)"""
+        with self.lock:
+            key = self.paths.get(rel_path)
+            cached = self.hashes.get(key) if key is not None else None
+        if cached is None or cached[0] != size or abs(cached[1] / 1e9 - mtime) > 1e-3:
+            return None
+        return cached[2]
+
+    def find_by_hash(self, file_hash: str) -> List[str]:
+        """Paths (relative to models/) of files matching a SHA256 or AutoV2 hash"""
+        file_hash = file_hash.strip().lower()
+        if len(file_hash) not in (10, 64):
+            return []
+        with self.lock:
+            self._connect()
+            keys = {
+                key for key, cached in self.hashes.items()
+                if cached[2] == file_hash or (len(file_hash) == 10 and cached[2].startswith(file_hash))
+            }
+            return sorted(rel_path for rel_path, key in self.paths.items() if key in keys)
+
+    def get_status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "running": self.worker is not None,
+                "hashed_files": len(self.hashes),
+                "pending_files": max(0, self.pending),
+                "pending_bytes": self.pending_bytes,
+                "current": self.current,
+                "last_pass": self.last_pass,
+                "workers": HASH_WORKERS,
+                "rate_limit": HASH_RATE,
+                "busy_rate_limit": HASH_BUSY_RATE,
+                "generation_busy": is_generation_busy()
+            }
+
+
+# Global singleton instance
+model_hasher = ModelHashService()
@@ -0,0 +1,453 @@
+"""
+Model Index
+
+Persistent inventory of every file under the ComfyUI models/ directory.
+
+The index lives in mobile_data/model_index.db (SQLite) and is refreshed
+incrementally: a directory is only re-listed when its mtime changes, so a
+refresh costs one stat() per directory instead of one per file. All model
+listing and search endpoints answer from this index.
+
+When the filesystem watcher (fs_watcher.py) covers models/, change events are
+applied directly and reads never walk the tree.
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional
+
+import folder_paths
+
+# Minimum age (seconds) of the last refresh before a read triggers a new one
+REFRESH_INTERVAL = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_dirs_parent ON dirs(parent);
+CREATE TABLE IF NOT EXISTS files (
+    rel_path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    folder_type TEXT NOT NULL,
+    subfolder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_dir ON files(dir);
+CREATE INDEX IF NOT EXISTS idx_files_folder ON files(folder_type, name_lower);
+CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(mtime);
+"""
+
+FILE_COLUMNS = "rel_path, folder_type, subfolder, filename, extension, size, mtime"
+
+
+def get_models_path() -> str:
+    """Get the ComfyUI models directory path"""
+    return os.path.join(folder_paths.base_path, "models")
+
+
+def get_model_index_db_path() -> str:
+    """Get the model index database path"""
+    return os.path.join(folder_paths.base_path, "mobile_data", "model_index.db")
+
+
+def is_hidden_entry(name: str) -> bool:
+    """Hidden and system entries are never indexed"""
+    return name.startswith('.') or name.startswith('__')
+
+
+def split_index_dir(rel_dir: str):
+    """Split an index directory path into (folder_type, subfolder)"""
+    if not rel_dir:
+        return "root", ""
+    parts = rel_dir.split("/", 1)
+    return parts[0], parts[1] if len(parts) > 1 else ""
+
+
+class ModelIndex:
+    """Singleton SQLite-backed index of the models directory"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.lock = threading.RLock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.models_path: Optional[str] = None
+        self.last_refresh = 0.0
+        self.dirty = True
+        self.stale_dirs = set()
+        # Set by the filesystem watcher when it delivers change events for models/
+        self.watched = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database lazily and reset it if the models path changed"""
+        if self.conn is not None:
+            return self.conn
+
+        db_path = get_model_index_db_path()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+
+        self.models_path = get_models_path()
+        row = conn.execute("SELECT value FROM meta WHERE key = 'models_path'").fetchone()
+        if row is None or row["value"] != self.models_path:
+            conn.execute("DELETE FROM dirs")
+            conn.execute("DELETE FROM files")
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('models_path', ?)",
+                (self.models_path,)
+            )
+            conn.commit()
+
+        self.conn = conn
+        return conn
+
+    def mark_dirty(self, file_path: Optional[str] = None):
+        """
+        Force the next read to refresh, e.g. after this extension changed a model file.
+
+        Args:
+            file_path: Absolute path of the changed file. Its directory is re-listed even if
+                the directory mtime did not change (in-place overwrites keep the dir mtime).
+        """
+        if file_path:
+            models_path = self.models_path or get_models_path()
+            rel_dir = os.path.relpath(os.path.dirname(os.path.abspath(file_path)), models_path)
+            if not rel_dir.startswith('..'):
+                self.stale_dirs.add("" if rel_dir == "." else rel_dir.replace(os.sep, "/"))
+                return
+        self.dirty = True
+
+    def refresh(self, max_age: float = REFRESH_INTERVAL) -> bool:
+        """
+        Bring the index up to date with the filesystem.
+
+        Args:
+            max_age: Skip the refresh if the last one is younger than this (seconds)
+
+        Returns:
+            bool: True if a refresh pass was performed
+        """
+        with self.lock:
+            # Without a watcher, periodically walk the whole tree; otherwise only on demand
+            full = self.dirty or (not self.watched and time.time() - self.last_refresh >= max_age)
+            if not full and not self.stale_dirs:
+                return False
+
+            conn = self._connect()
+            started = time.time()
+            try:
+                stale_dirs, self.stale_dirs = self.stale_dirs, set()
+                conn.executemany(
+                    "UPDATE dirs SET mtime_ns = NULL WHERE path = ?", [(d,) for d in stale_dirs]
+                )
+                rescanned = self._refresh_locked(conn, None if full else stale_dirs)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            if full:
+                self.dirty = False
+                self.last_refresh = time.time()
+            if full and rescanned:
+                print(f"[ModelIndex] Rescanned {rescanned} directories in {(time.time() - started) * 1000:.0f}ms")
+            return True
+
+    def _refresh_locked(self, conn: sqlite3.Connection, start_dirs=None) -> int:
+        """
+        Walk directories, re-listing only those whose mtime changed.
+
+        Args:
+            start_dirs: Restrict the walk to these subtrees (None walks the whole tree)
+        """
+        models_path = self.models_path
+        known: Dict[str, int] = {}
+        children: Dict[str, List[str]] = {}
+        for row in conn.execute("SELECT path, parent, mtime_ns FROM dirs"):
+            known[row["path"]] = row["mtime_ns"]
+            if row["parent"] is not None:
+                children.setdefault(row["parent"], []).append(row["path"])
+
+        seen = set()
+        visited_inodes = set()
+        rescanned = 0
+        stack = sorted(start_dirs) if start_dirs else [""]
+
+        while stack:
+            rel_dir = stack.pop()
+            abs_dir = os.path.join(models_path, rel_dir) if rel_dir else models_path
+
+            try:
+                dir_stat = os.stat(abs_dir)
+            except OSError:
+                continue
+
+            # Guard against symlink loops
+            inode_key = (dir_stat.st_dev, dir_stat.st_ino)
+            if inode_key in visited_inodes:
+                continue
+            visited_inodes.add(inode_key)
+            seen.add(rel_dir)
+
+            if known.get(rel_dir) == dir_stat.st_mtime_ns:
+                stack.extend(children.get(rel_dir, []))
+                continue
+
+            rescanned += 1
+            subdirs = self._rescan_directory(conn, rel_dir, abs_dir)
+            parent = None if not rel_dir else (rel_dir.rsplit("/", 1)[0] if "/" in rel_dir else "")
+            conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                (rel_dir, parent, dir_stat.st_mtime_ns)
+            )
+            stack.extend(subdirs)
+
+        def in_scope(path: str) -> bool:
+            if not start_dirs:
+                return True
+            return any(not d or path == d or path.startswith(d + "/") for d in start_dirs)
+
+        removed = [path for path in known if path not in seen and in_scope(path)]
+        if removed:
+            conn.executemany("DELETE FROM dirs WHERE path = ?", [(p,) for p in removed])
+            conn.executemany("DELETE FROM files WHERE dir = ?", [(p,) for p in removed])
+
+        return rescanned
+
+    def _rescan_directory(self, conn: sqlite3.Connection, rel_dir: str, abs_dir: str) -> List[str]:
+        """Replace the file rows of one directory and return its subdirectories"""
+        folder_type, subfolder = split_index_dir(rel_dir)
+        subdirs = []
+        rows = []
+
+        try:
+            with os.scandir(abs_dir) as entries:
+                for entry in entries:
+                    if is_hidden_entry(entry.name):
+                        continue
+                    child_rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    try:
+                        if entry.is_dir():
+                            subdirs.append(child_rel)
+                            continue
+                        if not entry.is_file():
+                            continue
+                        # Skip .json files (ComfyUI auto-generated files)
+                        if entry.name.lower().endswith('.json'):
+                            continue
+                        stat_info = entry.stat()
+                        file_size = stat_info.st_size
+                        modified_time = stat_info.st_mtime
+                    except OSError:
+                        file_size = 0
+                        modified_time = 0
+
+                    rows.append((
+                        child_rel,
+                        rel_dir,
+                        folder_type,
+                        subfolder,
+                        entry.name,
+                        entry.name.lower(),
+                        os.path.splitext(entry.name)[1].lower(),
+                        file_size,
+                        modified_time
+                    ))
+        except (PermissionError, OSError) as e:
+            print(f"[ModelIndex] Error scanning {abs_dir}: {e}")
+
+        conn.execute("DELETE FROM files WHERE dir = ?", (rel_dir,))
+        conn.executemany(
+            "INSERT OR REPLACE INTO files (rel_path, dir, folder_type, subfolder, filename, "
+            "name_lower, extension, size, mtime) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        return subdirs
+
+    def _upsert_file(self, conn: sqlite3.Connection, rel_path: str):
+        """Insert or update the row of a single file after a change event"""
+        parts = rel_path.split("/")
+        if any(is_hidden_entry(part) for part in parts) or parts[-1].lower().endswith('.json'):
+            return
+        try:
+            stat_info = os.stat(os.path.join(self.models_path, *parts))
+        except OSError:
+            conn.execute("DELETE FROM files WHERE rel_path = ?", (rel_path,))
+            return
+
+        rel_dir = "/".join(parts[:-1])
+        folder_type, subfolder = split_index_dir(rel_dir)
+        conn.execute(
+            "INSERT OR REPLACE INTO files (rel_path, dir, folder_type, subfolder, filename, "
+            "name_lower, extension, size, mtime) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (rel_path, rel_dir, folder_type, subfolder, parts[-1], parts[-1].lower(),
+             os.path.splitext(parts[-1])[1].lower(), stat_info.st_size, stat_info.st_mtime)
+        )
+
+    def apply_changes(self, changes: List[Dict[str, Any]]):
+        """Apply a batch of filesystem watcher events (paths relative to models/)"""
+        def parent_of(path: str) -> str:
+            return path.rsplit("/", 1)[0] if "/" in path else ""
+
+        with self.lock:
+            if any(change["action"] == "overflow" for change in changes):
+                self.dirty = True
+                return
+
+            conn = self._connect()
+            for change in changes:
+                action = change["action"]
+                path = change["path"]
+                if change.get("is_dir"):
+                    # Directory events re-list the affected parents and subtree
+                    self.stale_dirs.add(parent_of(path))
+                    if action == "created":
+                        self.stale_dirs.add(path)
+                    elif action == "moved":
+                        self.stale_dirs.add(parent_of(change["dest_path"]))
+                        self.stale_dirs.add(change["dest_path"])
+                    continue
+
+                if action in ("deleted", "moved"):
+                    conn.execute("DELETE FROM files WHERE rel_path = ?", (path,))
+                if action == "moved":
+                    self._upsert_file(conn, change["dest_path"])
+                elif action in ("created", "modified"):
+                    self._upsert_file(conn, path)
+            conn.commit()
+
+        if self.stale_dirs:
+            self.refresh()
+
+    def get_folders(self) -> List[Dict[str, Any]]:
+        """Top-level model folders with recursive file counts and immediate subfolder counts"""
+        with self.lock:
+            conn = self._connect()
+            file_counts = {
+                row["folder_type"]: row["count"]
+                for row in conn.execute(
+                    "SELECT folder_type, COUNT(*) AS count FROM files GROUP BY folder_type"
+                )
+            }
+            subfolder_counts = {
+                row["parent"]: row["count"]
+                for row in conn.execute(
+                    "SELECT parent, COUNT(*) AS count FROM dirs "
+                    "WHERE parent IS NOT NULL AND parent != '' AND instr(parent, '/') = 0 "
+                    "GROUP BY parent"
+                )
+            }
+            names = [row["path"] for row in conn.execute("SELECT path FROM dirs WHERE parent = ''")]
+
+        return [
+            {
+                "name": name,
+                "file_count": file_counts.get(name, 0),
+                "subfolder_count": subfolder_counts.get(name, 0)
+            }
+            for name in names
+        ]
+
+    def has_folder(self, folder_name: str) -> bool:
+        """Check whether a top-level model folder is indexed"""
+        with self.lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT 1 FROM dirs WHERE path = ? AND parent = ''", (folder_name,)
+            ).fetchone()
+        return row is not None
+
+    def get_files(self, folder_type: Optional[str] = None, order_by: str = "name") -> List[Dict[str, Any]]:
+        """
+        List indexed files, optionally restricted to one top-level folder.
+
+        Args:
+            folder_type: Top-level folder name, or None for the whole tree
+            order_by: "name" (case-insensitive ascending) or "modified" (newest first)
+        """
+        order_clause = "mtime DESC" if order_by == "modified" else "name_lower ASC"
+        sql = f"SELECT {FILE_COLUMNS} FROM files"
+        params: tuple = ()
+        if folder_type is not None:
+            sql += " WHERE folder_type = ?"
+            params = (folder_type,)
+        sql += f" ORDER BY {order_clause}"
+
+        with self.lock:
+            conn = self._connect()
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def search(self, query: str, folder_type: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Case-insensitive filename substring search, exact then prefix matches first"""
+        query_lower = query.lower()
+        escaped = query_lower.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        sql = f"SELECT {FILE_COLUMNS} FROM files WHERE name_lower LIKE ? ESCAPE '\\'"
+        params: list = [f"%{escaped}%"]
+        if folder_type:
+            sql += " AND folder_type = ?"
+            params.append(folder_type)
+        sql += (
+            " ORDER BY CASE WHEN name_lower = ? THEN 0 "
+            "WHEN substr(name_lower, 1, ?) = ? THEN 1 ELSE 2 END, name_lower LIMIT ?"
+        )
+        params.extend([query_lower, len(query_lower), query_lower, limit])
+
+        with self.lock:
+            conn = self._connect()
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def warm_up(self):
+        """Build or catch up the index in a background thread at startup"""
+        def _run():
+            try:
+                self.refresh(max_age=0)
+            except Exception as e:
+                print(f"[ModelIndex] Initial index build failed: {e}")
+
+        threading.Thread(target=_run, name="ModelIndexWarmUp", daemon=True).start()
+
+    async def ensure_fresh(self):
+        """Refresh the index off the event loop if it is stale"""
+        if self.watched and not self.dirty and not self.stale_dirs:
+            return
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.refresh)
+
+    async def query(self, method, *args, **kwargs):
+        """Refresh if stale, then run one of the read methods off the event loop"""
+        await self.ensure_fresh()
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, lambda: method(*args, **kwargs))
+
+
+# Global singleton instance
+model_index = ModelIndex()
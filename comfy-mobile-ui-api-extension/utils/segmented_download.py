@@ -0,0 +1,188 @@
+"""
+Segmented Downloads
+
+Parallel byte-range downloading for servers that accept Range requests.
+
+The target ".downloading" file is preallocated to its final size and split
+into segments that are fetched concurrently, each written at its own offset.
+Per-segment progress is kept in a "<temp file>.segments.json" sidecar, so an
+interrupted download resumes every segment where it stopped instead of
+starting over.
+"""
+
+import os
+import json
+import time
+import asyncio
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+
+import aiohttp
+import aiofiles
+
+# Number of concurrent ranges per download
+DEFAULT_SEGMENTS = 4
+MAX_SEGMENTS = 16
+
+# Files smaller than this are downloaded over a single stream
+SEGMENTED_MIN_SIZE = 32 * 1024 * 1024
+
+# Read size per segment stream
+CHUNK_SIZE = 256 * 1024
+
+# Seconds between writes of the segment state file
+STATE_SAVE_INTERVAL = 2.0
+
+
+class DownloadCancelled(Exception):
+    """Raised inside a segmented download when the task was cancelled"""
+
+
+def get_segment_state_path(temp_path: str) -> str:
+    """Sidecar file holding per-segment progress (.json so the model index skips it)"""
+    return temp_path + ".segments.json"
+
+
+def get_partial_download_size(temp_path: str) -> int:
+    """Bytes already downloaded for a partial file, segmented or single-stream"""
+    state = load_segment_state(temp_path)
+    if state is not None:
+        return sum(segment["pos"] - segment["start"] for segment in state["segments"])
+    try:
+        return os.path.getsize(temp_path)
+    except OSError:
+        return 0
+
+
+def load_segment_state(temp_path: str) -> Optional[Dict[str, Any]]:
+    """Read the sidecar state of a segmented download, if any"""
+    state_path = get_segment_state_path(temp_path)
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def remove_segment_state(temp_path: str):
+    try:
+        os.remove(get_segment_state_path(temp_path))
+    except OSError:
+        pass
+
+
+async def probe_remote_file(session: aiohttp.ClientSession, url: str) -> Optional[int]:
+    """Total size of a remote file if the server answers a one-byte Range request with 206"""
+    try:
+        async with session.get(url, headers={'Range': 'bytes=0-0'}) as response:
+            if response.status != 206:
+                return None
+            content_range = response.headers.get('content-range', '')
+            # Format: "bytes 0-0/total"
+            total = content_range.split('/')[-1]
+            return int(total) if total.isdigit() else None
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return None
+
+
+class SegmentedDownload:
+    """One segmented download of url into temp_path"""
+
+    def __init__(self, url: str, temp_path: str, total_size: int, segment_count: int = DEFAULT_SEGMENTS):
+        self.url = url
+        self.temp_path = temp_path
+        self.total_size = total_size
+        self.segments: List[Dict[str, int]] = []
+        self.last_saved = 0.0
+
+        state = load_segment_state(temp_path)
+        if (state is not None and state.get("url") == url and state.get("total_size") == total_size
+                and os.path.exists(temp_path)):
+            self.segments = state["segments"]
+        else:
+            self._plan(max(1, min(segment_count, MAX_SEGMENTS)))
+
+    def _plan(self, segment_count: int):
+        """Split the file into equal ranges and preallocate the temp file"""
+        segment_size = -(-self.total_size // segment_count)
+        self.segments = [
+            {"start": start, "end": min(start + segment_size, self.total_size) - 1, "pos": start}
+            for start in range(0, self.total_size, segment_size)
+        ]
+        with open(self.temp_path, 'wb') as f:
+            f.truncate(self.total_size)
+        self.save()
+
+    @property
+    def downloaded(self) -> int:
+        return sum(segment["pos"] - segment["start"] for segment in self.segments)
+
+    def save(self):
+        """Atomically persist per-segment progress"""
+        state_path = get_segment_state_path(self.temp_path)
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"url": self.url, "total_size": self.total_size, "segments": self.segments}, f)
+        os.replace(tmp_path, state_path)
+        self.last_saved = time.time()
+
+    async def run(self, session: aiohttp.ClientSession, is_cancelled: Callable[[], bool],
+                  on_progress: Optional[Callable[[int], None]] = None,
+                  throttle: Optional[Callable[[int], Awaitable[None]]] = None):
+        """
+        Fetch all unfinished segments concurrently.
+
+        Progress is saved on return, including on errors, so the next call resumes.
+        Raises DownloadCancelled, aiohttp.ClientError, asyncio.TimeoutError or OSError.
+        """
+        pending = [segment for segment in self.segments if segment["pos"] <= segment["end"]]
+        workers = [
+            asyncio.ensure_future(self._fetch(session, segment, is_cancelled, on_progress, throttle))
+            for segment in pending
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.save()
+
+    async def _fetch(self, session: aiohttp.ClientSession, segment: Dict[str, int],
+                     is_cancelled: Callable[[], bool], on_progress: Optional[Callable[[int], None]],
+                     throttle: Optional[Callable[[int], Awaitable[None]]]):
+        headers = {'Range': f"bytes={segment['pos']}-{segment['end']}"}
+        async with session.get(self.url, headers=headers) as response:
+            if response.status != 206:
+                raise aiohttp.ClientError(f"Range request failed: HTTP {response.status}")
+
+            # Unbuffered, so the saved state never claims bytes that are still in a Python buffer
+            async with aiofiles.open(self.temp_path, 'r+b', buffering=0) as file:
+                await file.seek(segment["pos"])
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    if is_cancelled():
+                        raise DownloadCancelled()
+                    if throttle is not None:
+                        await throttle(len(chunk))
+
+                    # Never write past the end of this segment
+                    view = memoryview(chunk)[:segment["end"] + 1 - segment["pos"]]
+                    while view:
+                        written = await file.write(view)
+                        segment["pos"] += written
+                        view = view[written:]
+
+                    if on_progress is not None:
+                        on_progress(self.downloaded)
+                    if time.time() - self.last_saved >= STATE_SAVE_INTERVAL:
+                        self.save()
+                    if segment["pos"] > segment["end"]:
+                        break
+
+        if segment["pos"] <= segment["end"]:
+            raise aiohttp.ClientPayloadError(
+                f"Segment {segment['start']}-{segment['end']} ended early at byte {segment['pos']}"
+            )
+
+    def finish(self):
+        """Remove the state file once the download is complete"""
+        remove_segment_state(self.temp_path)
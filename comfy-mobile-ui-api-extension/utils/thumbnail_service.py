@@ -0,0 +1,510 @@
+"""
+Thumbnail Service
+
+Generates image thumbnails off the aiohttp event loop.
+
+Decoding, resizing and encoding run in a process pool so a gallery scroll
+(dozens of thumbnail requests at once) cannot stall other endpoints or the
+ComfyUI websocket. Its workers are spawned rather than forked from the
+multi-threaded ComfyUI process, and only load mobile_thumbnail_worker.
+Each source is decoded once for all standard widths (STANDARD_WIDTHS),
+using reduced-scale JPEG decoding where possible.
+Concurrent requests for the same thumbnail share one in-flight job, and the
+number of pending jobs is bounded: once the queue is full new jobs are
+rejected with ThumbnailBusyError so the client can retry instead of piling
+up work.
+
+Videos are thumbnailed from a poster frame: ffmpeg extracts one frame into
+the cache (at most VIDEO_POSTER_CONCURRENCY ffmpeg processes at a time, one
+per video no matter how many requests ask for it) and the poster is then
+resized like any other image.
+
+Thumbnails are encoded as JPEG, WebP or AVIF depending on what the client
+accepts and what the installed Pillow can write (negotiate_format).
+
+Rendered thumbnails live in temp/.mobile_thumbnails, named
+"<md5 of source path>_<width>.<ext>" so every thumbnail of a source can be
+found and purged when the source is deleted or moved. The cache has a byte
+budget and evicts the least recently used files once it is exceeded.
+
+Configuration (environment variables):
+    COMFY_MOBILE_THUMBNAIL_WORKERS   worker processes (0 = use threads instead)
+    COMFY_MOBILE_THUMBNAIL_QUEUE     maximum number of pending jobs
+    COMFY_MOBILE_THUMBNAIL_CACHE_MB  disk budget of the thumbnail cache
+    COMFY_MOBILE_VIDEO_POSTER_JOBS   concurrent ffmpeg poster extractions
+"""
+
+import os
+import sys
+import site
+import time
+import types
+import asyncio
+import hashlib
+import threading
+import importlib.util
+import multiprocessing.context
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple, Any
+
+import folder_paths
+from .video_thumbnail import generate_video_thumbnail_async
+
+# Pool workers cannot import this package; they import the worker module by its
+# own top-level name from this directory, so the parent loads it under that name too
+WORKER_MODULE = "mobile_thumbnail_worker"
+WORKER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _load_worker_module():
+    module = sys.modules.get(WORKER_MODULE)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(WORKER_MODULE, os.path.join(WORKER_DIR, f"{WORKER_MODULE}.py"))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[WORKER_MODULE] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+thumbnail_worker = _load_worker_module()
+render_thumbnails = thumbnail_worker.render_thumbnails
+THUMBNAIL_FORMATS = thumbnail_worker.THUMBNAIL_FORMATS
+FORMAT_BY_EXTENSION = thumbnail_worker.FORMAT_BY_EXTENSION
+
+
+class ThumbnailWorkerProcess(multiprocessing.context.SpawnProcess):
+    """
+    Spawned pool worker that does not re-run the parent's main script.
+
+    Forking ComfyUI (torch/CUDA, aiohttp, watcher threads) can deadlock the
+    child on locks held by other threads, so workers are spawned. A spawned
+    child normally re-imports __main__, which for ComfyUI is main.py with its
+    torch, CUDA and prestartup side effects; the workers only need
+    mobile_thumbnail_worker, so __main__ is left out of their start data.
+    """
+
+    @staticmethod
+    def _Popen(process_obj):
+        main_module = sys.modules['__main__']
+        sys.modules['__main__'] = types.ModuleType('__main__')
+        try:
+            return multiprocessing.context.SpawnProcess._Popen(process_obj)
+        finally:
+            sys.modules['__main__'] = main_module
+
+
+class ThumbnailWorkerContext(multiprocessing.context.SpawnContext):
+    Process = ThumbnailWorkerProcess
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+THUMBNAIL_WORKERS = max(0, _env_int("COMFY_MOBILE_THUMBNAIL_WORKERS", min(4, max(1, (os.cpu_count() or 2) // 2))))
+THUMBNAIL_MAX_PENDING = max(1, _env_int("COMFY_MOBILE_THUMBNAIL_QUEUE", 64))
+THUMBNAIL_CACHE_BYTES = max(1, _env_int("COMFY_MOBILE_THUMBNAIL_CACHE_MB", 512)) * 1024 * 1024
+
+# Eviction trims the cache to this fraction of the budget so it does not run on every write
+CACHE_LOW_WATER = 0.9
+
+# Widths rendered together from a single decode whenever one of them is requested
+STANDARD_WIDTHS = (128, 256, 512)
+
+VIDEO_POSTER_CONCURRENCY = max(1, _env_int("COMFY_MOBILE_VIDEO_POSTER_JOBS", 2))
+
+# Poster frames are extracted once at this size and downscaled to each tier
+VIDEO_POSTER_SIZE = 1024
+
+# Seconds into the video to take the poster frame from (retried at 0 for shorter clips)
+VIDEO_POSTER_SEEK = 1.0
+
+# Preferred order when the client accepts several formats
+FORMAT_PREFERENCE = ("avif", "webp")
+
+# Browser cache lifetime of a thumbnail response; revalidated with ETag afterwards
+THUMBNAIL_MAX_AGE = 3600
+
+# Seconds a client should wait before retrying when the queue is full
+RETRY_AFTER = 1
+
+
+class ThumbnailBusyError(Exception):
+    """Raised when the thumbnail queue is full"""
+
+
+_supported_formats = None
+
+
+def get_supported_formats() -> Tuple[str, ...]:
+    """Thumbnail formats the installed Pillow can encode"""
+    global _supported_formats
+    if _supported_formats is None:
+        from PIL import Image
+        thumbnail_worker.load_avif_plugin()
+        Image.init()
+        _supported_formats = tuple(
+            name for name, (_, _, pil_format, _) in THUMBNAIL_FORMATS.items() if pil_format in Image.SAVE
+        )
+    return _supported_formats
+
+
+def negotiate_format(accept: str, requested: Optional[str] = None) -> str:
+    """
+    Pick the thumbnail format for a request.
+
+    An explicit format query parameter wins if supported; otherwise the first
+    entry of FORMAT_PREFERENCE listed in the Accept header; otherwise JPEG.
+    """
+    supported = get_supported_formats()
+    if requested:
+        requested = requested.lower()
+        if requested == "jpg":
+            requested = "jpeg"
+        if requested in supported:
+            return requested
+    accepted = {part.split(";")[0].strip().lower() for part in (accept or "").split(",")}
+    for name in FORMAT_PREFERENCE:
+        if name in supported and THUMBNAIL_FORMATS[name][1] in accepted:
+            return name
+    return "jpeg"
+
+
+def get_source_key(file_path: str) -> str:
+    """Stable prefix shared by every cached thumbnail of a source file"""
+    return hashlib.md5(os.path.abspath(file_path).encode()).hexdigest()
+
+
+class ThumbnailCache:
+    """
+    LRU bookkeeping for the thumbnail cache directory.
+
+    Recency is tracked in memory and mirrored to each file's atime, so the order
+    survives restarts. The mtime is left alone because it is compared with the
+    source mtime to decide whether a thumbnail is stale.
+    """
+
+    def __init__(self, max_bytes: int = THUMBNAIL_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        self.cache_dir = None
+        # file name -> size in bytes, least recently used first
+        self.entries: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.purged = 0
+
+    def get_cache_dir(self) -> str:
+        with self.lock:
+            if self.cache_dir is None:
+                cache_dir = os.path.join(folder_paths.get_temp_directory(), ".mobile_thumbnails")
+                os.makedirs(cache_dir, exist_ok=True)
+                self._load(cache_dir)
+                self.cache_dir = cache_dir
+            return self.cache_dir
+
+    def _load(self, cache_dir: str):
+        """Index files already on disk, oldest access first"""
+        found = []
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and ".tmp" not in entry.name:
+                    stat = entry.stat()
+                    found.append((max(stat.st_atime, stat.st_mtime), entry.name, stat.st_size))
+        found.sort()
+        self.entries = OrderedDict((name, size) for _, name, size in found)
+        self.total_bytes = sum(self.entries.values())
+
+    def lookup(self, cache_path: str, source_mtime: float) -> bool:
+        """True if cache_path holds a thumbnail at least as new as its source"""
+        name = os.path.basename(cache_path)
+        try:
+            stat = os.stat(cache_path)
+        except OSError:
+            with self.lock:
+                self.misses += 1
+                self._forget(name)
+            return False
+
+        with self.lock:
+            if stat.st_mtime < source_mtime:
+                self.misses += 1
+                return False
+            self.hits += 1
+            if name in self.entries:
+                self.entries.move_to_end(name)
+            else:
+                self.entries[name] = stat.st_size
+                self.total_bytes += stat.st_size
+
+        try:
+            os.utime(cache_path, (time.time(), stat.st_mtime))
+        except OSError:
+            pass
+        return True
+
+    def add(self, cache_path: str):
+        """Record a freshly written thumbnail and evict if over budget"""
+        name = os.path.basename(cache_path)
+        try:
+            size = os.path.getsize(cache_path)
+        except OSError:
+            return
+        with self.lock:
+            self._forget(name)
+            self.entries[name] = size
+            self.total_bytes += size
+            if self.total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * CACHE_LOW_WATER), keep=name)
+
+    def _forget(self, name: str):
+        size = self.entries.pop(name, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def _remove(self, name: str) -> bool:
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Still being served (Windows) - try again on a later eviction
+            return False
+        self._forget(name)
+        return True
+
+    def _evict(self, target_bytes: int, keep: Optional[str] = None):
+        for name in list(self.entries):
+            if self.total_bytes <= target_bytes:
+                break
+            if name != keep and self._remove(name):
+                self.evictions += 1
+
+    def purge_source(self, file_path: str) -> int:
+        """Delete every cached thumbnail of a source file"""
+        self.get_cache_dir()
+        prefix = get_source_key(file_path) + "_"
+        removed = 0
+        with self.lock:
+            for name in [n for n in self.entries if n.startswith(prefix)]:
+                if self._remove(name):
+                    removed += 1
+            self.purged += removed
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        self.get_cache_dir()
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "files": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "purged": self.purged
+            }
+
+
+class ThumbnailService:
+    """Singleton owning the worker pool and the table of in-flight jobs"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.lock = threading.Lock()
+        self.executor = None
+        self.uses_processes = False
+        # cache_path -> asyncio.Task rendering it (one task may render several tiers)
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.pending_jobs = 0
+        self.cache = ThumbnailCache()
+        # poster_path -> asyncio.Task extracting it
+        self.poster_inflight: Dict[str, asyncio.Task] = {}
+        self.poster_semaphore = None
+
+    def get_cache_path(self, file_path: str, width: int, fmt: str = "jpeg") -> str:
+        """Cache file for a (source file, width, format) triple"""
+        extension = THUMBNAIL_FORMATS[fmt][0]
+        return os.path.join(self.cache.get_cache_dir(), f"{get_source_key(file_path)}_{width}.{extension}")
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                if THUMBNAIL_WORKERS > 0:
+                    self.executor = ProcessPoolExecutor(
+                        max_workers=THUMBNAIL_WORKERS,
+                        mp_context=ThumbnailWorkerContext(),
+                        initializer=site.addsitedir,
+                        initargs=(WORKER_DIR,)
+                    )
+                    self.uses_processes = True
+                else:
+                    self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mobile-thumbnail")
+                    self.uses_processes = False
+            return self.executor
+
+    def _fall_back_to_threads(self, error: Exception):
+        """Replace a process pool that cannot run jobs with a thread pool"""
+        with self.lock:
+            if not self.uses_processes:
+                return
+            print(f"[Thumbnails] Process pool unavailable ({error}), using threads")
+            old_executor = self.executor
+            self.executor = ThreadPoolExecutor(
+                max_workers=max(1, THUMBNAIL_WORKERS),
+                thread_name_prefix="mobile-thumbnail"
+            )
+            self.uses_processes = False
+        old_executor.shutdown(wait=False)
+
+    def get_poster_path(self, video_path: str) -> str:
+        """Cached poster frame of a video"""
+        return os.path.join(self.cache.get_cache_dir(), f"{get_source_key(video_path)}_poster.jpg")
+
+    async def _extract_poster(self, video_path: str, poster_path: str):
+        if self.poster_semaphore is None:
+            self.poster_semaphore = asyncio.Semaphore(VIDEO_POSTER_CONCURRENCY)
+
+        tmp_path = f"{poster_path}.tmp.jpg"
+        async with self.poster_semaphore:
+            result = await generate_video_thumbnail_async(
+                video_path, tmp_path, VIDEO_POSTER_SIZE, VIDEO_POSTER_SIZE, VIDEO_POSTER_SEEK
+            )
+            if not result["success"] and os.path.exists(video_path):
+                # Clips shorter than the seek time produce no frame
+                result = await generate_video_thumbnail_async(
+                    video_path, tmp_path, VIDEO_POSTER_SIZE, VIDEO_POSTER_SIZE, 0
+                )
+
+        if not result["success"]:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise RuntimeError(result.get("error", "Poster frame extraction failed"))
+        os.replace(tmp_path, poster_path)
+        self.cache.add(poster_path)
+
+    async def ensure_video_poster(self, video_path: str) -> str:
+        """Return a poster frame for a video, extracting it with ffmpeg if needed"""
+        poster_path = self.get_poster_path(video_path)
+        try:
+            if os.path.getmtime(poster_path) >= os.path.getmtime(video_path):
+                return poster_path
+        except OSError:
+            pass
+
+        task = self.poster_inflight.get(poster_path)
+        if task is None:
+            task = asyncio.ensure_future(self._extract_poster(video_path, poster_path))
+            self.poster_inflight[poster_path] = task
+            task.add_done_callback(lambda _: self.poster_inflight.pop(poster_path, None))
+        await asyncio.shield(task)
+        return poster_path
+
+    async def _run(self, file_path: str, targets: List[Tuple[int, str]], source_path: Optional[str], is_video: bool):
+        if source_path is None:
+            source_path = await self.ensure_video_poster(file_path) if is_video else file_path
+
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._get_executor(), render_thumbnails, source_path, targets)
+        except BrokenProcessPool as e:
+            # Workers could not start or died (e.g. the child failed to import the worker module)
+            self._fall_back_to_threads(e)
+            await loop.run_in_executor(self._get_executor(), render_thumbnails, source_path, targets)
+        for _, cache_path in targets:
+            self.cache.add(cache_path)
+
+    def _plan_targets(self, file_path: str, cache_path: str, width: int) -> List[Tuple[int, str]]:
+        """The requested width plus any standard tiers of the same source that are missing or stale"""
+        targets = [(width, cache_path)]
+        if width not in STANDARD_WIDTHS:
+            return targets
+        fmt = FORMAT_BY_EXTENSION[os.path.splitext(cache_path)[1][1:]]
+        source_mtime = os.path.getmtime(file_path)
+        for tier in STANDARD_WIDTHS:
+            if tier == width:
+                continue
+            tier_path = self.get_cache_path(file_path, tier, fmt)
+            if tier_path in self.inflight:
+                continue
+            try:
+                if os.path.getmtime(tier_path) >= source_mtime:
+                    continue
+            except OSError:
+                pass
+            targets.append((tier, tier_path))
+        return targets
+
+    async def generate(
+        self,
+        file_path: str,
+        cache_path: str,
+        width: int,
+        source_path: Optional[str] = None,
+        is_video: bool = False
+    ):
+        """
+        Render a thumbnail of file_path into cache_path, sharing the job with concurrent callers.
+
+        Requests for one of STANDARD_WIDTHS also render the other standard tiers
+        in the same decode, so switching tiers later hits the cache.
+
+        Args:
+            file_path: File the thumbnail belongs to (cache key and freshness)
+            cache_path: Target from get_cache_path
+            width: Thumbnail width
+            source_path: Image to decode instead of file_path (e.g. a video's preview image)
+            is_video: file_path is a video; without source_path a poster frame is extracted
+
+        Raises:
+            ThumbnailBusyError: the queue is full and no job for this key is running
+            Exception: whatever the worker raised while decoding/encoding
+        """
+        task = self.inflight.get(cache_path)
+        if task is None:
+            if self.pending_jobs >= THUMBNAIL_MAX_PENDING:
+                raise ThumbnailBusyError("Thumbnail queue is full")
+            targets = self._plan_targets(file_path, cache_path, width)
+            task = asyncio.ensure_future(self._run(file_path, targets, source_path, is_video))
+            self.pending_jobs += 1
+            for _, target_path in targets:
+                self.inflight[target_path] = task
+            task.add_done_callback(lambda _: self._finish(targets))
+
+        # Shield so one client disconnecting does not cancel the shared job
+        await asyncio.shield(task)
+
+    def _finish(self, targets: List[Tuple[int, str]]):
+        self.pending_jobs -= 1
+        for _, target_path in targets:
+            self.inflight.pop(target_path, None)
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+
+
+# Global singleton instance
+thumbnail_service = ThumbnailService()
@@ -0,0 +1,421 @@
+"""
+Upload Sessions
+
+Chunked, resumable model uploads, modelled on the tus protocol.
+
+A client creates a session with the target folder, filename, total size and
+optionally the expected SHA256. The data file is preallocated next to the
+target under a hidden name, so the model index never lists it and the final
+rename stays on one filesystem. Chunks are PUT at explicit offsets, in any
+order and in parallel, and written with positioned writes. The received byte
+ranges are kept per session and persisted to mobile_data/upload_sessions/,
+so an upload survives both a dropped connection and a ComfyUI restart.
+Finalizing checks that every byte arrived and that the SHA256 matches, then
+renames the file into place.
+
+Each session has its own data file, so two clients uploading the same
+filename never write into each other's data.
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+from typing import Dict, List, Any, Optional
+
+import folder_paths
+
+from .model_index import model_index
+from .model_hashes import model_hasher, compute_sha256
+from .io_executor import save_json_file
+
+# Chunk size suggested to clients; any size is accepted
+RECOMMENDED_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Received data is buffered up to this size between positioned writes
+WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Sessions not touched for this long are discarded with their data
+SESSION_TTL = 7 * 24 * 3600
+
+# Missing ranges listed in a session status
+MAX_LISTED_RANGES = 32
+
+
+class UploadSessionError(Exception):
+    """An upload session operation failed; status is the HTTP status to report"""
+
+    def __init__(self, message: str, status: int = 400, session_id: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.session_id = session_id
+
+
+def get_upload_sessions_path() -> str:
+    return os.path.join(folder_paths.base_path, "mobile_data", "upload_sessions")
+
+
+def merge_range(ranges: List[List[int]], start: int, end: int) -> List[List[int]]:
+    """Add [start, end) to a sorted list of disjoint ranges, merging touching ones"""
+    merged = []
+    for range_start, range_end in sorted(ranges + [[start, end]]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+def missing_ranges(ranges: List[List[int]], size: int) -> List[List[int]]:
+    """Byte ranges of [0, size) not covered by ranges"""
+    missing = []
+    position = 0
+    for start, end in ranges:
+        if start > position:
+            missing.append([position, start])
+        position = max(position, end)
+    if position < size:
+        missing.append([position, size])
+    return missing
+
+
+def open_upload_file(data_path: str) -> int:
+    return os.open(data_path, os.O_WRONLY | getattr(os, "O_BINARY", 0))
+
+
+def write_at(fd: int, data, offset: int):
+    """Write all of data at offset without moving a shared file position where possible"""
+    view = memoryview(data)
+    if hasattr(os, "pwrite"):
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+    else:
+        # Windows: each request owns its descriptor, so seeking it is safe
+        os.lseek(fd, offset, os.SEEK_SET)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+
+
+def preallocate(fd: int, size: int):
+    """Reserve size bytes for the file, falling back to a sparse extend"""
+    if size and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            # Not supported by this filesystem
+            pass
+    os.ftruncate(fd, size)
+
+
+class UploadSessionManager:
+    """Singleton registry of chunked upload sessions"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        # Target paths of sessions being created
+        self.reserved_targets = set()
+        # session_id -> lock serializing writes of its state file
+        self.save_locks: Dict[str, threading.Lock] = {}
+
+    def _state_path(self, session_id: str) -> str:
+        return os.path.join(get_upload_sessions_path(), f"{session_id}.json")
+
+    def load(self):
+        """Restore sessions from the last run, dropping expired ones and those whose data is gone"""
+        sessions_path = get_upload_sessions_path()
+        try:
+            names = os.listdir(sessions_path)
+        except OSError:
+            return
+
+        now = time.time()
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            state_path = os.path.join(sessions_path, name)
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    session = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+            if now - session.get("updated_at", 0) > SESSION_TTL or not os.path.exists(session.get("data_path", "")):
+                self._discard(session)
+                continue
+
+            # A finalize cut short by the restart is simply retried by the client
+            session["status"] = "uploading"
+            session["active_writes"] = 0
+            self.sessions[session["id"]] = session
+
+        if self.sessions:
+            print(f"📤 Restored {len(self.sessions)} upload session(s)")
+
+    def save(self, session: Dict[str, Any]):
+        """
+        Persist a session's state (blocking).
+
+        Saves of one session are serialized, each writing the state current at
+        that moment. A session that was finalized or aborted meanwhile is not
+        written back.
+        """
+        os.makedirs(get_upload_sessions_path(), exist_ok=True)
+        with self.lock:
+            save_lock = self.save_locks.setdefault(session["id"], threading.Lock())
+        with save_lock:
+            with self.lock:
+                if self.sessions.get(session["id"]) is not session:
+                    return
+                state = {key: value for key, value in session.items() if key != "active_writes"}
+                state["ranges"] = [list(item) for item in session["ranges"]]
+            save_json_file(self._state_path(session["id"]), state)
+
+    def _remove_state(self, session_id: str):
+        """Delete a session's state file once no save of it is in progress"""
+        with self.lock:
+            save_lock = self.save_locks.pop(session_id, None) or threading.Lock()
+        with save_lock:
+            try:
+                os.remove(self._state_path(session_id))
+            except OSError:
+                pass
+
+    def _discard(self, session: Dict[str, Any]):
+        if session.get("data_path"):
+            try:
+                os.remove(session["data_path"])
+            except OSError:
+                pass
+        self._remove_state(session["id"])
+
+    def expire(self):
+        """Discard sessions that have not been touched within SESSION_TTL (blocking)"""
+        now = time.time()
+        with self.lock:
+            expired = [
+                session for session in self.sessions.values()
+                if not session["active_writes"] and now - session["updated_at"] > SESSION_TTL
+            ]
+            for session in expired:
+                del self.sessions[session["id"]]
+        for session in expired:
+            print(f"📤 Discarding expired upload session {session['id']} ({session['filename']})")
+            self._discard(session)
+
+    def find_by_target(self, target_path: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            return self._find_by_target(target_path)
+
+    def _find_by_target(self, target_path: str) -> Optional[Dict[str, Any]]:
+        # Caller holds self.lock
+        for session in self.sessions.values():
+            if session["target_path"] == target_path:
+                return session
+        return None
+
+    def create(self, folder: str, subfolder: str, filename: str, target_path: str,
+               size: int, sha256: Optional[str] = None, overwrite: bool = False) -> Dict[str, Any]:
+        """Create a session and preallocate its data file (blocking). Raises UploadSessionError."""
+        # Reserve the target so two clients cannot both start an upload to it
+        with self.lock:
+            existing = self._find_by_target(target_path)
+            if existing:
+                raise UploadSessionError(
+                    f"An upload of '{filename}' to this folder is already in progress", 409, existing["id"]
+                )
+            if target_path in self.reserved_targets:
+                raise UploadSessionError(f"An upload of '{filename}' to this folder is already in progress", 409)
+            self.reserved_targets.add(target_path)
+
+        try:
+            session = self._create(folder, subfolder, filename, target_path, size, sha256, overwrite)
+        finally:
+            with self.lock:
+                self.reserved_targets.discard(target_path)
+        self.save(session)
+        print(f"📤 Upload session {session['id']} created: {filename} ({size:,} bytes)")
+        return session
+
+    def _create(self, folder: str, subfolder: str, filename: str, target_path: str,
+                size: int, sha256: Optional[str], overwrite: bool) -> Dict[str, Any]:
+        if os.path.exists(target_path) and not overwrite:
+            raise UploadSessionError(
+                f"File '{filename}' already exists in {folder}{'/' + subfolder if subfolder else ''}. "
+                f"Enable overwrite or delete the existing file first.", 409
+            )
+
+        target_dir = os.path.dirname(target_path)
+        os.makedirs(target_dir, exist_ok=True)
+        free_space = shutil.disk_usage(target_dir).free
+        if size > free_space:
+            raise UploadSessionError(
+                f"Not enough disk space: {size / (1024 ** 3):.2f} GB needed, {free_space / (1024 ** 3):.2f} GB free", 507
+            )
+
+        session_id = uuid.uuid4().hex
+        data_path = os.path.join(target_dir, f".{filename}.upload-{session_id}")
+        fd = os.open(data_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0))
+        try:
+            preallocate(fd, size)
+        except OSError:
+            os.close(fd)
+            os.remove(data_path)
+            raise
+        os.close(fd)
+
+        now = time.time()
+        session = {
+            "id": session_id,
+            "folder": folder,
+            "subfolder": subfolder,
+            "filename": filename,
+            "size": size,
+            "sha256": sha256,
+            "overwrite": overwrite,
+            "target_path": target_path,
+            "data_path": data_path,
+            "ranges": [],
+            "status": "uploading",
+            "created_at": now,
+            "updated_at": now,
+            "active_writes": 0
+        }
+        with self.lock:
+            self.sessions[session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            return self.sessions.get(session_id)
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return sorted(self.sessions.values(), key=lambda session: session["created_at"])
+
+    def try_begin_write(self, session: Dict[str, Any]) -> bool:
+        """Register a chunk write unless the session is being finalized"""
+        with self.lock:
+            if session["status"] != "uploading":
+                return False
+            session["active_writes"] += 1
+            return True
+
+    def end_write(self, session: Dict[str, Any], start: int, end: int):
+        """Finish a chunk write, recording [start, end) as received if non-empty"""
+        with self.lock:
+            session["active_writes"] -= 1
+            if end > start:
+                session["ranges"] = merge_range(session["ranges"], start, end)
+            session["updated_at"] = time.time()
+
+    def remove(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Abort a session and delete its data (blocking)"""
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session:
+            self._discard(session)
+        return session
+
+    def finalize(self, session: Dict[str, Any], sha256: Optional[str] = None) -> str:
+        """
+        Verify a complete upload and move it into place (blocking).
+
+        Returns the file's SHA256. Raises UploadSessionError; on a hash mismatch the
+        received ranges are reset so the client uploads the data again.
+        """
+        expected = (sha256 or session.get("sha256") or "").lower() or None
+        with self.lock:
+            if session["status"] != "uploading":
+                raise UploadSessionError("Upload is already being finalized", 409)
+            if session["active_writes"]:
+                raise UploadSessionError("Chunks are still being written", 409)
+            if missing_ranges(session["ranges"], session["size"]):
+                raise UploadSessionError("Upload is incomplete", 409)
+            session["status"] = "finalizing"
+
+        finalized = False
+        try:
+            data_path = session["data_path"]
+            target_path = session["target_path"]
+            with open(data_path, 'rb+') as f:
+                os.fsync(f.fileno())
+            actual = compute_sha256(data_path)
+
+            if expected and actual != expected:
+                with self.lock:
+                    session["ranges"] = []
+                    session["updated_at"] = time.time()
+                self.save(session)
+                raise UploadSessionError(
+                    f"SHA256 mismatch: expected {expected}, got {actual}. The upload has to be sent again.", 422
+                )
+
+            if os.path.exists(target_path) and not session["overwrite"]:
+                raise UploadSessionError(f"File '{session['filename']}' already exists", 409)
+
+            os.replace(data_path, target_path)
+            finalized = True
+        finally:
+            with self.lock:
+                if finalized:
+                    # No chunk is accepted once the data file has moved
+                    session["status"] = "finalized"
+                    self.sessions.pop(session["id"], None)
+                else:
+                    session["status"] = "uploading"
+
+        model_hasher.remember(target_path, actual)
+        model_index.mark_dirty(target_path)
+        self._remove_state(session["id"])
+        print(f"📤 Upload session {session['id']} finalized: {target_path}")
+        return actual
+
+    def describe(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Public view of a session"""
+        with self.lock:
+            ranges = [list(item) for item in session["ranges"]]
+            status = session["status"]
+        received = sum(end - start for start, end in ranges)
+        offset = ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+        missing = missing_ranges(ranges, session["size"])
+        return {
+            "session_id": session["id"],
+            "folder": session["folder"],
+            "subfolder": session["subfolder"],
+            "filename": session["filename"],
+            "size": session["size"],
+            "sha256": session["sha256"],
+            "status": status,
+            "offset": offset,
+            "received_bytes": received,
+            "progress": round(received / session["size"] * 100, 2) if session["size"] else 100.0,
+            "complete": not missing,
+            "missing_ranges": missing[:MAX_LISTED_RANGES],
+            "chunk_size": RECOMMENDED_CHUNK_SIZE,
+            "created_at": session["created_at"],
+            "updated_at": session["updated_at"],
+            "expires_at": session["updated_at"] + SESSION_TTL
+        }
+
+
+# Global singleton instance
+upload_sessions = UploadSessionManager()
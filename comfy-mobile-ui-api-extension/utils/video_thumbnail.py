@@ -52,8 +52,8 @@ async def generate_video_thumbnail_async(
         cmd = [
             "ffmpeg",
             "-y",  # Overwrite output file
+            "-ss", str(seek_time),  # Seek to specific time (before -i: fast input seeking)
             "-i", video_path,  # Input video
-            "-ss", str(seek_time),  # Seek to specific time
             "-vframes", "1",  # Extract only 1 frame
             "-vf", f"scale='if(gt(iw,ih),min({max_width},iw),-1)':'if(gt(iw,ih),-1,min({max_height},ih))'",  # Scale preserving aspect ratio
             "-q:v", "2",  # High quality (1-31, lower is better)
@@ -166,8 +166,8 @@ def generate_video_thumbnail(
         cmd = [
             "ffmpeg",
             "-y",  # Overwrite output file
+            "-ss", str(seek_time),  # Seek to specific time (before -i: fast input seeking)
             "-i", video_path,  # Input video
-            "-ss", str(seek_time),  # Seek to specific time
             "-vframes", "1",  # Extract only 1 frame
             "-vf", f"scale='if(gt(iw,ih),min({max_width},iw),-1)':'if(gt(iw,ih),-1,min({max_height},ih))'",  # Scale preserving aspect ratio
             "-q:v", "2",  # High quality (1-31, lower is better)
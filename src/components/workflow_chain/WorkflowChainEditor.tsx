@@ -65,6 +65,8 @@ export const WorkflowChainEditor: React.FC = () => {
 
   // Chain progress state
   const [chainProgress, setChainProgress] = useState<ChainProgressData | null>(null);
+  // Execution started from this editor (other users may run this or other chains at the same time)
+  const startedExecutionIdRef = useRef<string | null>(null);
 
   // Console logs state
   const [consoleLogs, setConsoleLogs] = useState<LogEntry[]>([]);
@@ -89,14 +91,18 @@ export const WorkflowChainEditor: React.FC = () => {
     }
 
     // Subscribe to progress updates
-    const progressListenerId = chainProgressWebSocketService.on('progress_update', (data: ChainProgressData) => {
-      setChainProgress(data);
+    // Show the execution started here, otherwise any running execution of this chain
+    const progressListenerId = chainProgressWebSocketService.on('progress_update', () => {
+      const executions = chainProgressWebSocketService.getExecutions();
+      const ownExecution = executions.find(execution => execution.executionId === startedExecutionIdRef.current)
+        || executions.find(execution => execution.chainId === id);
+      setChainProgress(ownExecution || null);
     });
 
     return () => {
       chainProgressWebSocketService.offById('progress_update', progressListenerId);
     };
-  }, [serverUrl]);
+  }, [serverUrl, id]);
 
   // Listen to real-time log events when chain is executing
   useEffect(() => {
@@ -626,7 +632,7 @@ export const WorkflowChainEditor: React.FC = () => {
     toast.info('Stopping chain execution...');
 
     try {
-      const response = await interruptChain(serverUrl);
+      const response = await interruptChain(serverUrl, chainProgress?.executionId);
 
       if (response.success) {
         toast.success('Chain execution interrupted');
@@ -654,7 +660,10 @@ export const WorkflowChainEditor: React.FC = () => {
     toast.info(t('workflowChain.toast.starting', { name: chainName || id }));
 
     try {
-      const response = await executeChain(serverUrl, id);
+      const response = await executeChain(serverUrl, id, (executionId) => {
+        startedExecutionIdRef.current = executionId;
+      });
+      startedExecutionIdRef.current = null;
 
       if (response.success) {
         toast.success(t('workflowChain.toast.executed', { name: chainName || id }));
@@ -32,7 +32,8 @@ const WorkflowChainList: React.FC = () => {
   const [editingDescription, setEditingDescription] = useState('');
 
   // Chain progress state
-  const [chainProgress, setChainProgress] = useState<ChainProgressData | null>(null);
+  // Running executions (several chains can run at once)
+  const [runningExecutions, setRunningExecutions] = useState<ChainProgressData[]>([]);
 
   // WebSocket connection for chain progress
   useEffect(() => {
@@ -53,8 +54,8 @@ const WorkflowChainList: React.FC = () => {
     }
 
     // Subscribe to progress updates
-    const progressListenerId = chainProgressWebSocketService.on('progress_update', (data: ChainProgressData) => {
-      setChainProgress(data);
+    const progressListenerId = chainProgressWebSocketService.on('progress_update', () => {
+      setRunningExecutions(chainProgressWebSocketService.getExecutions());
     });
 
     return () => {
@@ -199,7 +200,7 @@ const WorkflowChainList: React.FC = () => {
     }
   };
 
-  const handleInterruptChain = async (e: React.MouseEvent) => {
+  const handleInterruptChain = async (executionId: string | null | undefined, e: React.MouseEvent) => {
     e.stopPropagation(); // Prevent navigation when clicking stop button
 
     if (!serverUrl) {
@@ -210,7 +211,7 @@ const WorkflowChainList: React.FC = () => {
     toast.info(t('workflowChain.toast.stopping'));
 
     try {
-      const response = await interruptChain(serverUrl);
+      const response = await interruptChain(serverUrl, executionId);
 
       if (response.success) {
         toast.success(t('workflowChain.toast.interrupted'));
@@ -544,7 +545,8 @@ const WorkflowChainList: React.FC = () => {
               <div className="grid gap-4">
                 {chains.map((chain) => {
                   const isEditing = editingChainId === chain.id;
-                  const isExecuting = chainProgress?.isExecuting && chainProgress?.chainId === chain.id;
+                  const chainExecution = runningExecutions.find(execution => execution.chainId === chain.id);
+                  const isExecuting = !!chainExecution;
 
                   return (
                     <div
@@ -666,7 +668,7 @@ const WorkflowChainList: React.FC = () => {
                               <div className="flex items-center gap-2">
                                 {isExecuting ? (
                                   <Button
-                                    onClick={handleInterruptChain}
+                                    onClick={(e) => handleInterruptChain(chainExecution?.executionId, e)}
                                     variant="ghost"
                                     size="sm"
                                     className="bg-red-500/20 dark:bg-red-600/20 backdrop-blur-sm border border-red-400/30 dark:border-red-500/30 shadow-lg hover:shadow-xl hover:bg-red-500/30 dark:hover:bg-red-600/30 transition-all duration-300 h-9 w-9 p-0 rounded-lg"
@@ -36,7 +36,7 @@ export interface ChainDeleteResponse {
 export interface ChainExecutionResponse {
   success: boolean;
   executionId?: string;
-  status?: 'completed' | 'failed' | 'running';
+  status?: 'queued' | 'running' | 'completed' | 'failed' | 'interrupted';
   nodeResults?: Array<{
     success: boolean;
     nodeId: string;
@@ -157,21 +157,88 @@ export async function deleteChain(serverUrl: string, chainId: string): Promise<C
   }
 }
 
+// Interval between result polls while a chain runs in the background
+const CHAIN_RESULT_POLL_INTERVAL = 2000;
+// Consecutive failed polls (network errors, 5xx) tolerated before giving up
+const CHAIN_RESULT_MAX_POLL_FAILURES = 10;
+const CHAIN_RESULT_MAX_BACKOFF = 30000;
+
+/**
+ * Poll a background chain execution until it has finished
+ *
+ * Transient failures (network errors, 5xx) are retried with backoff, so a
+ * dropped connection does not report a chain as failed while it still runs.
+ */
+async function waitForChainResult(serverUrl: string, resultUrl: string): Promise<ChainExecutionResponse> {
+  let failures = 0;
+
+  while (true) {
+    const delay = failures === 0
+      ? CHAIN_RESULT_POLL_INTERVAL
+      : Math.min(CHAIN_RESULT_POLL_INTERVAL * Math.pow(2, failures), CHAIN_RESULT_MAX_BACKOFF);
+    await new Promise(resolve => setTimeout(resolve, delay));
+
+    try {
+      const response = await axios.get(`${serverUrl}${resultUrl}`, {
+        timeout: 10000
+      });
+
+      if (response.status !== 202) {
+        const result = response.data.result;
+        return {
+          success: result.success,
+          executionId: result.executionId,
+          status: result.status,
+          nodeResults: result.nodeResults,
+          error: result.error || undefined
+        };
+      }
+      failures = 0;
+    } catch (error) {
+      const status = axios.isAxiosError(error) ? error.response?.status : undefined;
+      const transient = status === undefined || status >= 500;
+      failures += 1;
+
+      if (!transient || failures >= CHAIN_RESULT_MAX_POLL_FAILURES) {
+        throw error;
+      }
+      console.warn(`[ChainApi] Polling chain result failed (${failures}/${CHAIN_RESULT_MAX_POLL_FAILURES}), retrying:`, error);
+    }
+  }
+}
+
 /**
  * Execute a workflow chain
+ *
+ * The server runs the chain as a background job and answers 202 with its
+ * executionId; this polls the result URL until the chain has finished.
+ * onStarted receives the executionId as soon as the chain is queued.
  */
-export async function executeChain(serverUrl: string, chainId: string): Promise<ChainExecutionResponse> {
+export async function executeChain(
+  serverUrl: string,
+  chainId: string,
+  onStarted?: (executionId: string) => void
+): Promise<ChainExecutionResponse> {
   try {
     const response = await axios.post(`${serverUrl}/comfymobile/api/chains/execute`,
       { chain_id: chainId },
       {
-        timeout: 600000, // 10 minutes timeout for long executions
+        timeout: 600000, // Older extensions execute the chain within the request
         headers: {
           'Content-Type': 'application/json'
         }
       }
     );
-    return response.data;
+
+    // Older extensions answer with the final result
+    if (response.status !== 202) {
+      return response.data;
+    }
+
+    const { executionId, resultUrl } = response.data;
+    onStarted?.(executionId);
+
+    return await waitForChainResult(serverUrl, resultUrl);
   } catch (error) {
     if (axios.isAxiosError(error)) {
       return {
@@ -187,11 +254,17 @@ export async function executeChain(serverUrl: string, chainId: string): Promise<
 }
 
 /**
- * Interrupt currently executing chain
+ * Interrupt an executing chain
+ *
+ * executionId is required by the server when several chains are running.
  */
-export async function interruptChain(serverUrl: string): Promise<{ success: boolean; message?: string; error?: string }> {
+export async function interruptChain(
+  serverUrl: string,
+  executionId?: string | null
+): Promise<{ success: boolean; message?: string; error?: string }> {
   try {
-    const response = await axios.post(`${serverUrl}/comfymobile/api/chains/interrupt`, {}, {
+    const response = await axios.post(`${serverUrl}/comfymobile/api/chains/interrupt`,
+      executionId ? { executionId } : {}, {
       timeout: 10000,
       headers: {
         'Content-Type': 'application/json'
@@ -86,6 +86,8 @@ export interface ChainProgressState {
   reconnectAttempts: number;
   maxReconnectAttempts: number;
   currentProgress: ChainProgressData | null;
+  // Progress of every running execution, keyed by executionId
+  executions: Record<string, ChainProgressData>;
 }
 
 class ChainProgressWebSocketService extends EventEmitter {
@@ -102,7 +104,8 @@ class ChainProgressWebSocketService extends EventEmitter {
     lastMessageTime: null,
     reconnectAttempts: 0,
     maxReconnectAttempts: 5,
-    currentProgress: null
+    currentProgress: null,
+    executions: {}
   };
 
   constructor() {
@@ -123,6 +126,38 @@ class ChainProgressWebSocketService extends EventEmitter {
     return this.state.currentProgress;
   }
 
+  /**
+   * Get progress of every running execution (several chains can run at once)
+   */
+  getExecutions(): ChainProgressData[] {
+    return Object.values(this.state.executions);
+  }
+
+  /**
+   * Get progress of one running execution
+   */
+  getExecution(executionId: string): ChainProgressData | null {
+    return this.state.executions[executionId] || null;
+  }
+
+  /**
+   * Track running executions from a progress message
+   */
+  private updateExecutions(data: ChainProgressData): Record<string, ChainProgressData> {
+    if (!data.executionId) {
+      // Idle state: nothing is running
+      return {};
+    }
+
+    const executions = { ...this.state.executions };
+    if (data.isExecuting) {
+      executions[data.executionId] = data;
+    } else {
+      delete executions[data.executionId];
+    }
+    return executions;
+  }
+
   /**
    * Update internal state
    */
@@ -215,7 +250,10 @@ class ChainProgressWebSocketService extends EventEmitter {
 
           // Update current progress state
           if (message.type === 'chain_progress') {
-            this.updateState({ currentProgress: message.data });
+            this.updateState({
+              currentProgress: message.data,
+              executions: this.updateExecutions(message.data)
+            });
 
             // Emit typed event
             this.emit('progress_update', message.data);
@@ -282,7 +320,8 @@ class ChainProgressWebSocketService extends EventEmitter {
     this.updateState({
       isConnected: false,
       isConnecting: false,
-      reconnectAttempts: 0
+      reconnectAttempts: 0,
+      executions: {}
     });
   }
 